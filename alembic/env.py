@@ -6,6 +6,7 @@ from sqlalchemy.engine import URL
 
 from alembic import context
 from recruitair.database.models import Base  # Import your models here
+from recruitair.database.models.search import SEARCH_VECTOR_COLUMN
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -42,6 +43,12 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """Leave the search vectors and their indexes, created on PostgreSQL only, out of autogenerate."""
+    return not (reflected and compare_to is None and name is not None and name.endswith(SEARCH_VECTOR_COLUMN))
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -64,6 +71,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -86,7 +94,7 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
 
         with context.begin_transaction():
             context.run_migrations()
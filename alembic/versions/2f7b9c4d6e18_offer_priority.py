@@ -0,0 +1,31 @@
+"""offer priority
+
+Revision ID: 2f7b9c4d6e18
+Revises: e6c1f48b3a90
+Create Date: 2026-10-18 20:14:07.529310
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2f7b9c4d6e18"
+down_revision: Union[str, Sequence[str], None] = "e6c1f48b3a90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("job_offers", sa.Column("priority", sa.Integer(), server_default=sa.text("0"), nullable=False))
+    op.add_column("evaluation_tasks", sa.Column("priority", sa.Integer(), server_default=sa.text("0"), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("evaluation_tasks", "priority")
+    op.drop_column("job_offers", "priority")
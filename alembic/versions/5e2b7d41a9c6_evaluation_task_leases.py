@@ -0,0 +1,31 @@
+"""evaluation task leases
+
+Revision ID: 5e2b7d41a9c6
+Revises: c71a5e93d8f0
+Create Date: 2026-10-18 15:48:19.624117
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5e2b7d41a9c6"
+down_revision: Union[str, Sequence[str], None] = "c71a5e93d8f0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("evaluation_tasks", sa.Column("lease_owner", sa.String(), nullable=True))
+    op.add_column("evaluation_tasks", sa.Column("lease_expires_at", sa.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("evaluation_tasks", "lease_expires_at")
+    op.drop_column("evaluation_tasks", "lease_owner")
@@ -0,0 +1,31 @@
+"""keyset pagination indexes
+
+Revision ID: 7c3e5a1f9b24
+Revises: 2f7b9c4d6e18
+Create Date: 2026-10-18 22:41:53.118402
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c3e5a1f9b24"
+down_revision: Union[str, Sequence[str], None] = "2f7b9c4d6e18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_applicants_offer_id_id", "applicants", ["offer_id", "id"], unique=False)
+    op.create_index("ix_job_offers_status_id", "job_offers", ["status", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_job_offers_status_id", table_name="job_offers")
+    op.drop_index("ix_applicants_offer_id_id", table_name="applicants")
@@ -0,0 +1,59 @@
+"""task retries and dead letters
+
+Revision ID: 8a3f0c6e2d17
+Revises: 5e2b7d41a9c6
+Create Date: 2026-10-18 16:37:52.310594
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8a3f0c6e2d17"
+down_revision: Union[str, Sequence[str], None] = "5e2b7d41a9c6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+evaluation_task_status = sa.Enum("PENDING", "FAILED", name="evaluationtaskstatus")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        # Enum values cannot be added inside a transaction block on older PostgreSQL versions
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE jobofferstatus ADD VALUE IF NOT EXISTS 'FAILED'")
+    op.add_column("job_offers", sa.Column("attempts", sa.Integer(), server_default=sa.text("0"), nullable=False))
+    op.add_column("job_offers", sa.Column("next_attempt_at", sa.TIMESTAMP(timezone=True), nullable=True))
+    op.add_column("job_offers", sa.Column("last_error", sa.String(), nullable=True))
+
+    evaluation_task_status.create(op.get_bind(), checkfirst=True)
+    op.add_column(
+        "evaluation_tasks",
+        sa.Column("status", evaluation_task_status, server_default="PENDING", nullable=False),
+    )
+    op.add_column("evaluation_tasks", sa.Column("attempts", sa.Integer(), server_default=sa.text("0"), nullable=False))
+    op.add_column("evaluation_tasks", sa.Column("next_attempt_at", sa.TIMESTAMP(timezone=True), nullable=True))
+    op.add_column("evaluation_tasks", sa.Column("last_error", sa.String(), nullable=True))
+    op.create_index(op.f("ix_evaluation_tasks_status"), "evaluation_tasks", ["status"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_evaluation_tasks_status"), table_name="evaluation_tasks")
+    op.drop_column("evaluation_tasks", "last_error")
+    op.drop_column("evaluation_tasks", "next_attempt_at")
+    op.drop_column("evaluation_tasks", "attempts")
+    op.drop_column("evaluation_tasks", "status")
+    evaluation_task_status.drop(op.get_bind(), checkfirst=True)
+
+    op.drop_column("job_offers", "last_error")
+    op.drop_column("job_offers", "next_attempt_at")
+    op.drop_column("job_offers", "attempts")
+    # PostgreSQL cannot drop a value from an enum type, so FAILED offers are put back in the queue and the type is
+    # left with the extra value
+    op.execute("UPDATE job_offers SET status = 'PENDING' WHERE status = 'FAILED'")
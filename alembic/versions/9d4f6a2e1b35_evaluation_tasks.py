@@ -0,0 +1,67 @@
+"""evaluation tasks queue
+
+Revision ID: 9d4f6a2e1b35
+Revises: f55297a43c54
+Create Date: 2026-10-18 10:41:07.518302
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9d4f6a2e1b35"
+down_revision: Union[str, Sequence[str], None] = "f55297a43c54"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "evaluation_tasks",
+        sa.Column("applicant_id", sa.Integer(), nullable=False),
+        sa.Column("criteria_id", sa.Integer(), nullable=False),
+        sa.Column("offer_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ["applicant_id"],
+            ["applicants.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["criteria_id"],
+            ["criteria.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["offer_id"],
+            ["job_offers.id"],
+        ),
+        sa.PrimaryKeyConstraint("applicant_id", "criteria_id"),
+    )
+    op.create_index(op.f("ix_evaluation_tasks_created_at"), "evaluation_tasks", ["created_at"], unique=False)
+    op.create_index(op.f("ix_evaluation_tasks_criteria_id"), "evaluation_tasks", ["criteria_id"], unique=False)
+    op.create_index(op.f("ix_evaluation_tasks_offer_id"), "evaluation_tasks", ["offer_id"], unique=False)
+    # Queue the evaluations that are still pending, keeping their original scheduling order
+    op.execute("""
+        INSERT INTO evaluation_tasks (applicant_id, criteria_id, offer_id, created_at)
+        SELECT applicants.id, criteria.id, applicants.offer_id, GREATEST(applicants.created_at, criteria.created_at)
+        FROM applicants
+        JOIN criteria ON criteria.offer_id = applicants.offer_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM applicant_scores
+            WHERE applicant_scores.applicant_id = applicants.id AND applicant_scores.criteria_id = criteria.id
+        )
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_evaluation_tasks_offer_id"), table_name="evaluation_tasks")
+    op.drop_index(op.f("ix_evaluation_tasks_criteria_id"), table_name="evaluation_tasks")
+    op.drop_index(op.f("ix_evaluation_tasks_created_at"), table_name="evaluation_tasks")
+    op.drop_table("evaluation_tasks")
@@ -0,0 +1,38 @@
+"""job offer leases
+
+Revision ID: b4d9e2a7c815
+Revises: 8a3f0c6e2d17
+Create Date: 2026-10-18 17:24:08.857120
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b4d9e2a7c815"
+down_revision: Union[str, Sequence[str], None] = "8a3f0c6e2d17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == "postgresql":
+        # Enum values cannot be added inside a transaction block on older PostgreSQL versions
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE jobofferstatus ADD VALUE IF NOT EXISTS 'IN_PROGRESS'")
+    op.add_column("job_offers", sa.Column("lease_owner", sa.String(), nullable=True))
+    op.add_column("job_offers", sa.Column("lease_expires_at", sa.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Offers being extracted go back to the queue. PostgreSQL cannot drop a value from an enum type, so the type is
+    # left with the extra value
+    op.execute("UPDATE job_offers SET status = 'PENDING' WHERE status = 'IN_PROGRESS'")
+    op.drop_column("job_offers", "lease_expires_at")
+    op.drop_column("job_offers", "lease_owner")
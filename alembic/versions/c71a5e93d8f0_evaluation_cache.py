@@ -0,0 +1,39 @@
+"""evaluation cache
+
+Revision ID: c71a5e93d8f0
+Revises: 9d4f6a2e1b35
+Create Date: 2026-10-18 14:12:44.091238
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c71a5e93d8f0"
+down_revision: Union[str, Sequence[str], None] = "9d4f6a2e1b35"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "evaluation_cache",
+        sa.Column("cv_hash", sa.String(length=64), nullable=False),
+        sa.Column("criterion_hash", sa.String(length=64), nullable=False),
+        sa.Column("model_version", sa.String(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column(
+            "created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False
+        ),
+        sa.PrimaryKeyConstraint("cv_hash", "criterion_hash", "model_version"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("evaluation_cache")
@@ -0,0 +1,71 @@
+"""text search
+
+The trigram indexes need the pg_trgm extension. Creating it takes the CREATE privilege on the database (pg_trgm being
+a trusted extension since PostgreSQL 13), or superuser on older versions. Without them, have a database administrator
+run `CREATE EXTENSION pg_trgm` beforehand, and the migration uses the installed extension.
+
+Revision ID: d8a1f3b6c520
+Revises: 7c3e5a1f9b24
+Create Date: 2026-10-18 23:27:35.640918
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d8a1f3b6c520"
+down_revision: Union[str, Sequence[str], None] = "7c3e5a1f9b24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only created when missing, so that the migration does not need the privilege to create it once it is installed
+    if op.get_context().as_sql or not op.get_bind().scalar(
+        sa.text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    ):
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Stored generated columns: adding them rewrites the tables, which are locked meanwhile
+    op.add_column(
+        "job_offers",
+        sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed("to_tsvector('english', text)", persisted=True)),
+    )
+    op.add_column(
+        "applicants",
+        sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed("to_tsvector('english', cv)", persisted=True)),
+    )
+    op.create_index(
+        "ix_job_offers_text_trgm",
+        "job_offers",
+        ["text"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"text": "gin_trgm_ops"},
+    )
+    op.create_index("ix_job_offers_search_vector", "job_offers", ["search_vector"], postgresql_using="gin")
+    op.create_index(
+        "ix_applicants_cv_trgm",
+        "applicants",
+        ["cv"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"cv": "gin_trgm_ops"},
+    )
+    op.create_index("ix_applicants_search_vector", "applicants", ["search_vector"], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_applicants_search_vector", table_name="applicants")
+    op.drop_index("ix_applicants_cv_trgm", table_name="applicants")
+    op.drop_index("ix_job_offers_search_vector", table_name="job_offers")
+    op.drop_index("ix_job_offers_text_trgm", table_name="job_offers")
+    op.drop_column("applicants", "search_vector")
+    op.drop_column("job_offers", "search_vector")
+    # The pg_trgm extension is left installed, other database objects may depend on it
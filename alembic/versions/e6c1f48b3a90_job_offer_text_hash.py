@@ -0,0 +1,34 @@
+"""job offer text hash
+
+Revision ID: e6c1f48b3a90
+Revises: b4d9e2a7c815
+Create Date: 2026-10-18 18:02:41.316452
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e6c1f48b3a90"
+down_revision: Union[str, Sequence[str], None] = "b4d9e2a7c815"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("job_offers", sa.Column("text_hash", sa.String(length=64), nullable=True))
+    if op.get_bind().dialect.name == "postgresql":
+        # Same digest as the application computes, SHA-256 of the UTF-8 text in hexadecimal
+        op.execute("UPDATE job_offers SET text_hash = encode(sha256(convert_to(text, 'UTF8')), 'hex')")
+    op.create_index(op.f("ix_job_offers_text_hash"), "job_offers", ["text_hash"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_job_offers_text_hash"), table_name="job_offers")
+    op.drop_column("job_offers", "text_hash")
@@ -0,0 +1,29 @@
+// Batched evaluation protocol: one CV scored against several criteria descriptions, one score per description.
+module.exports = [
+  {
+    id: "evaluator-eval-batch",
+    url: "/evaluator/eval/batch",
+    method: "POST",
+    variants: [
+      {
+        id: "default",
+        type: "middleware",
+        options: {
+          middleware: (req, res) => {
+            const descriptions = req.body.criteria_descriptions || [];
+            res.status(200);
+            res.send({ scores: descriptions.map(() => 0.85) });
+          },
+        },
+      },
+      {
+        // Upstream without the batched protocol, which makes the evaluator fall back to per-criterion calls
+        id: "unsupported",
+        type: "status",
+        options: {
+          status: 404,
+        },
+      },
+    ],
+  },
+];
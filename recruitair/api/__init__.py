@@ -5,17 +5,20 @@ from typing import Annotated
 from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db_session
+from ..database import get_async_db_session
 
-SessionDep = Annotated[Session, Depends(get_db_session)]
+# Routes are served on the event loop, so that the number of requests in flight is bounded by the database pool rather
+# than by the threadpool FastAPI runs sync routes on. They must never block.
+SessionDep = Annotated[AsyncSession, Depends(get_async_db_session)]
 
 tags_metadata = [
     {"name": "Job Offers", "description": "Operations related to job offers."},
     {"name": "Criteria", "description": "Operations related to criteria extracted from job offers."},
     {"name": "Applicants", "description": "Operations related to applicants applying for job offers."},
     {"name": "Scores", "description": "Operations related to scores assigned to applicants based on criteria."},
+    {"name": "Dead Letters", "description": "Operations on work items that failed on every attempt."},
     {"name": "Health", "description": "Health check endpoint."},
 ]
 
@@ -45,7 +48,7 @@ app.add_middleware(
 
 
 @app.get("/health", tags=["Health"])
-def health_check():
+async def health_check():
     return {"status": "ok"}
 
 
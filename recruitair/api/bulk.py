@@ -0,0 +1,112 @@
+import codecs
+import json
+import re
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+# Largest item accepted, so that a malformed body is not buffered until its end
+MAX_ITEM_BYTES = 1024 * 1024
+
+_WHITESPACE = " \t\r\n"
+# Characters that may follow an item of a JSON array
+_DELIMITER = re.compile(r"[ \t\r\n,\]]")
+
+
+def is_ndjson(request: Request) -> bool:
+    return request.headers.get("content-type", "").split(";")[0].strip().lower() in NDJSON_MEDIA_TYPES
+
+
+def _decode_utf8(data: bytes) -> str:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="The body must be encoded in UTF-8")
+
+
+def _exceeds_max_item_size(text: str) -> bool:
+    # A character takes 1 to 4 bytes in UTF-8, so the text only needs to be encoded when its length does not tell
+    return len(text) > MAX_ITEM_BYTES or (len(text) * 4 > MAX_ITEM_BYTES and len(text.encode("utf-8")) > MAX_ITEM_BYTES)
+
+
+async def iter_ndjson_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Yield the JSON text of every non-blank line of an NDJSON body, as it is received. Lines are not parsed."""
+    # Lines are split before being decoded, as a newline byte is never part of a multi-byte UTF-8 character
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _decode_utf8(line)
+        if len(buffer) > MAX_ITEM_BYTES:
+            raise HTTPException(status_code=400, detail=f"Line longer than {MAX_ITEM_BYTES} bytes")
+    if buffer.strip():
+        yield _decode_utf8(buffer)
+
+
+async def iter_json_array_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Yield the JSON text of every item of a JSON array body, as it is received, so that the whole body is never held in
+    memory. A body that is not a well-formed JSON array is rejected with a 400 error, possibly after some items.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    json_decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    # What comes next: the opening bracket, the first item or the closing bracket, an item, a separator, or nothing
+    expected = "["
+    final = False
+    iterator = chunks.__aiter__()
+    while not final:
+        try:
+            buffer = buffer[position:] + decoder.decode(await iterator.__anext__())
+        except StopAsyncIteration:
+            buffer = buffer[position:] + decoder.decode(b"", final=True)
+            final = True
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position == len(buffer):
+                break
+            character = buffer[position]
+            if expected == "[":
+                if character != "[":
+                    raise HTTPException(status_code=400, detail="The body must be a JSON array")
+                position += 1
+                expected = "first item"
+            elif expected in ("first item", "item") and not (expected == "first item" and character == "]"):
+                try:
+                    _, end = json_decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError as e:
+                    if final or _exceeds_max_item_size(buffer[position:]):
+                        raise HTTPException(status_code=400, detail=f"Malformed JSON array: {e}")
+                    break
+                # A value is only complete once a delimiter follows it, as it may go on in the next chunk, e.g. the
+                # number 2 received before .5
+                if not final and not _DELIMITER.search(buffer, end):
+                    if _exceeds_max_item_size(buffer[position:]):
+                        raise HTTPException(status_code=400, detail=f"Item longer than {MAX_ITEM_BYTES} bytes")
+                    break
+                yield buffer[position:end]
+                position = end
+                expected = "separator"
+            elif character == "]" and expected in ("first item", "separator"):
+                position += 1
+                expected = "nothing"
+            elif character == "," and expected == "separator":
+                position += 1
+                expected = "item"
+            else:
+                raise HTTPException(status_code=400, detail=f"Malformed JSON array: unexpected {character!r}")
+    if expected != "nothing":
+        raise HTTPException(status_code=400, detail="Malformed JSON array: unexpected end of the body")
+
+
+def iter_json_items(request: Request) -> AsyncIterator[str]:
+    """Yield the JSON text of every item of the body of `request`, a JSON array or NDJSON, as it is received."""
+    if is_ndjson(request):
+        return iter_ndjson_items(request.stream())
+    return iter_json_array_items(request.stream())
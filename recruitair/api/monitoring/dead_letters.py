@@ -0,0 +1,29 @@
+from prometheus_client import Counter, Histogram
+
+LIST_DEAD_LETTERS_REQUESTS = Counter(
+    "list_dead_letters_requests_total", "Total number of list dead-lettered items requests", ["kind"]
+)
+LIST_DEAD_LETTERS_REQUESTS_ERRORS = Counter(
+    "list_dead_letters_requests_errors_total", "Total number of list dead-lettered items request errors", ["kind"]
+)
+LIST_DEAD_LETTERS_REQUESTS_TIME = Histogram(
+    "list_dead_letters_requests_time_seconds", "Time spent processing list dead-lettered items requests", ["kind"]
+)
+
+
+REQUEUE_DEAD_LETTERS_REQUESTS = Counter(
+    "requeue_dead_letters_requests_total", "Total number of re-queue dead-lettered items requests", ["kind"]
+)
+REQUEUE_DEAD_LETTERS_REQUESTS_ERRORS = Counter(
+    "requeue_dead_letters_requests_errors_total",
+    "Total number of re-queue dead-lettered items request errors",
+    ["kind"],
+)
+REQUEUE_DEAD_LETTERS_REQUESTS_TIME = Histogram(
+    "requeue_dead_letters_requests_time_seconds",
+    "Time spent processing re-queue dead-lettered items requests",
+    ["kind"],
+)
+DEAD_LETTERS_REQUEUED = Counter(
+    "dead_letters_requeued_total", "Total number of dead-lettered items re-queued", ["kind"]
+)
@@ -15,6 +15,26 @@ CREATE_OFFER_TEXT_LENGTH = Histogram(
 )
 
 
+BULK_CREATE_OFFERS_REQUESTS = Counter(
+    "bulk_create_job_offers_requests_total", "Total number of bulk create job offers requests"
+)
+BULK_CREATE_OFFERS_REQUESTS_ERRORS = Counter(
+    "bulk_create_job_offers_requests_errors_total", "Total number of bulk create job offers request errors"
+)
+BULK_CREATE_OFFERS_REQUESTS_TIME = Histogram(
+    "bulk_create_job_offers_requests_time_seconds",
+    "Time spent processing bulk create job offers requests",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+BULK_CREATE_OFFERS_ITEMS_PER_REQUEST = Histogram(
+    "bulk_create_job_offers_items_per_request",
+    "Number of items received per bulk create job offers request",
+    buckets=(1, 10, 100, 1000, 10000, 100000),
+)
+BULK_CREATE_OFFERS_REJECTED_ITEMS = Counter(
+    "bulk_create_job_offers_rejected_items_total", "Total number of items rejected by bulk create job offers requests"
+)
+
 LIST_OFFERS_REQUESTS = Counter("list_job_offers_requests_total", "Total number of list job offers requests")
 LIST_OFFERS_REQUESTS_ERRORS = Counter(
     "list_job_offers_requests_errors_total", "Total number of list job offers request errors"
@@ -0,0 +1,103 @@
+import base64
+import binascii
+import json
+from typing import Any, List, NamedTuple, Optional, Sequence, Union
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import ColumnElement, Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+class PageCursor(BaseModel):
+    """
+    Boundary of a page in a listing ordered by id: the rows after `id`, or before it if `backward`. The id of a listing
+    ordered by several columns is the list of their values.
+    """
+
+    id: Union[int, List[int]]
+    backward: bool = False
+
+
+def encode_cursor(cursor: PageCursor) -> str:
+    return base64.urlsafe_b64encode(cursor.model_dump_json().encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> PageCursor:
+    try:
+        return PageCursor.model_validate_json(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, ValueError, ValidationError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class Page(NamedTuple):
+    results: List[Any]
+    next_cursor: Optional[str]
+    previous_cursor: Optional[str]
+
+
+async def fetch_page(
+    db: AsyncSession,
+    query: Select,
+    key: Union[InstrumentedAttribute, Sequence[InstrumentedAttribute]],
+    limit: int,
+    offset: int,
+    cursor: Optional[str],
+    rank: Optional[ColumnElement[float]] = None,
+) -> Page:
+    """
+    Fetch a page of `query` ordered by its unique integer column `key`, or by the columns of its unique `key` in turn.
+
+    With a `cursor`, the page resumes from a range predicate on `key`, so that deep pages cost as much as the first one
+    given an index on the filtered columns followed by `key`. Without one, it is the page at `offset`. The cursors of
+    the pages around it are returned if there may be rows there.
+
+    Given a `rank`, rows are ordered by it instead, highest first, and paged with `offset` only.
+    """
+    columns = [key] if isinstance(key, InstrumentedAttribute) else list(key)
+    if rank is not None:
+        if cursor is not None:
+            raise HTTPException(status_code=400, detail="Ranked search results are paged with an offset, not a cursor")
+        results = (await db.scalars(query.order_by(rank.desc(), *columns).offset(offset).limit(limit))).all()
+        return Page(list(results), None, None)
+    if cursor is not None and offset:
+        raise HTTPException(status_code=400, detail="Use either a cursor or an offset, not both")
+    position = decode_cursor(cursor) if cursor is not None else None
+    sort_key = columns[0] if len(columns) == 1 else tuple_(*columns)
+
+    def key_of(row: Any) -> Union[int, List[int]]:
+        values = [getattr(row, column.key) for column in columns]
+        return values[0] if len(columns) == 1 else values
+
+    def bound(value: Union[int, List[int]]) -> Any:
+        return value if len(columns) == 1 else tuple_(*value)
+
+    if position is not None and len(position.id if isinstance(position.id, list) else [position.id]) != len(columns):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # One more row is fetched to tell whether there is a page beyond this one
+    if position is None:
+        rows = (await db.scalars(query.order_by(*columns).offset(offset).limit(limit + 1))).all()
+    elif position.backward:
+        descending = [column.desc() for column in columns]
+        rows = (
+            await db.scalars(query.where(sort_key < bound(position.id)).order_by(*descending).limit(limit + 1))
+        ).all()
+    else:
+        rows = (await db.scalars(query.where(sort_key > bound(position.id)).order_by(*columns).limit(limit + 1))).all()
+
+    has_more = len(rows) > limit
+    results = list(rows[:limit])
+    if not results:
+        return Page(results, None, None)
+    if position is not None and position.backward:
+        results.reverse()
+        # The rows after the page, from which the cursor was taken, may have been deleted since
+        after_page = query.where(sort_key > bound(key_of(results[-1]))).order_by(*columns).limit(1)
+        has_next, has_previous = (await db.scalars(after_page)).first() is not None, has_more
+    else:
+        has_next, has_previous = has_more, position is not None or offset > 0
+
+    next_cursor = encode_cursor(PageCursor(id=key_of(results[-1]))) if has_next else None
+    previous_cursor = encode_cursor(PageCursor(id=key_of(results[0]), backward=True)) if has_previous else None
+    return Page(results, next_cursor, previous_cursor)
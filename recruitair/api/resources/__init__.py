@@ -1,5 +1,11 @@
 from .applicants import create_applicants, get_applicants
 from .criteria import add_job_offer_criteria, get_job_offer_criteria, update_criterion
+from .dead_letters import (
+    list_dead_letter_evaluations,
+    list_dead_letter_job_offers,
+    requeue_dead_letter_evaluations,
+    requeue_dead_letter_job_offer,
+)
 from .job_offers import create_job_offer, get_job_offer, list_job_offers
 from .scores import get_applicant_score, update_applicant_score
 
@@ -14,4 +20,8 @@ __all__ = [
     "update_criterion",
     "get_applicant_score",
     "update_applicant_score",
+    "list_dead_letter_job_offers",
+    "requeue_dead_letter_job_offer",
+    "list_dead_letter_evaluations",
+    "requeue_dead_letter_evaluations",
 ]
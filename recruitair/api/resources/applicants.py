@@ -3,8 +3,10 @@ from typing import List, Optional
 
 from fastapi import HTTPException
 from pydantic import BaseModel, Field
+from sqlalchemy import insert, select
 
-from ...database.models import Applicant, ApplicantSchema, JobOffer
+from ...database.models import Applicant, ApplicantSchema, JobOffer, enqueue_evaluations, keyword_search
+from ...database.notifications import EVALUATION_CHANNEL, notify_async
 from .. import SessionDep, app
 from ..monitoring.applicants import (
     APPLICANT_CV_LENGTH,
@@ -18,6 +20,7 @@ from ..monitoring.applicants import (
     GET_APPLICANTS_REQUESTS_ERRORS,
     GET_APPLICANTS_REQUESTS_TIME,
 )
+from ..pagination import fetch_page
 
 
 class CreateApplicantsRequest(BaseModel):
@@ -37,23 +40,30 @@ class CreateApplicantsResponse(BaseModel):
 
 
 @app.post("/job_offers/{offer_id}/applicants", tags=["Applicants"])
-def create_applicants(offer_id: int, request: CreateApplicantsRequest, db: SessionDep) -> CreateApplicantsResponse:
+async def create_applicants(
+    offer_id: int, request: CreateApplicantsRequest, db: SessionDep
+) -> CreateApplicantsResponse:
     CREATE_APPLICANTS_REQUESTS.inc()
     time_start = time.monotonic()
     try:
-        offer = db.query(JobOffer).filter(JobOffer.id == offer_id).first()
+        offer = await db.get(JobOffer, offer_id)
         if not offer:
             raise HTTPException(status_code=404, detail="Offer not found")
 
         created_applicants: List[Applicant] = []
-        for item in request.applicants:
-            APPLICANT_CV_LENGTH.observe(len(item.cv))
-            new_applicant = Applicant(cv=item.cv, offer_id=offer_id)
-            db.add(new_applicant)
-            created_applicants.append(new_applicant)
-        db.commit()
-        for applicant in created_applicants:
-            db.refresh(applicant)
+        if request.applicants:
+            for item in request.applicants:
+                APPLICANT_CV_LENGTH.observe(len(item.cv))
+            # A single INSERT ... RETURNING, which loads the applicants with their generated columns
+            created_applicants = list(
+                await db.scalars(
+                    insert(Applicant).returning(Applicant, sort_by_parameter_order=True),
+                    [{"cv": item.cv, "offer_id": offer_id} for item in request.applicants],
+                )
+            )
+        await db.execute(enqueue_evaluations(Applicant.id.in_([applicant.id for applicant in created_applicants])))
+        await notify_async(db, EVALUATION_CHANNEL)
+        await db.commit()
     except Exception as e:
         CREATE_APPLICANTS_REQUESTS_ERRORS.inc()
         raise e
@@ -69,28 +79,51 @@ def create_applicants(offer_id: int, request: CreateApplicantsRequest, db: Sessi
 
 class GetApplicantsResponse(BaseModel):
     applicants: List[ApplicantSchema] = Field(..., description="List of applicants for the job offer")
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page, if there may be one")
+    previous_cursor: Optional[str] = Field(None, description="Cursor of the previous page, if there may be one")
 
 
 @app.get("/job_offers/{offer_id}/applicants", tags=["Applicants"])
-def get_applicants(
-    offer_id: int, db: SessionDep, limit: int = 100, offset: int = 0, cv: Optional[str] = None
+async def get_applicants(
+    offer_id: int,
+    db: SessionDep,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    cv: Optional[str] = None,
+    q: Optional[str] = None,
 ) -> GetApplicantsResponse:
+    """
+    List the applicants of the job offer by id, page by page. Pass the `next_cursor` or `previous_cursor` of a page as
+    `cursor` to get the page after or before it, at the same cost however deep it is.
+
+    `cv` filters the applicants whose CV contains it. `q` searches keywords, in web search syntax (e.g. `python -java
+    "data engineer"`), and lists the matching applicants by relevance, paged with `offset`.
+    """
     GET_APPLICANTS_REQUESTS.inc()
     time_start = time.monotonic()
     try:
-        offer = db.query(JobOffer).filter(JobOffer.id == offer_id).first()
+        offer = await db.get(JobOffer, offer_id)
         if not offer:
             raise HTTPException(status_code=404, detail="Offer not found")
 
-        query = db.query(Applicant).filter(Applicant.offer_id == offer_id)
+        query = select(Applicant).where(Applicant.offer_id == offer_id)
         if cv:
-            query = query.filter(Applicant.cv.contains(cv))
-        results = query.order_by(Applicant.id).offset(offset).limit(limit).all()
+            query = query.where(Applicant.cv.contains(cv))
+        rank = None
+        if q:
+            match, rank = keyword_search(db.bind.dialect.name, Applicant.cv, q)
+            query = query.where(match)
+        page = await fetch_page(db, query, Applicant.id, limit, offset, cursor, rank)
     except Exception as e:
         GET_APPLICANTS_REQUESTS_ERRORS.inc()
         raise e
     finally:
         elapsed_time = time.monotonic() - time_start
         GET_APPLICANTS_REQUESTS_TIME.observe(elapsed_time)
-    APPLICANTS_RETURNED_PER_REQUEST.observe(len(results))
-    return GetApplicantsResponse(applicants=[applicant.to_dict() for applicant in results])
+    APPLICANTS_RETURNED_PER_REQUEST.observe(len(page.results))
+    return GetApplicantsResponse(
+        applicants=[applicant.to_dict() for applicant in page.results],
+        next_cursor=page.next_cursor,
+        previous_cursor=page.previous_cursor,
+    )
@@ -3,10 +3,12 @@ from typing import List, Optional
 
 from fastapi import HTTPException
 from pydantic import BaseModel, Field
+from sqlalchemy import delete, insert, select
 
 from recruitair.database.models.applicant_score import ApplicantScore
 
-from ...database.models import Criterion, CriterionSchema, JobOffer
+from ...database.models import Criterion, CriterionSchema, JobOffer, enqueue_evaluations
+from ...database.notifications import EVALUATION_CHANNEL, notify_async
 from .. import SessionDep, app
 from ..monitoring.criteria import (
     CREATE_CRITERIA_DESCRIPTION_LENGTH,
@@ -40,14 +42,14 @@ class GetJobOfferCriteriaResponse(BaseModel):
 
 
 @app.get("/job_offers/{offer_id}/criteria", tags=["Criteria"])
-def get_job_offer_criteria(offer_id: int, db: SessionDep) -> GetJobOfferCriteriaResponse:
+async def get_job_offer_criteria(offer_id: int, db: SessionDep) -> GetJobOfferCriteriaResponse:
     GET_CRITERIA_REQUESTS.inc()
     time_start = time.monotonic()
     try:
-        offer = db.query(JobOffer).filter(JobOffer.id == offer_id).first()
+        offer = await db.get(JobOffer, offer_id)
         if not offer:
             raise HTTPException(status_code=404, detail="Offer not found")
-        criteria = db.query(Criterion).filter(Criterion.offer_id == offer_id).all()
+        criteria = (await db.scalars(select(Criterion).where(Criterion.offer_id == offer_id))).all()
     except Exception as e:
         GET_CRITERIA_REQUESTS_ERRORS.inc()
         raise e
@@ -68,25 +70,33 @@ class AddJobOfferCriteriaResponse(BaseModel):
 
 
 @app.post("/job_offers/{offer_id}/criteria", tags=["Criteria"])
-def add_job_offer_criteria(
+async def add_job_offer_criteria(
     offer_id: int, request: AddJobOfferCriteriaRequest, db: SessionDep
 ) -> AddJobOfferCriteriaResponse:
     CREATE_CRITERIA_REQUESTS.inc()
     time_start = time.monotonic()
     try:
-        offer = db.query(JobOffer).filter(JobOffer.id == offer_id).first()
+        offer = await db.get(JobOffer, offer_id)
         if not offer:
             raise HTTPException(status_code=404, detail="Offer not found")
         created_criteria: List[Criterion] = []
-        for item in request.criteria:
-            CREATE_CRITERIA_DESCRIPTION_LENGTH.observe(len(item.description))
-            CREATE_CRITERIA_IMPORTANCE.observe(item.importance)
-            new_criterion = Criterion(offer_id=offer_id, description=item.description, importance=item.importance)
-            db.add(new_criterion)
-            created_criteria.append(new_criterion)
-        db.commit()
-        for criterion in created_criteria:
-            db.refresh(criterion)
+        if request.criteria:
+            for item in request.criteria:
+                CREATE_CRITERIA_DESCRIPTION_LENGTH.observe(len(item.description))
+                CREATE_CRITERIA_IMPORTANCE.observe(item.importance)
+            # A single INSERT ... RETURNING, which loads the criteria with their generated columns
+            created_criteria = list(
+                await db.scalars(
+                    insert(Criterion).returning(Criterion, sort_by_parameter_order=True),
+                    [
+                        {"offer_id": offer_id, "description": item.description, "importance": item.importance}
+                        for item in request.criteria
+                    ],
+                )
+            )
+        await db.execute(enqueue_evaluations(Criterion.id.in_([criterion.id for criterion in created_criteria])))
+        await notify_async(db, EVALUATION_CHANNEL)
+        await db.commit()
     except Exception as e:
         CREATE_CRITERIA_REQUESTS_ERRORS.inc()
         raise e
@@ -113,27 +123,32 @@ class UpdateCriterionResponse(BaseModel):
 
 
 @app.put("/job_offers/{offer_id}/criteria/{criterion_id}", tags=["Criteria"])
-def update_criterion(
+async def update_criterion(
     offer_id: int, criterion_id: int, request: UpdateCriterionRequest, db: SessionDep
 ) -> UpdateCriterionResponse:
     UPDATE_CRITERION_REQUESTS.inc()
     time_start = time.monotonic()
     try:
-        offer = db.query(JobOffer).filter(JobOffer.id == offer_id).first()
+        offer = await db.get(JobOffer, offer_id)
         if not offer:
             raise HTTPException(status_code=404, detail="Offer not found")
-        criterion = db.query(Criterion).filter(Criterion.id == criterion_id, Criterion.offer_id == offer_id).first()
+        criterion = await db.scalar(
+            select(Criterion).where(Criterion.id == criterion_id, Criterion.offer_id == offer_id)
+        )
         if not criterion:
             raise HTTPException(status_code=404, detail="Criterion not found")
 
         if request.description is not None:
             criterion.description = request.description
             # In this case, remove all associated scores since the criterion has changed
-            db.query(ApplicantScore).filter(ApplicantScore.criteria_id == criterion_id).delete()
+            await db.execute(delete(ApplicantScore).where(ApplicantScore.criteria_id == criterion_id))
+            # ... and schedule the applicants to be evaluated again
+            await db.execute(enqueue_evaluations(Criterion.id == criterion_id))
+            await notify_async(db, EVALUATION_CHANNEL)
         if request.importance is not None:
             criterion.importance = request.importance
-        db.commit()
-        db.refresh(criterion)
+        await db.commit()
+        await db.refresh(criterion)
     except Exception as e:
         UPDATE_CRITERION_REQUESTS_ERRORS.inc()
         raise e
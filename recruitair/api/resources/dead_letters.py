@@ -0,0 +1,186 @@
+import time
+from typing import List, Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+
+from ...database.models import (
+    EvaluationTask,
+    EvaluationTaskSchema,
+    EvaluationTaskStatus,
+    JobOffer,
+    JobOfferSchema,
+    JobOfferStatus,
+    requeue_failed_evaluations,
+)
+from ...database.notifications import EVALUATION_CHANNEL, EXTRACTION_CHANNEL, notify_async
+from .. import SessionDep, app
+from ..monitoring.dead_letters import (
+    DEAD_LETTERS_REQUEUED,
+    LIST_DEAD_LETTERS_REQUESTS,
+    LIST_DEAD_LETTERS_REQUESTS_ERRORS,
+    LIST_DEAD_LETTERS_REQUESTS_TIME,
+    REQUEUE_DEAD_LETTERS_REQUESTS,
+    REQUEUE_DEAD_LETTERS_REQUESTS_ERRORS,
+    REQUEUE_DEAD_LETTERS_REQUESTS_TIME,
+)
+from ..pagination import fetch_page
+
+
+class DeadLetterJobOfferSchema(JobOfferSchema):
+    attempts: int = Field(..., description="Number of failed extraction attempts", examples=[5])
+    last_error: Optional[str] = Field(
+        None, description="Error of the last failed extraction attempt", examples=["TimeoutError: "]
+    )
+
+
+def dead_letter_job_offer(offer: JobOffer) -> DeadLetterJobOfferSchema:
+    return DeadLetterJobOfferSchema(
+        **offer.to_dict().model_dump(), attempts=offer.attempts, last_error=offer.last_error
+    )
+
+
+class ListDeadLetterJobOffersResponse(BaseModel):
+    job_offers: List[DeadLetterJobOfferSchema] = Field(
+        ..., description="Job offers whose criteria extraction failed on every attempt"
+    )
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page, if there may be one")
+    previous_cursor: Optional[str] = Field(None, description="Cursor of the previous page, if there may be one")
+
+
+@app.get("/dead_letters/job_offers", tags=["Dead Letters"])
+async def list_dead_letter_job_offers(
+    db: SessionDep, limit: int = 100, offset: int = 0, cursor: Optional[str] = None
+) -> ListDeadLetterJobOffersResponse:
+    """
+    List the dead-lettered job offers by id, page by page. Pass the `next_cursor` or `previous_cursor` of a page as
+    `cursor` to get the page after or before it.
+    """
+    LIST_DEAD_LETTERS_REQUESTS.labels(kind="job_offers").inc()
+    time_start = time.monotonic()
+    try:
+        query = select(JobOffer).where(JobOffer.status == JobOfferStatus.FAILED)
+        page = await fetch_page(db, query, JobOffer.id, limit, offset, cursor)
+    except Exception as e:
+        LIST_DEAD_LETTERS_REQUESTS_ERRORS.labels(kind="job_offers").inc()
+        raise e
+    finally:
+        elapsed_time = time.monotonic() - time_start
+        LIST_DEAD_LETTERS_REQUESTS_TIME.labels(kind="job_offers").observe(elapsed_time)
+    return ListDeadLetterJobOffersResponse(
+        job_offers=[dead_letter_job_offer(offer) for offer in page.results],
+        next_cursor=page.next_cursor,
+        previous_cursor=page.previous_cursor,
+    )
+
+
+class RequeueDeadLetterJobOfferResponse(BaseModel):
+    message: str = Field(..., description="Response message", examples=["Re-queued successfully"])
+    job_offer: JobOfferSchema = Field(..., description="Details of the re-queued job offer")
+
+
+@app.post("/dead_letters/job_offers/{offer_id}/requeue", tags=["Dead Letters"])
+async def requeue_dead_letter_job_offer(offer_id: int, db: SessionDep) -> RequeueDeadLetterJobOfferResponse:
+    REQUEUE_DEAD_LETTERS_REQUESTS.labels(kind="job_offers").inc()
+    time_start = time.monotonic()
+    try:
+        offer = await db.get(JobOffer, offer_id)
+        if not offer:
+            raise HTTPException(status_code=404, detail="Offer not found")
+        if offer.status != JobOfferStatus.FAILED:
+            raise HTTPException(status_code=409, detail="Offer is not dead-lettered")
+
+        # Give the offer a fresh set of attempts
+        offer.status = JobOfferStatus.PENDING
+        offer.attempts = 0
+        offer.next_attempt_at = None
+        offer.last_error = None
+        await notify_async(db, EXTRACTION_CHANNEL)
+        await db.commit()
+        await db.refresh(offer)
+    except Exception as e:
+        REQUEUE_DEAD_LETTERS_REQUESTS_ERRORS.labels(kind="job_offers").inc()
+        raise e
+    finally:
+        elapsed_time = time.monotonic() - time_start
+        REQUEUE_DEAD_LETTERS_REQUESTS_TIME.labels(kind="job_offers").observe(elapsed_time)
+    DEAD_LETTERS_REQUEUED.labels(kind="job_offers").inc()
+    return RequeueDeadLetterJobOfferResponse(message="Re-queued successfully", job_offer=offer.to_dict())
+
+
+class ListDeadLetterEvaluationsResponse(BaseModel):
+    evaluations: List[EvaluationTaskSchema] = Field(
+        ..., description="Applicant evaluations that failed on every attempt"
+    )
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page, if there may be one")
+    previous_cursor: Optional[str] = Field(None, description="Cursor of the previous page, if there may be one")
+
+
+@app.get("/dead_letters/evaluations", tags=["Dead Letters"])
+async def list_dead_letter_evaluations(
+    db: SessionDep, limit: int = 100, offset: int = 0, cursor: Optional[str] = None, offer_id: Optional[int] = None
+) -> ListDeadLetterEvaluationsResponse:
+    """
+    List the dead-lettered evaluations by applicant and criterion, page by page. Pass the `next_cursor` or
+    `previous_cursor` of a page as `cursor` to get the page after or before it.
+    """
+    LIST_DEAD_LETTERS_REQUESTS.labels(kind="evaluations").inc()
+    time_start = time.monotonic()
+    try:
+        query = select(EvaluationTask).where(EvaluationTask.status == EvaluationTaskStatus.FAILED)
+        if offer_id is not None:
+            query = query.where(EvaluationTask.offer_id == offer_id)
+        key = [EvaluationTask.applicant_id, EvaluationTask.criteria_id]
+        page = await fetch_page(db, query, key, limit, offset, cursor)
+    except Exception as e:
+        LIST_DEAD_LETTERS_REQUESTS_ERRORS.labels(kind="evaluations").inc()
+        raise e
+    finally:
+        elapsed_time = time.monotonic() - time_start
+        LIST_DEAD_LETTERS_REQUESTS_TIME.labels(kind="evaluations").observe(elapsed_time)
+    return ListDeadLetterEvaluationsResponse(
+        evaluations=[task.to_dict() for task in page.results],
+        next_cursor=page.next_cursor,
+        previous_cursor=page.previous_cursor,
+    )
+
+
+class RequeueDeadLetterEvaluationsRequest(BaseModel):
+    offer_id: Optional[int] = Field(None, description="Only re-queue the evaluations of this job offer", examples=[1])
+    applicant_id: Optional[int] = Field(None, description="Only re-queue the evaluations of this applicant")
+    criteria_id: Optional[int] = Field(None, description="Only re-queue the evaluations on this criterion")
+
+
+class RequeueDeadLetterEvaluationsResponse(BaseModel):
+    message: str = Field(..., description="Response message", examples=["Re-queued successfully"])
+    requeued: int = Field(..., description="Number of re-queued evaluations", examples=[3])
+
+
+@app.post("/dead_letters/evaluations/requeue", tags=["Dead Letters"])
+async def requeue_dead_letter_evaluations(
+    request: RequeueDeadLetterEvaluationsRequest, db: SessionDep
+) -> RequeueDeadLetterEvaluationsResponse:
+    """Re-queue the dead-lettered evaluations matching every given filter (all of them if no filter is given)."""
+    REQUEUE_DEAD_LETTERS_REQUESTS.labels(kind="evaluations").inc()
+    time_start = time.monotonic()
+    try:
+        filters = []
+        if request.offer_id is not None:
+            filters.append(EvaluationTask.offer_id == request.offer_id)
+        if request.applicant_id is not None:
+            filters.append(EvaluationTask.applicant_id == request.applicant_id)
+        if request.criteria_id is not None:
+            filters.append(EvaluationTask.criteria_id == request.criteria_id)
+        requeued = (await db.execute(requeue_failed_evaluations(*filters))).rowcount
+        if requeued:
+            await notify_async(db, EVALUATION_CHANNEL)
+        await db.commit()
+    except Exception as e:
+        REQUEUE_DEAD_LETTERS_REQUESTS_ERRORS.labels(kind="evaluations").inc()
+        raise e
+    finally:
+        elapsed_time = time.monotonic() - time_start
+        REQUEUE_DEAD_LETTERS_REQUESTS_TIME.labels(kind="evaluations").observe(elapsed_time)
+    DEAD_LETTERS_REQUEUED.labels(kind="evaluations").inc(requeued)
+    return RequeueDeadLetterEvaluationsResponse(message="Re-queued successfully", requeued=requeued)
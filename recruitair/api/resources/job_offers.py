@@ -1,13 +1,29 @@
 import time
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import HTTPException
-from pydantic import BaseModel, Field
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...database.models import JobOffer, JobOfferSchema, JobOfferStatus
+from ...database.models import (
+    MAX_PRIORITY,
+    JobOffer,
+    JobOfferSchema,
+    JobOfferStatus,
+    content_hash,
+    keyword_search,
+)
+from ...database.notifications import EXTRACTION_CHANNEL, notify_async
 from .. import SessionDep, app
+from ..bulk import NDJSON_MEDIA_TYPES, iter_json_items
 from ..monitoring.job_offers import (
+    BULK_CREATE_OFFERS_ITEMS_PER_REQUEST,
+    BULK_CREATE_OFFERS_REJECTED_ITEMS,
+    BULK_CREATE_OFFERS_REQUESTS,
+    BULK_CREATE_OFFERS_REQUESTS_ERRORS,
+    BULK_CREATE_OFFERS_REQUESTS_TIME,
     CREATE_OFFER_REQUESTS,
     CREATE_OFFER_REQUESTS_ERRORS,
     CREATE_OFFER_REQUESTS_TIME,
@@ -21,6 +37,7 @@ from ..monitoring.job_offers import (
     LIST_OFFERS_REQUESTS_TIME,
     LIST_OFFERS_RETURNED_PER_REQUEST,
 )
+from ..pagination import fetch_page
 
 
 class CreateJobOfferRequest(BaseModel):
@@ -29,6 +46,16 @@ class CreateJobOfferRequest(BaseModel):
         description="Text description of the job offer",
         examples=["Looking for a software engineer with experience in Python and FastAPI."],
     )
+    priority: int = Field(
+        0,
+        description=(
+            f"Priority class of the job offer, from 0 to {MAX_PRIORITY}. Offers of higher classes are extracted first, "
+            "and get a proportionally larger share of the evaluations"
+        ),
+        ge=0,
+        le=MAX_PRIORITY,
+        examples=[0],
+    )
 
 
 class CreateJobOfferResponse(BaseModel):
@@ -37,14 +64,15 @@ class CreateJobOfferResponse(BaseModel):
 
 
 @app.post("/job_offers", tags=["Job Offers"])
-def create_job_offer(request: CreateJobOfferRequest, db: SessionDep) -> CreateJobOfferResponse:
+async def create_job_offer(request: CreateJobOfferRequest, db: SessionDep) -> CreateJobOfferResponse:
     CREATE_OFFER_REQUESTS.inc()
     time_start = time.monotonic()
     try:
-        new_offer = JobOffer(text=request.text)
+        new_offer = JobOffer(text=request.text, priority=request.priority)
         db.add(new_offer)
-        db.commit()
-        db.refresh(new_offer)
+        await notify_async(db, EXTRACTION_CHANNEL)
+        await db.commit()
+        await db.refresh(new_offer)
     except Exception as e:
         CREATE_OFFER_REQUESTS_ERRORS.inc()
         raise e
@@ -56,38 +84,175 @@ def create_job_offer(request: CreateJobOfferRequest, db: SessionDep) -> CreateJo
     return CreateJobOfferResponse(message="Created successfully", job_offer=new_offer.to_dict())
 
 
+# Number of offers inserted per statement by the bulk endpoint
+BULK_INSERT_CHUNK_SIZE = 1000
+
+
+class BulkItemError(BaseModel):
+    index: int = Field(..., description="Position of the rejected item in the body, from 0", examples=[3])
+    errors: List[Dict[str, Any]] = Field(
+        ...,
+        description="Validation errors of the item",
+        examples=[[{"type": "missing", "loc": ["text"], "msg": "Field required"}]],
+    )
+
+
+class BulkCreateJobOffersResponse(BaseModel):
+    message: str = Field(..., description="Response message", examples=["Created 2 of 3 job offers"])
+    created: int = Field(..., description="Number of job offers created", examples=[2])
+    job_offer_ids: List[Optional[int]] = Field(
+        ...,
+        description=(
+            "Identifier of the job offer created for every item of the body, in order, or null if it was rejected"
+        ),
+        examples=[[1, 2, None]],
+    )
+    errors: List[BulkItemError] = Field(..., description="Items rejected because they are not valid job offers")
+
+
+async def insert_job_offers(db: AsyncSession, offers: List[CreateJobOfferRequest]) -> List[int]:
+    """Insert `offers` in one statement, returning their ids in the same order."""
+    statement = insert(JobOffer).returning(JobOffer.id, sort_by_parameter_order=True)
+    rows = [{"text": offer.text, "text_hash": content_hash(offer.text), "priority": offer.priority} for offer in offers]
+    return list(await db.scalars(statement, rows))
+
+
+@app.post(
+    "/job_offers/bulk",
+    tags=["Job Offers"],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": {"$ref": "#/components/schemas/CreateJobOfferRequest"}}
+                },
+                **{
+                    media_type: {"schema": {"type": "string", "description": "One job offer per line, in JSON"}}
+                    for media_type in NDJSON_MEDIA_TYPES
+                },
+            },
+        }
+    },
+)
+async def bulk_create_job_offers(request: Request, db: SessionDep) -> BulkCreateJobOffersResponse:
+    """
+    Create many job offers at once, from a JSON array or from NDJSON (one offer per line, with an NDJSON content type).
+
+    The body is read as it is received and inserted in chunks, in a single transaction committed once the whole body
+    was read: the request is all-or-nothing, and if it fails at any point (a malformed body, a failed insert, a
+    dropped connection) none of its offers are created, even those of the chunks already inserted. Items that are not
+    valid job offers are rejected without affecting the others. A body that is not a well-formed JSON array is rejected
+    as a whole.
+    """
+    BULK_CREATE_OFFERS_REQUESTS.inc()
+    time_start = time.monotonic()
+    job_offer_ids: List[Optional[int]] = []
+    errors: List[BulkItemError] = []
+    try:
+        # Valid offers not inserted yet, with their position in the body
+        pending: List[Tuple[int, CreateJobOfferRequest]] = []
+
+        async def insert_pending() -> None:
+            offer_ids = await insert_job_offers(db, [offer for _, offer in pending])
+            for (index, _), offer_id in zip(pending, offer_ids):
+                job_offer_ids[index] = offer_id
+            pending.clear()
+
+        async for item in iter_json_items(request):
+            index = len(job_offer_ids)
+            job_offer_ids.append(None)
+            try:
+                offer = CreateJobOfferRequest.model_validate_json(item)
+            except ValidationError as e:
+                errors.append(
+                    BulkItemError(
+                        index=index, errors=e.errors(include_url=False, include_context=False, include_input=False)
+                    )
+                )
+                continue
+            CREATE_OFFER_TEXT_LENGTH.observe(len(offer.text))
+            pending.append((index, offer))
+            if len(pending) == BULK_INSERT_CHUNK_SIZE:
+                await insert_pending()
+        if pending:
+            await insert_pending()
+        created = len(job_offer_ids) - len(errors)
+        if created:
+            await notify_async(db, EXTRACTION_CHANNEL)
+        await db.commit()
+    except Exception as e:
+        BULK_CREATE_OFFERS_REQUESTS_ERRORS.inc()
+        raise e
+    finally:
+        elapsed_time = time.monotonic() - time_start
+        BULK_CREATE_OFFERS_REQUESTS_TIME.observe(elapsed_time)
+    BULK_CREATE_OFFERS_ITEMS_PER_REQUEST.observe(len(job_offer_ids))
+    BULK_CREATE_OFFERS_REJECTED_ITEMS.inc(len(errors))
+    CREATED_OFFERS.inc(created)
+    return BulkCreateJobOffersResponse(
+        message=f"Created {created} of {len(job_offer_ids)} job offers",
+        created=created,
+        job_offer_ids=job_offer_ids,
+        errors=errors,
+    )
+
+
 class ListJobOffersResponse(BaseModel):
     job_offers: List[JobOfferSchema] = Field(..., description="List of job offers")
-    cursor: int = Field(..., description="Cursor for pagination")
+    cursor: int = Field(
+        ...,
+        description="Offset of the next page, when paging with `offset`. Deprecated: page with `next_cursor` instead",
+        deprecated=True,
+    )
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page, if there may be one")
+    previous_cursor: Optional[str] = Field(None, description="Cursor of the previous page, if there may be one")
 
 
 @app.get("/job_offers", tags=["Job Offers"])
-def list_job_offers(
+async def list_job_offers(
     db: SessionDep,
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = None,
     text: Optional[str] = None,
+    q: Optional[str] = None,
     status: Optional[JobOfferStatus] = None,
 ) -> ListJobOffersResponse:
+    """
+    List the job offers by id, page by page. Pass the `next_cursor` or `previous_cursor` of a page as `cursor` to get
+    the page after or before it, at the same cost however deep it is. Paging with `offset` is slower for deep pages.
+
+    `text` filters the offers whose text contains it. `q` searches keywords, in web search syntax (e.g. `python -java
+    "data engineer"`), and lists the matching offers by relevance, paged with `offset`.
+    """
     LIST_OFFERS_REQUESTS.inc()
     time_start = time.monotonic()
     try:
-        query = db.query(JobOffer)
+        query = select(JobOffer)
         if text:
-            query = query.filter(JobOffer.text.contains(text))
+            query = query.where(JobOffer.text.contains(text))
         if status:
-            query = query.filter(JobOffer.status == status)
+            query = query.where(JobOffer.status == status)
+        rank = None
+        if q:
+            match, rank = keyword_search(db.bind.dialect.name, JobOffer.text, q)
+            query = query.where(match)
 
-        results = query.order_by(JobOffer.id).offset(offset).limit(limit).all()
-        cursor = offset + len(results)
+        page = await fetch_page(db, query, JobOffer.id, limit, offset, cursor, rank)
     except Exception as e:
         LIST_OFFERS_REQUESTS_ERRORS.inc()
         raise e
     finally:
         elapsed_time = time.monotonic() - time_start
         LIST_OFFERS_REQUESTS_TIME.observe(elapsed_time)
-    LIST_OFFERS_RETURNED_PER_REQUEST.observe(len(results))
-    return ListJobOffersResponse(job_offers=[offer.to_dict() for offer in results], cursor=cursor)
+    LIST_OFFERS_RETURNED_PER_REQUEST.observe(len(page.results))
+    return ListJobOffersResponse(
+        job_offers=[offer.to_dict() for offer in page.results],
+        cursor=offset + len(page.results),
+        next_cursor=page.next_cursor,
+        previous_cursor=page.previous_cursor,
+    )
 
 
 class GetJobOfferResponse(BaseModel):
@@ -95,11 +260,11 @@ class GetJobOfferResponse(BaseModel):
 
 
 @app.get("/job_offers/{offer_id}", tags=["Job Offers"])
-def get_job_offer(offer_id: int, db: SessionDep) -> GetJobOfferResponse:
+async def get_job_offer(offer_id: int, db: SessionDep) -> GetJobOfferResponse:
     GET_OFFER_REQUESTS.inc()
     time_start = time.monotonic()
     try:
-        offer = db.query(JobOffer).filter(JobOffer.id == offer_id).first()
+        offer = await db.get(JobOffer, offer_id)
         if not offer:
             raise HTTPException(status_code=404, detail="Offer not found")
     except Exception as e:
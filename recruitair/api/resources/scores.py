@@ -4,6 +4,7 @@ from typing import Any, Dict, List, Optional
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
+from sqlalchemy import select
 
 from ...database.models import (
     Applicant,
@@ -34,20 +35,22 @@ class GetApplicantScoresResponse(BaseModel):
 
 
 @app.get("/job_offers/{offer_id}/applicants/{applicant_id}/scores", tags=["Scores"])
-def get_applicant_scores(offer_id: int, applicant_id: int, db: SessionDep) -> GetApplicantScoresResponse:
+async def get_applicant_scores(offer_id: int, applicant_id: int, db: SessionDep) -> GetApplicantScoresResponse:
     GET_SCORES_REQUESTS.inc()
     time_start = time.monotonic()
     try:
-        offer = db.query(JobOffer).filter(JobOffer.id == offer_id).first()
+        offer = await db.get(JobOffer, offer_id)
         if not offer:
             raise HTTPException(status_code=404, detail="Offer not found")
 
-        applicant = db.query(Applicant).filter(Applicant.id == applicant_id, Applicant.offer_id == offer_id).first()
+        applicant = await db.scalar(
+            select(Applicant).where(Applicant.id == applicant_id, Applicant.offer_id == offer_id)
+        )
 
         if not applicant:
             raise HTTPException(status_code=404, detail="Applicant not found")
 
-        scores = db.query(ApplicantScore).filter(ApplicantScore.applicant_id == applicant_id).all()
+        scores = (await db.scalars(select(ApplicantScore).where(ApplicantScore.applicant_id == applicant_id))).all()
         if not scores:
             raise HTTPException(status_code=404, detail="Scores not found for the applicant")
         for score in scores:
@@ -68,29 +71,33 @@ class GetApplicantScoreResponse(BaseModel):
 
 
 @app.get("/job_offers/{offer_id}/applicants/{applicant_id}/scores/{criterion_id}", tags=["Scores"])
-def get_applicant_score(
+async def get_applicant_score(
     offer_id: int, applicant_id: int, criterion_id: int, db: SessionDep
 ) -> GetApplicantScoreResponse:
     GET_SCORE_REQUESTS.inc()
     time_start = time.monotonic()
     try:
-        offer = db.query(JobOffer).filter(JobOffer.id == offer_id).first()
+        offer = await db.get(JobOffer, offer_id)
         if not offer:
             raise HTTPException(status_code=404, detail="Offer not found")
 
-        applicant = db.query(Applicant).filter(Applicant.id == applicant_id, Applicant.offer_id == offer_id).first()
+        applicant = await db.scalar(
+            select(Applicant).where(Applicant.id == applicant_id, Applicant.offer_id == offer_id)
+        )
 
         if not applicant:
             raise HTTPException(status_code=404, detail="Applicant not found")
 
-        criterion = db.query(Criterion).filter(Criterion.id == criterion_id, Criterion.offer_id == offer_id).first()
+        criterion = await db.scalar(
+            select(Criterion).where(Criterion.id == criterion_id, Criterion.offer_id == offer_id)
+        )
         if not criterion:
             raise HTTPException(status_code=404, detail="Criterion not found")
 
-        score = (
-            db.query(ApplicantScore)
-            .filter(ApplicantScore.applicant_id == applicant_id, ApplicantScore.criteria_id == criterion_id)
-            .first()
+        score = await db.scalar(
+            select(ApplicantScore).where(
+                ApplicantScore.applicant_id == applicant_id, ApplicantScore.criteria_id == criterion_id
+            )
         )
         if not score:
             raise HTTPException(status_code=404, detail="Score has not been computed yet")
@@ -114,36 +121,40 @@ class UpdateApplicantScoreResponse(BaseModel):
 
 
 @app.put("/job_offers/{offer_id}/applicants/{applicant_id}/scores/{criterion_id}", tags=["Scores"])
-def update_applicant_score(
+async def update_applicant_score(
     offer_id: int, applicant_id: int, criterion_id: int, request: UpdateApplicantScoreRequest, db: SessionDep
 ) -> UpdateApplicantScoreResponse:
     UPDATE_SCORE_REQUESTS.inc()
     time_start = time.monotonic()
     try:
-        offer = db.query(JobOffer).filter(JobOffer.id == offer_id).first()
+        offer = await db.get(JobOffer, offer_id)
         if not offer:
             raise HTTPException(status_code=404, detail="Offer not found")
 
-        applicant = db.query(Applicant).filter(Applicant.id == applicant_id, Applicant.offer_id == offer_id).first()
+        applicant = await db.scalar(
+            select(Applicant).where(Applicant.id == applicant_id, Applicant.offer_id == offer_id)
+        )
 
         if not applicant:
             raise HTTPException(status_code=404, detail="Applicant not found")
 
-        criterion = db.query(Criterion).filter(Criterion.id == criterion_id, Criterion.offer_id == offer_id).first()
+        criterion = await db.scalar(
+            select(Criterion).where(Criterion.id == criterion_id, Criterion.offer_id == offer_id)
+        )
         if not criterion:
             raise HTTPException(status_code=404, detail="Criterion not found")
 
-        score = (
-            db.query(ApplicantScore)
-            .filter(ApplicantScore.applicant_id == applicant_id, ApplicantScore.criteria_id == criterion_id)
-            .first()
+        score = await db.scalar(
+            select(ApplicantScore).where(
+                ApplicantScore.applicant_id == applicant_id, ApplicantScore.criteria_id == criterion_id
+            )
         )
         if not score:
             raise HTTPException(status_code=404, detail="Score has not been computed yet")
 
         score.score = request.score
-        db.commit()
-        db.refresh(score)
+        await db.commit()
+        await db.refresh(score)
         UPDATE_SCORE_VALUE_DIFFERENCE.observe(request.score - float(score.score))
     except Exception as e:
         UPDATE_SCORE_REQUESTS_ERRORS.inc()
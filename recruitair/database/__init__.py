@@ -10,6 +10,12 @@ from sqlalchemy.orm import Session, sessionmaker
 from .db_settings import DBSettings
 
 
+def get_pool_options(settings: DBSettings) -> dict:
+    """Connection pool options of the engines, leaving the defaults of SQLAlchemy for those that are not set."""
+    options = {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow}
+    return {key: value for key, value in options.items() if value is not None}
+
+
 def get_engine():
     settings = DBSettings()
     database_url = URL.create(
@@ -20,7 +26,7 @@ def get_engine():
         port=settings.db_port,
         database=settings.db_database,
     )
-    engine = create_engine(database_url)
+    engine = create_engine(database_url, **get_pool_options(settings))
     return engine
 
 
@@ -34,7 +40,7 @@ def get_async_engine():
         port=settings.db_port,
         database=settings.db_database,
     )
-    async_engine = create_async_engine(async_database_url)
+    async_engine = create_async_engine(async_database_url, **get_pool_options(settings))
     return async_engine
 
 
@@ -49,6 +55,11 @@ def get_db_session() -> Iterator[Session]:
         yield session
 
 
+async def get_async_db_session() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
 @asynccontextmanager
 async def get_async_session() -> AsyncIterator[AsyncSession]:
     async with AsyncSessionLocal() as session:
@@ -13,3 +13,9 @@ class DBSettings(BaseSettings):
     db_database: Optional[str] = Field(None, description="Database name or path to the SQLite file")
     db_driver: str = "postgresql"
     db_async_driver: str = "postgresql+asyncpg"
+    db_pool_size: Optional[int] = Field(
+        None, description="Number of connections each engine keeps open (default of SQLAlchemy if unset)"
+    )
+    db_max_overflow: Optional[int] = Field(
+        None, description="Connections each engine may open beyond its pool size (default of SQLAlchemy if unset)"
+    )
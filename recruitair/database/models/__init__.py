@@ -2,6 +2,8 @@
 # Criterion
 # Applicant
 # Applicant Score
+# Evaluation Task
+# Evaluation Cache
 
 
 from sqlalchemy.orm import declarative_base, registry
@@ -11,8 +13,45 @@ mapper_registry = registry()
 
 
 from .applicant import Applicant, ApplicantSchema
-from .applicant_score import ApplicantScore, ApplicantScoreSchema
+from .applicant_score import ApplicantScore, ApplicantScoreSchema, insert_scores
+from .bulk import dialect_insert
 from .criterion import Criterion, CriterionSchema
-from .job_offer import JobOffer, JobOfferSchema, JobOfferStatus
+from .evaluation_cache import (
+    EvaluationCacheEntry,
+    EvaluationCacheEntrySchema,
+    cache_evaluations,
+    content_hash,
+)
+from .evaluation_task import (
+    EvaluationTask,
+    EvaluationTaskSchema,
+    EvaluationTaskStatus,
+    SchedulingPolicy,
+    claim_evaluations,
+    dequeue_evaluations,
+    enqueue_evaluations,
+    release_evaluations,
+    requeue_failed_evaluations,
+)
+from .job_offer import (
+    MAX_PRIORITY,
+    JobOffer,
+    JobOfferSchema,
+    JobOfferStatus,
+    claim_job_offers,
+    complete_job_offers,
+    extracted_duplicates,
+    reap_job_offer_leases,
+)
+from .search import keyword_search
 
-__all__ = ["Applicant", "ApplicantScore", "Criterion", "JobOffer", "JobOfferStatus"]
+__all__ = [
+    "Applicant",
+    "ApplicantScore",
+    "Criterion",
+    "EvaluationCacheEntry",
+    "EvaluationTask",
+    "EvaluationTaskStatus",
+    "JobOffer",
+    "JobOfferStatus",
+]
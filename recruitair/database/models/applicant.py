@@ -5,11 +5,12 @@ from typing import Any, Dict, Optional
 from pydantic import BaseModel, Field
 from sqlalchemy import TIMESTAMP, Column
 from sqlalchemy import Enum as SQLAlchemyEnum
-from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy import ForeignKey, Index, Integer, String
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import text as sql_text
 
 from . import Base
+from .search import add_search_vector
 
 
 class ApplicantSchema(BaseModel):
@@ -27,6 +28,14 @@ class ApplicantSchema(BaseModel):
 
 class Applicant(Base):
     __tablename__ = "applicants"
+    __table_args__ = (
+        # Serves the keyset pagination of the applicants of an offer
+        Index("ix_applicants_offer_id_id", "offer_id", "id"),
+        # Serves the substring search in the CVs on PostgreSQL
+        Index("ix_applicants_cv_trgm", "cv", postgresql_using="gin", postgresql_ops={"cv": "gin_trgm_ops"}).ddl_if(
+            dialect="postgresql"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     cv = Column(String, nullable=False)
@@ -40,3 +49,7 @@ class Applicant(Base):
             offer_id=self.offer_id,
             created_at=self.created_at,
         )
+
+
+# Serves the keyword search in the CVs on PostgreSQL
+add_search_vector(Applicant.__table__, "cv")
@@ -5,11 +5,12 @@ from typing import Any, Dict, Optional
 from pydantic import BaseModel, Field
 from sqlalchemy import TIMESTAMP, Column
 from sqlalchemy import Enum as SQLAlchemyEnum
-from sqlalchemy import Float, ForeignKey, Integer, String
+from sqlalchemy import Float, ForeignKey, Insert, Integer, String
 from sqlalchemy import text as sql_text
 from sqlalchemy.dialects.postgresql import JSONB
 
 from . import Base
+from .bulk import dialect_insert
 
 
 class ApplicantScoreSchema(BaseModel):
@@ -42,3 +43,13 @@ class ApplicantScore(Base):
             score=self.score,
             created_at=self.created_at,
         )
+
+
+def insert_scores(dialect_name: str) -> Insert:
+    """
+    Build a statement that writes scores, to be executed with a list of rows. Scores that already exist (written by
+    another worker, or set by hand through the API) are kept, so a duplicate never fails the whole write.
+    """
+    return dialect_insert(dialect_name, ApplicantScore).on_conflict_do_nothing(
+        index_elements=[ApplicantScore.criteria_id, ApplicantScore.applicant_id]
+    )
@@ -0,0 +1,12 @@
+from sqlalchemy import Insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_insert(dialect_name: str, model) -> Insert:
+    """
+    INSERT statement for `model` supporting ON CONFLICT clauses, which are dialect specific in SQLAlchemy. Executed
+    with a list of rows, it is sent as multi-row INSERTs.
+    """
+    if dialect_name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
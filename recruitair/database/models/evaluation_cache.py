@@ -0,0 +1,55 @@
+import hashlib
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+from sqlalchemy import TIMESTAMP, Column, Float, Insert, String
+from sqlalchemy import text as sql_text
+
+from . import Base
+from .bulk import dialect_insert
+
+
+def content_hash(text: str) -> str:
+    """Hash identifying a CV or criterion description by its content."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EvaluationCacheEntrySchema(BaseModel):
+    cv_hash: str = Field(..., description="SHA-256 of the evaluated CV text")
+    criterion_hash: str = Field(..., description="SHA-256 of the criterion description the CV was evaluated on")
+    model_version: str = Field(
+        ..., description="Version of the evaluator model that computed the score", examples=["v1"]
+    )
+    score: float = Field(..., description="Score computed by the evaluator", ge=0, le=1, examples=[0.85])
+    created_at: datetime = Field(
+        ..., description="Timestamp when the score was cached", examples=["2025-12-01T13:56:26.136274+00:00"]
+    )
+
+
+class EvaluationCacheEntry(Base):
+    """Score of a CV on a criterion description, shared by every applicant and criterion with the same texts."""
+
+    __tablename__ = "evaluation_cache"
+
+    cv_hash = Column(String(64), nullable=False, primary_key=True)
+    criterion_hash = Column(String(64), nullable=False, primary_key=True)
+    model_version = Column(String, nullable=False, primary_key=True)
+    score = Column(Float, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=sql_text("CURRENT_TIMESTAMP"))
+
+    def to_dict(self) -> EvaluationCacheEntrySchema:
+        return EvaluationCacheEntrySchema(
+            cv_hash=self.cv_hash,
+            criterion_hash=self.criterion_hash,
+            model_version=self.model_version,
+            score=self.score,
+            created_at=self.created_at,
+        )
+
+
+def cache_evaluations(dialect_name: str) -> Insert:
+    """
+    Build a statement that caches evaluation results, to be executed with a list of rows. Entries that are already
+    cached (e.g. written concurrently by another worker) are left untouched.
+    """
+    return dialect_insert(dialect_name, EvaluationCacheEntry).on_conflict_do_nothing()
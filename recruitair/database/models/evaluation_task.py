@@ -0,0 +1,287 @@
+from datetime import datetime
+from enum import Enum
+from typing import Iterable, Optional, Tuple
+
+from pydantic import BaseModel, Field
+from sqlalchemy import (
+    TIMESTAMP,
+    Column,
+    Delete,
+)
+from sqlalchemy import Enum as SQLAlchemyEnum
+from sqlalchemy import (
+    Float,
+    ForeignKey,
+    Insert,
+    Integer,
+    String,
+    Update,
+    and_,
+    cast,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+)
+from sqlalchemy import text as sql_text
+from sqlalchemy import tuple_, update
+from sqlalchemy.sql.elements import ColumnElement
+
+from . import Base
+from .applicant import Applicant
+from .applicant_score import ApplicantScore
+from .criterion import Criterion
+from .job_offer import JobOffer
+
+
+class EvaluationTaskStatus(str, Enum):
+    PENDING = "PENDING"
+    FAILED = "FAILED"
+
+
+class SchedulingPolicy(str, Enum):
+    """Order in which queued evaluations are claimed."""
+
+    # Oldest first, so an offer with many applicants holds back every offer created after it
+    FIFO = "fifo"
+    # Round-robin across offers: the first pending evaluation of every offer, then the second, and so on
+    FAIR = "fair"
+    # Round-robin across offers, where an offer of priority p gets p + 1 evaluations per round
+    WEIGHTED = "weighted"
+
+
+class EvaluationTaskSchema(BaseModel):
+    applicant_id: int = Field(..., description="Identifier of the applicant to be evaluated", examples=[1])
+    criteria_id: int = Field(..., description="Identifier of the criterion to evaluate the applicant on", examples=[1])
+    offer_id: int = Field(..., description="Identifier of the job offer both belong to", examples=[1])
+    priority: int = Field(
+        0, description="Priority class of the job offer when the evaluation was scheduled", examples=[0]
+    )
+    created_at: datetime = Field(
+        ..., description="Timestamp when the evaluation was scheduled", examples=["2025-12-01T13:56:26.136274+00:00"]
+    )
+    status: EvaluationTaskStatus = Field(
+        EvaluationTaskStatus.PENDING,
+        description="PENDING while the evaluation is retried, FAILED once it ran out of attempts",
+        examples=[EvaluationTaskStatus.PENDING],
+    )
+    attempts: int = Field(0, description="Number of evaluation attempts started", examples=[0])
+    next_attempt_at: Optional[datetime] = Field(
+        None, description="Timestamp before which a failed evaluation is not retried"
+    )
+    last_error: Optional[str] = Field(None, description="Error of the last failed attempt")
+    lease_owner: Optional[str] = Field(None, description="Identifier of the worker currently evaluating the pair")
+    lease_expires_at: Optional[datetime] = Field(
+        None, description="Timestamp after which the pair can be claimed by another worker"
+    )
+
+
+class EvaluationTask(Base):
+    """
+    Pending (applicant, criterion) evaluation. Rows are removed once the corresponding score is written.
+
+    A worker claims a row by taking a lease on it, committed right away, so no lock is held during the upstream call.
+    If the worker dies, the row can be claimed again once the lease expires. Failed attempts are retried with backoff
+    until the row runs out of attempts and is left FAILED (dead-lettered).
+    """
+
+    __tablename__ = "evaluation_tasks"
+
+    applicant_id = Column(Integer, ForeignKey("applicants.id"), nullable=False, primary_key=True)
+    criteria_id = Column(Integer, ForeignKey("criteria.id"), nullable=False, index=True, primary_key=True)
+    offer_id = Column(Integer, ForeignKey("job_offers.id"), nullable=False, index=True)
+    # Copied from the job offer, so that claims do not need to look it up
+    priority = Column(Integer, nullable=False, default=0, server_default=sql_text("0"))
+    created_at = Column(
+        TIMESTAMP(timezone=True), nullable=False, index=True, server_default=sql_text("CURRENT_TIMESTAMP")
+    )
+    status = Column(
+        SQLAlchemyEnum(EvaluationTaskStatus),
+        nullable=False,
+        index=True,
+        default=EvaluationTaskStatus.PENDING,
+        server_default=EvaluationTaskStatus.PENDING.value,
+    )
+    attempts = Column(Integer, nullable=False, default=0, server_default=sql_text("0"))
+    next_attempt_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    last_error = Column(String, nullable=True)
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+    def to_dict(self) -> EvaluationTaskSchema:
+        return EvaluationTaskSchema(
+            applicant_id=self.applicant_id,
+            criteria_id=self.criteria_id,
+            offer_id=self.offer_id,
+            priority=self.priority,
+            created_at=self.created_at,
+            status=self.status,
+            attempts=self.attempts,
+            next_attempt_at=self.next_attempt_at,
+            last_error=self.last_error,
+            lease_owner=self.lease_owner,
+            lease_expires_at=self.lease_expires_at,
+        )
+
+
+def enqueue_evaluations(
+    *whereclause: ColumnElement[bool], lease_owner: Optional[str] = None, lease_expires_at: Optional[datetime] = None
+) -> Insert:
+    """
+    Build a statement that queues every (applicant, criterion) pair matching `whereclause`.
+
+    Pairs that already have a score or are already queued are skipped, so the statement is safe to run for any
+    subset of applicants or criteria, e.g. `enqueue_evaluations(Applicant.id.in_(new_applicant_ids))`.
+
+    If `lease_owner` is given, the pairs are queued already leased to it until `lease_expires_at`, counting their first
+    attempt, and the statement returns their (applicant_id, criteria_id, attempts, created_at, priority) like
+    `claim_evaluations`.
+    """
+    pending_pairs = (
+        select(Applicant.id, Criterion.id, Applicant.offer_id, JobOffer.priority)
+        .join(Criterion, Applicant.offer_id == Criterion.offer_id)
+        .join(JobOffer, Applicant.offer_id == JobOffer.id)
+        .where(
+            *whereclause,
+            ~exists().where(
+                and_(ApplicantScore.applicant_id == Applicant.id, ApplicantScore.criteria_id == Criterion.id)
+            ),
+            ~exists().where(
+                and_(EvaluationTask.applicant_id == Applicant.id, EvaluationTask.criteria_id == Criterion.id)
+            ),
+        )
+    )
+    columns = ["applicant_id", "criteria_id", "offer_id", "priority"]
+    if lease_owner is None:
+        return insert(EvaluationTask).from_select(columns, pending_pairs)
+    leased_pairs = pending_pairs.add_columns(
+        literal(lease_owner, String), literal(lease_expires_at, EvaluationTask.lease_expires_at.type), literal(1)
+    )
+    return (
+        insert(EvaluationTask)
+        .from_select([*columns, "lease_owner", "lease_expires_at", "attempts"], leased_pairs)
+        .returning(
+            EvaluationTask.applicant_id,
+            EvaluationTask.criteria_id,
+            EvaluationTask.attempts,
+            EvaluationTask.created_at,
+            EvaluationTask.priority,
+        )
+    )
+
+
+def dequeue_evaluations(owner: str, pairs: Iterable[Tuple[int, int]]) -> Delete:
+    """
+    Build a statement that removes the given (applicant_id, criteria_id) pairs still leased by `owner` from the
+    evaluation queue, returning the pairs removed. Pairs whose lease was lost (expired and claimed by another worker)
+    are left alone.
+    """
+    return (
+        delete(EvaluationTask)
+        .where(
+            tuple_(EvaluationTask.applicant_id, EvaluationTask.criteria_id).in_(list(pairs)),
+            EvaluationTask.lease_owner == owner,
+        )
+        .returning(EvaluationTask.applicant_id, EvaluationTask.criteria_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def release_evaluations(owner: str) -> Update:
+    """
+    Build a statement updating the pairs still leased by `owner`, to execute with a list of parameters that each hold
+    the applicant_id and criteria_id of a pair and its new values. Pairs whose lease was lost are left alone.
+    """
+    # The tasks loaded in the session are not refreshed, as bulk updates by primary key with an extra criteria do not
+    # support it
+    return update(EvaluationTask).where(EvaluationTask.lease_owner == owner).execution_options(synchronize_session=None)
+
+
+def claim_evaluations(
+    owner: str,
+    now: datetime,
+    lease_expires_at: datetime,
+    limit: int,
+    policy: SchedulingPolicy = SchedulingPolicy.FIFO,
+    by_importance: bool = False,
+) -> Update:
+    """
+    Build a statement that leases `limit` pending pairs that are neither leased (or their lease expired) nor backing
+    off to `owner`, counting a new attempt and returning their (applicant_id, criteria_id, attempts, created_at,
+    priority). Rows locked by a concurrent claim are skipped.
+
+    Pairs are picked in the order of `policy`. Within an offer, they are picked oldest first, or most important
+    criterion first if `by_importance` is set. The FAIR and WEIGHTED policies rank every claimable pair within its
+    offer, which costs a sort of the queue on every claim, unlike FIFO which reads the created_at index.
+    """
+    importance_order = [Criterion.importance.desc()] if by_importance else []
+    claimable = (
+        EvaluationTask.status == EvaluationTaskStatus.PENDING,
+        or_(EvaluationTask.lease_expires_at.is_(None), EvaluationTask.lease_expires_at < now),
+        or_(EvaluationTask.next_attempt_at.is_(None), EvaluationTask.next_attempt_at <= now),
+    )
+    candidates = select(EvaluationTask.applicant_id, EvaluationTask.criteria_id)
+    if by_importance:
+        candidates = candidates.join(Criterion, EvaluationTask.criteria_id == Criterion.id)
+    if policy == SchedulingPolicy.FIFO:
+        candidates = candidates.where(*claimable).order_by(EvaluationTask.created_at, *importance_order)
+    else:
+        # Turn of every pair in the rotation across offers. Window functions cannot be combined with row locks, so
+        # the turns are computed in a subquery joined back to the rows to lock
+        turn = func.row_number().over(
+            partition_by=EvaluationTask.offer_id, order_by=[*importance_order, EvaluationTask.created_at]
+        )
+        if policy == SchedulingPolicy.WEIGHTED:
+            turn = cast(turn, Float) / cast(EvaluationTask.priority + 1, Float)
+        turns = select(EvaluationTask.applicant_id, EvaluationTask.criteria_id, turn.label("turn"))
+        if by_importance:
+            turns = turns.join(Criterion, EvaluationTask.criteria_id == Criterion.id)
+        turns = turns.where(*claimable).subquery()
+        # The claimable conditions are repeated on the rows to lock, as a row updated by a concurrent claim is only
+        # rechecked against the conditions of the locking query once its lock is released
+        candidates = (
+            select(EvaluationTask.applicant_id, EvaluationTask.criteria_id)
+            .where(*claimable)
+            .join(
+                turns,
+                and_(
+                    EvaluationTask.applicant_id == turns.c.applicant_id,
+                    EvaluationTask.criteria_id == turns.c.criteria_id,
+                ),
+            )
+            .order_by(turns.c.turn, EvaluationTask.priority.desc(), EvaluationTask.created_at)
+        )
+    candidates = candidates.limit(limit).with_for_update(of=EvaluationTask, skip_locked=True)
+    return (
+        update(EvaluationTask)
+        .where(tuple_(EvaluationTask.applicant_id, EvaluationTask.criteria_id).in_(candidates))
+        .values(lease_owner=owner, lease_expires_at=lease_expires_at, attempts=EvaluationTask.attempts + 1)
+        .returning(
+            EvaluationTask.applicant_id,
+            EvaluationTask.criteria_id,
+            EvaluationTask.attempts,
+            EvaluationTask.created_at,
+            EvaluationTask.priority,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def requeue_failed_evaluations(*whereclause: ColumnElement[bool]) -> Update:
+    """Build a statement that gives the FAILED (dead-lettered) pairs matching `whereclause` a fresh set of attempts."""
+    return (
+        update(EvaluationTask)
+        .where(EvaluationTask.status == EvaluationTaskStatus.FAILED, *whereclause)
+        .values(
+            status=EvaluationTaskStatus.PENDING,
+            attempts=0,
+            next_attempt_at=None,
+            last_error=None,
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
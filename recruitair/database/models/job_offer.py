@@ -1,20 +1,28 @@
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional
 
 from pydantic import BaseModel, Field
 from sqlalchemy import TIMESTAMP, Column
 from sqlalchemy import Enum as SQLAlchemyEnum
-from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy import ForeignKey, Index, Integer, Select, String, Update, case, cast, func, or_, select
 from sqlalchemy import text as sql_text
+from sqlalchemy import update
 from sqlalchemy.dialects.postgresql import JSONB
 
 from . import Base
+from .evaluation_cache import content_hash
+from .search import add_search_vector
+
+# Highest priority class of a job offer. Classes are bounded, as they label the queue wait metrics of the workers
+MAX_PRIORITY = 9
 
 
 class JobOfferStatus(str, Enum):
     PENDING = "PENDING"
+    IN_PROGRESS = "IN_PROGRESS"
     DONE = "DONE"
+    FAILED = "FAILED"
 
 
 class JobOfferSchema(BaseModel):
@@ -30,20 +38,146 @@ class JobOfferSchema(BaseModel):
         description="Text description of the job offer",
         examples=["Looking for a software engineer with experience in Python and FastAPI."],
     )
+    priority: int = Field(
+        0,
+        description=(
+            f"Priority class of the job offer, from 0 to {MAX_PRIORITY}. Offers of higher classes are extracted first, "
+            "and get a proportionally larger share of the evaluations"
+        ),
+        ge=0,
+        le=MAX_PRIORITY,
+        examples=[0],
+    )
 
 
 class JobOffer(Base):
+    """
+    Job offer. Its criteria are extracted by a worker that leases the offer (IN_PROGRESS) with a short committed
+    update, so no lock is held during the upstream call. Offers whose lease expired are returned to PENDING by the
+    reaper. Offers with the same text as an offer already DONE are given a copy of its criteria instead.
+    """
+
     __tablename__ = "job_offers"
+    __table_args__ = (
+        # Serves the keyset pagination of the offers filtered by status
+        Index("ix_job_offers_status_id", "status", "id"),
+        # Serves the substring search in the offer texts on PostgreSQL
+        Index(
+            "ix_job_offers_text_trgm", "text", postgresql_using="gin", postgresql_ops={"text": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     text = Column(String, nullable=False)
+    # Offers reposted with the same text share their criteria, see the extractor worker
+    text_hash = Column(
+        String(64),
+        nullable=True,
+        index=True,
+        default=lambda context: content_hash(context.get_current_parameters()["text"]),
+    )
     status = Column(SQLAlchemyEnum(JobOfferStatus), nullable=False, index=True, default=JobOfferStatus.PENDING)
+    priority = Column(Integer, nullable=False, default=0, server_default=sql_text("0"))
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=sql_text("CURRENT_TIMESTAMP"))
+    # Failed extraction attempts, and when the offer may be claimed again
+    attempts = Column(Integer, nullable=False, default=0, server_default=sql_text("0"))
+    next_attempt_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    last_error = Column(String, nullable=True)
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(TIMESTAMP(timezone=True), nullable=True)
 
     def to_dict(self) -> JobOfferSchema:
         return JobOfferSchema(
             id=self.id,
             text=self.text,
             status=self.status,
+            priority=self.priority,
             created_at=self.created_at,
         )
+
+
+# Serves the keyword search in the offer texts on PostgreSQL
+add_search_vector(JobOffer.__table__, "text")
+
+
+def claim_job_offers(owner: str, now: datetime, lease_expires_at: datetime, limit: int) -> Update:
+    """
+    Build a statement that leases the `limit` oldest PENDING offers of the highest priority that are not backing off to
+    `owner`, marking them IN_PROGRESS, counting a new attempt and returning their ids. Rows locked by a concurrent claim
+    are skipped.
+    """
+    claimable = (
+        select(JobOffer.id)
+        .where(JobOffer.status == JobOfferStatus.PENDING)
+        .where(or_(JobOffer.next_attempt_at.is_(None), JobOffer.next_attempt_at <= now))
+        .order_by(JobOffer.priority.desc(), JobOffer.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(JobOffer)
+        .where(JobOffer.id.in_(claimable))
+        .values(
+            status=JobOfferStatus.IN_PROGRESS,
+            lease_owner=owner,
+            lease_expires_at=lease_expires_at,
+            attempts=JobOffer.attempts + 1,
+        )
+        .returning(JobOffer.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def complete_job_offers(owner: str, offer_ids: Iterable[int]) -> Update:
+    """
+    Build a statement that marks the given offers DONE, returning the ids of those still leased by `owner`. Offers
+    whose lease was lost (reaped and claimed by another worker) are left alone.
+    """
+    return (
+        update(JobOffer)
+        .where(
+            JobOffer.id.in_(list(offer_ids)),
+            JobOffer.status == JobOfferStatus.IN_PROGRESS,
+            JobOffer.lease_owner == owner,
+        )
+        .values(
+            status=JobOfferStatus.DONE, lease_owner=None, lease_expires_at=None, next_attempt_at=None, last_error=None
+        )
+        .returning(JobOffer.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def extracted_duplicates(text_hashes: Iterable[str]) -> Select:
+    """
+    Build a query returning (text_hash, offer id) of one DONE offer for each of the given text hashes that has any,
+    whose criteria can be copied to the offers reposted with the same text.
+    """
+    return (
+        select(JobOffer.text_hash, func.min(JobOffer.id))
+        .where(JobOffer.text_hash.in_(list(text_hashes)), JobOffer.status == JobOfferStatus.DONE)
+        .group_by(JobOffer.text_hash)
+    )
+
+
+def reap_job_offer_leases(now: datetime, max_attempts: int) -> Update:
+    """
+    Build a statement that returns the IN_PROGRESS offers whose lease expired (e.g. their worker crashed) to PENDING,
+    or marks them FAILED if they have used up their attempts.
+    """
+    return (
+        update(JobOffer)
+        .where(JobOffer.status == JobOfferStatus.IN_PROGRESS, JobOffer.lease_expires_at < now)
+        .values(
+            status=case(
+                (JobOffer.attempts >= max_attempts, cast(JobOfferStatus.FAILED, JobOffer.status.type)),
+                else_=cast(JobOfferStatus.PENDING, JobOffer.status.type),
+            ),
+            lease_owner=None,
+            lease_expires_at=None,
+            last_error=case(
+                (JobOffer.attempts >= max_attempts, "Lease expired on the last attempt"), else_=JobOffer.last_error
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,47 @@
+from typing import Tuple
+
+from sqlalchemy import DDL, Column, ColumnElement, Table, and_, event, func, literal, literal_column, true
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+# Text search configuration of the search vectors. Changing it requires a migration recomputing them.
+TEXT_SEARCH_CONFIG = "english"
+
+# Column of the tables with keyword search holding the tsvector of their text, computed by PostgreSQL. It only exists
+# on PostgreSQL, so it is not part of the models (see `add_search_vector`), and Alembic leaves it out of its comparisons.
+SEARCH_VECTOR_COLUMN = "search_vector"
+
+
+def add_search_vector(table: Table, source: str) -> None:
+    """
+    Add the search vector of the `source` column, and its GIN index, to `table` when it is created on PostgreSQL. On
+    other databases, keyword search falls back to substring matching.
+    """
+    for statement in (
+        f"ALTER TABLE {table.name} ADD COLUMN {SEARCH_VECTOR_COLUMN} tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', {source})) STORED",
+        f"CREATE INDEX ix_{table.name}_{SEARCH_VECTOR_COLUMN} ON {table.name} USING gin ({SEARCH_VECTOR_COLUMN})",
+    ):
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+
+def keyword_search(
+    dialect_name: str, text_column: Column, keywords: str
+) -> Tuple[ColumnElement[bool], ColumnElement[float]]:
+    """
+    Condition matching the rows whose text contains `keywords`, in web search syntax (e.g. `python -java "data
+    engineer"`), and the relevance of the rows to rank them by.
+
+    On PostgreSQL, they are served by the GIN index of the search vector of the table of `text_column`. Elsewhere, rows containing every word of
+    `keywords` and none of those prefixed with '-' match, case-insensitively, and they are not ranked.
+    """
+    if dialect_name == "postgresql":
+        query = func.websearch_to_tsquery(TEXT_SEARCH_CONFIG, keywords)
+        vector_column = literal_column(f"{text_column.table.name}.{SEARCH_VECTOR_COLUMN}", TSVECTOR)
+        return vector_column.bool_op("@@")(query), func.ts_rank(vector_column, query)
+    conditions = []
+    for word in keywords.lower().replace('"', " ").split():
+        if word.startswith("-") and len(word) > 1:
+            conditions.append(~func.lower(text_column).contains(word[1:], autoescape=True))
+        else:
+            conditions.append(func.lower(text_column).contains(word, autoescape=True))
+    return and_(true(), *conditions), literal(0.0)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import async_engine
+
+logger = logging.getLogger(__name__)
+
+# Channels on which the API and the workers announce new work
+EXTRACTION_CHANNEL = "recruitair_extraction"
+EVALUATION_CHANNEL = "recruitair_evaluation"
+
+_PENDING_NOTIFICATIONS_KEY = "recruitair_pending_notifications"
+
+
+class LocalNotificationHub:
+    """
+    In-process stand-in for PostgreSQL LISTEN/NOTIFY, used with databases that have no notification mechanism
+    (e.g. SQLite in tests). Listeners may live in any event loop and notifications may be sent from any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners: Dict[str, List[Tuple[asyncio.AbstractEventLoop, Callable[[], None]]]] = {}
+
+    def subscribe(self, channel: str, callback: Callable[[], None]) -> None:
+        with self._lock:
+            self._listeners.setdefault(channel, []).append((asyncio.get_running_loop(), callback))
+
+    def unsubscribe(self, channel: str, callback: Callable[[], None]) -> None:
+        with self._lock:
+            self._listeners[channel] = [
+                (loop, listener) for loop, listener in self._listeners.get(channel, []) if listener is not callback
+            ]
+
+    def publish(self, channel: str) -> None:
+        with self._lock:
+            listeners = list(self._listeners.get(channel, []))
+        for loop, callback in listeners:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(callback)
+
+
+local_notifications = LocalNotificationHub()
+
+
+def _is_postgresql(bind) -> bool:
+    return bind.dialect.name == "postgresql"
+
+
+def notify(session: Session, channel: str) -> None:
+    """Notify the workers listening on `channel`. The notification is delivered when the transaction commits."""
+    if _is_postgresql(session.get_bind()):
+        session.execute(select(func.pg_notify(channel, "")))
+    else:
+        session.info.setdefault(_PENDING_NOTIFICATIONS_KEY, set()).add(channel)
+
+
+async def notify_async(session: AsyncSession, channel: str) -> None:
+    """Async counterpart of `notify`."""
+    if _is_postgresql(session.bind):
+        await session.execute(select(func.pg_notify(channel, "")))
+    else:
+        session.info.setdefault(_PENDING_NOTIFICATIONS_KEY, set()).add(channel)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_local_notifications(session: Session) -> None:
+    for channel in session.info.pop(_PENDING_NOTIFICATIONS_KEY, ()):
+        local_notifications.publish(channel)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_local_notifications(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_NOTIFICATIONS_KEY, None)
+
+
+# Longest delay between two attempts to reconnect a lost listening connection
+MAX_RECONNECT_DELAY_SECONDS = 30
+
+
+@asynccontextmanager
+async def listen(channel: str, callback: Callable[[], None]) -> AsyncIterator[None]:
+    """
+    Call `callback` from the running event loop every time a notification is sent on `channel`.
+
+    On PostgreSQL a dedicated connection is held open for as long as the context is active. If it is lost, it is
+    reconnected with a backoff, and `callback` is called once the connection listens again, as notifications sent in
+    between are missed. Listeners should still poll as a fallback.
+    """
+    if not _is_postgresql(async_engine):
+        local_notifications.subscribe(channel, callback)
+        try:
+            yield
+        finally:
+            local_notifications.unsubscribe(channel, callback)
+        return
+
+    lost = asyncio.Event()
+
+    def on_notification(connection, pid, notified_channel, payload) -> None:
+        callback()
+
+    def on_termination(connection) -> None:
+        logger.warning(f"Lost the connection listening on {channel}, reconnecting.")
+        lost.set()
+
+    async def hold_connection() -> None:
+        delay = 1
+        while True:
+            try:
+                async with async_engine.connect() as connection:
+                    raw_connection = await connection.get_raw_connection()
+                    listener_connection = raw_connection.driver_connection
+                    await listener_connection.add_listener(channel, on_notification)
+                    listener_connection.add_termination_listener(on_termination)
+                    logger.info(f"Listening for notifications on {channel}.")
+                    delay = 1
+                    # Work may have been announced before the connection listened
+                    callback()
+                    try:
+                        await lost.wait()
+                    finally:
+                        lost.clear()
+                        if listener_connection.is_closed():
+                            # Not returned to the pool, as it cannot be reset
+                            await connection.invalidate()
+                        else:
+                            await listener_connection.remove_listener(channel, on_notification)
+            except Exception as e:
+                logger.warning(f"Could not listen on {channel}, retrying in {delay} seconds: {e}")
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, MAX_RECONNECT_DELAY_SECONDS)
+
+    listener = asyncio.create_task(hold_connection())
+    try:
+        yield
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
@@ -0,0 +1,160 @@
+import asyncio
+import contextlib
+import logging
+import time
+from enum import Enum
+from typing import AsyncIterator, Callable, List, Optional
+
+from aiohttp import ClientConnectionError, ClientResponseError
+from prometheus_client import Gauge
+
+from .common_settings import BaseWorkerSettings
+from .rate_limit import UpstreamThrottled
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+# Values of the circuit breaker state gauges
+CIRCUIT_STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """The upstream is considered down, so the request was not sent."""
+
+
+def signals_outage(error: BaseException) -> bool:
+    """
+    Whether `error` shows that the upstream is down, rather than that the request itself is wrong or that the upstream
+    asked to slow down.
+    """
+    if isinstance(error, (asyncio.TimeoutError, ClientConnectionError)):
+        return True
+    return isinstance(error, ClientResponseError) and error.status >= 500 and not isinstance(error, UpstreamThrottled)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of an upstream API.
+
+    CLOSED: requests are sent, and `failure_threshold` consecutive outage errors (timeouts, connection errors, 5xx
+    answers) open the circuit. OPEN: requests fail right away and no work should be claimed, until `recovery_seconds`
+    have passed. HALF_OPEN: up to `half_open_requests` tasks may be claimed as trials. As many successes close the
+    circuit again, while a single outage error opens it for another `recovery_seconds`. Trials that did not report
+    within `recovery_seconds` (e.g. answered from a cache) are replaced by new ones.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        failure_threshold: int,
+        recovery_seconds: float,
+        half_open_requests: int,
+        state_gauge: Gauge,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.upstream = upstream
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_requests = half_open_requests
+        self._state_gauge = state_gauge.labels(upstream=upstream)
+        self._listeners: List[Callable[[], None]] = []
+        self._reopen_timer: Optional[asyncio.TimerHandle] = None
+        self._clock = clock
+        self._set_state(CircuitState.CLOSED)
+
+    @property
+    def state(self) -> CircuitState:
+        # The circuit also half-opens when it is looked at after its recovery, in case the timer is late
+        if self._state == CircuitState.OPEN and self._clock() - self._changed_at >= self.recovery_seconds:
+            self._half_open()
+        return self._state
+
+    def _set_state(self, state: CircuitState) -> None:
+        self._state = state
+        self._consecutive_failures = 0
+        self._trial_successes = 0
+        self._trial_claims = 0
+        self._changed_at = self._clock()
+        self._state_gauge.set(CIRCUIT_STATE_VALUES[state])
+        for listener in self._listeners:
+            listener()
+
+    def on_state_change(self, listener: Callable[[], None]) -> None:
+        """Call `listener` whenever the state changes, e.g. to wake up a worker waiting for the circuit to half-open."""
+        self._listeners.append(listener)
+
+    def _open(self) -> None:
+        logger.warning(f"Opening the circuit breaker of {self.upstream} for {self.recovery_seconds} seconds.")
+        self._set_state(CircuitState.OPEN)
+        if self._reopen_timer is not None:
+            self._reopen_timer.cancel()
+        self._reopen_timer = asyncio.get_running_loop().call_later(self.recovery_seconds, self._half_open)
+
+    def _half_open(self) -> None:
+        logger.info(f"Half-opening the circuit breaker of {self.upstream} to probe its recovery.")
+        if self._reopen_timer is not None:
+            self._reopen_timer.cancel()
+        self._reopen_timer = None
+        self._set_state(CircuitState.HALF_OPEN)
+
+    def claimable(self, count: int) -> int:
+        """How many of `count` tasks may be claimed now. In HALF_OPEN, the trials allowed are reserved."""
+        if self.state == CircuitState.CLOSED:
+            return count
+        if self.state == CircuitState.OPEN:
+            return 0
+        if self._clock() - self._changed_at >= self.recovery_seconds:
+            self._trial_claims = 0
+            self._changed_at = self._clock()
+        allowed = min(count, self.half_open_requests - self._trial_claims)
+        self._trial_claims += allowed
+        return allowed
+
+    def record_success(self) -> None:
+        if self.state == CircuitState.HALF_OPEN:
+            self._trial_successes += 1
+            if self._trial_successes >= self.half_open_requests:
+                logger.info(f"Closing the circuit breaker of {self.upstream}, it has recovered.")
+                self._set_state(CircuitState.CLOSED)
+        else:
+            self._consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        if self.state == CircuitState.HALF_OPEN:
+            self._open()
+        elif self.state == CircuitState.CLOSED:
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    @contextlib.asynccontextmanager
+    async def request(self) -> AsyncIterator[None]:
+        """Make an upstream request unless the circuit is open, recording whether the upstream answered."""
+        if self.state == CircuitState.OPEN:
+            raise CircuitOpenError(f"The circuit breaker of {self.upstream} is open")
+        try:
+            yield
+        except Exception as e:
+            # Any other error still shows that the upstream is up and answering
+            if signals_outage(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+
+
+def create_circuit_breaker(settings: BaseWorkerSettings, upstream: str, state_gauge: Gauge) -> CircuitBreaker:
+    return CircuitBreaker(
+        upstream,
+        settings.circuit_breaker_failure_threshold,
+        settings.circuit_breaker_recovery_seconds,
+        settings.circuit_breaker_half_open_requests,
+        state_gauge,
+    )
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -11,8 +13,147 @@ class BaseWorkerSettings(BaseSettings):
     db_port: int = Field(5432, description="Database port")
     db_database: str = Field(..., description="Database name")
 
-    batch_size: int = Field(100, description="Number of tasks to process in a batch")
+    batch_size: int = Field(
+        100, description="Number of tasks to process in a batch, or to keep in flight in streaming dispatch mode"
+    )
     interval_seconds: int = Field(10, description="Interval between task processing in seconds")
+    dispatch_mode: Literal["batch", "streaming"] = Field(
+        "batch",
+        description=(
+            "'batch' claims and dispatches a whole batch every interval; 'streaming' keeps up to batch_size tasks in "
+            "flight and claims new tasks as soon as a slot is released, sleeping only when the queue is empty"
+        ),
+    )
+    listen_for_notifications: bool = Field(
+        True, description="Whether to wake up as soon as new work is announced through database notifications"
+    )
+    notification_poll_seconds: Optional[int] = Field(
+        None,
+        description=(
+            "Fallback polling interval in seconds for idle workers listening for notifications (None for "
+            "interval_seconds)"
+        ),
+    )
+    streaming_max_open_claims: int = Field(
+        4, description="Maximum number of claimed batches waiting on their tasks in streaming dispatch mode"
+    )
+
+    adaptive_concurrency: bool = Field(
+        False,
+        description=(
+            "Whether to adapt the number of simultaneous upstream requests, up to batch_size, to the upstream latency, "
+            "timeouts and overload responses"
+        ),
+    )
+    min_concurrency: int = Field(
+        1, ge=1, description="Lowest number of simultaneous upstream requests the adaptive limit can fall to"
+    )
+    initial_concurrency: Optional[int] = Field(
+        None,
+        ge=1,
+        description=(
+            "Number of simultaneous upstream requests the adaptive limit starts at (None for batch_size). No more "
+            "tasks are claimed at once than the limit, so a low start claims small batches until it has grown"
+        ),
+    )
+    concurrency_latency_tolerance: float = Field(
+        2.0,
+        gt=1,
+        description=(
+            "Ratio of the smoothed upstream latency over the lowest observed latency above which the upstream is taken "
+            "as congested and the adaptive limit is lowered"
+        ),
+    )
+    concurrency_backoff_ratio: float = Field(
+        0.7, gt=0, lt=1, description="Factor the adaptive limit is multiplied by when the upstream is congested"
+    )
+
+    rate_limit_requests_per_second: Optional[float] = Field(
+        None, gt=0, description="Maximum rate of upstream requests per second of a worker process (None for no limit)"
+    )
+    rate_limit_bytes_per_second: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Maximum rate of upstream request payload bytes per second of a worker process (None for no limit)",
+    )
+    rate_limit_burst_seconds: float = Field(
+        1, gt=0, description="Seconds of unused rate limit quota that can be spent at once in a burst"
+    )
+    retry_after_max_seconds: float = Field(
+        60,
+        description=(
+            "Longest total time a request is held back to honour the Retry-After of throttled (429 or 503) upstream "
+            "answers. Requests throttled for longer fail, and their task is retried later"
+        ),
+    )
+
+    load_balancing_policy: Literal["least_outstanding", "power_of_two_choices"] = Field(
+        "least_outstanding",
+        description=(
+            "How requests are spread across the replicas of the upstream API: 'least_outstanding' sends them to the "
+            "replica with the fewest requests in flight, 'power_of_two_choices' to the one with fewer of two replicas "
+            "picked at random"
+        ),
+    )
+    circuit_breaker_failure_threshold: int = Field(
+        5,
+        ge=1,
+        description=(
+            "Number of consecutive timeouts, connection errors or 5xx answers after which the upstream is considered "
+            "down, and no more work is claimed until it has recovered"
+        ),
+    )
+    circuit_breaker_recovery_seconds: float = Field(
+        30, gt=0, description="Seconds after which an upstream considered down is probed again"
+    )
+    circuit_breaker_half_open_requests: int = Field(
+        3, ge=1, description="Number of successful trial requests after which an upstream is considered up again"
+    )
+
+    lease_seconds: int = Field(
+        300,
+        description=(
+            "Seconds a claimed task stays leased to this worker. It must exceed the time needed to dispatch a task, "
+            "after which the task can be claimed by another worker"
+        ),
+    )
+    result_commit_size: int = Field(
+        20, description="Number of finished tasks whose results are committed together, as they arrive"
+    )
+
+    max_attempts: int = Field(
+        5, description="Number of attempts after which a failing task is given up on and marked FAILED"
+    )
+    retry_base_seconds: float = Field(
+        30, description="Backoff in seconds before retrying a task after its first failure"
+    )
+    retry_max_seconds: float = Field(3600, description="Maximum backoff in seconds between attempts of a failing task")
+
+    http_max_connections: int = Field(100, description="Maximum number of open connections to upstream APIs")
+    http_max_connections_per_host: int = Field(
+        100, description="Maximum number of open connections to a single upstream host (0 for no limit)"
+    )
+    http_keepalive_timeout: float = Field(30, description="Seconds an idle upstream connection is kept alive")
+    http_dns_cache_ttl: int = Field(300, description="Seconds resolved upstream host names are cached")
+
+    processes: int = Field(
+        1,
+        ge=1,
+        description=(
+            "Number of worker processes, each with its own event loop, database pool and HTTP client. With more than "
+            "one, a supervisor process restarts the workers that crash and serves their aggregated metrics"
+        ),
+    )
+    shutdown_timeout_seconds: float = Field(
+        30, description="Seconds the worker processes are given to stop on SIGTERM before they are killed"
+    )
 
     metrics_server_port: int = Field(8000, description="Port on which to expose Prometheus metrics")
     expose_metrics: bool = Field(False, description="Whether to expose Prometheus metrics")
+
+    @property
+    def idle_poll_seconds(self) -> int:
+        """Seconds an idle worker waits before looking for work again."""
+        if self.listen_for_notifications and self.notification_poll_seconds is not None:
+            return self.notification_poll_seconds
+        return self.interval_seconds
@@ -0,0 +1,161 @@
+import asyncio
+import contextlib
+import logging
+import time
+from typing import AsyncIterator, Callable, List, Optional
+
+from aiohttp import ClientResponseError
+from prometheus_client import Gauge, Histogram
+
+from .common_settings import BaseWorkerSettings
+
+logger = logging.getLogger(__name__)
+
+# Upstream answers meaning that it is overloaded, rather than that the request itself is wrong
+OVERLOAD_STATUSES = (429, 503)
+
+# Weight of every sample in the smoothed latency
+LATENCY_SMOOTHING = 0.1
+# Fraction of the distance to a slower sample the baseline latency moves by at the lowest limit, where the latency is
+# the no-load latency by definition, so that a lasting slowdown of the upstream is not taken as congestion forever
+BASELINE_DRIFT = 0.1
+
+
+def signals_overload(error: BaseException) -> bool:
+    return isinstance(error, ClientResponseError) and error.status in OVERLOAD_STATUSES
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limit of simultaneous upstream requests, adapted with AIMD (additive increase, multiplicative decrease).
+
+    The limit starts at `initial_limit`, or at `min_limit` so that the baseline (no-load) latency is measured before the
+    upstream is loaded, and grows by one for every request that succeeds until the upstream first shows congestion
+    (slow start). From then
+    on it grows by one for every `limit` requests that succeed, and is multiplied by `backoff_ratio` when a request
+    times out, the upstream answers that it is overloaded, or the smoothed latency exceeds `latency_tolerance` times
+    the baseline latency. Requests started before the last decrease were sent under the previous limit, so their
+    outcome does not lower the limit again.
+
+    Upstream requests are made in a `request` block, which waits until fewer than `limit` requests are in flight and
+    then times the request and records its outcome.
+    """
+
+    def __init__(
+        self,
+        min_limit: int,
+        max_limit: int,
+        latency_tolerance: float,
+        backoff_ratio: float,
+        limit_gauge: Gauge,
+        latency_histogram: Histogram,
+        initial_limit: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_limit = min(min_limit, max_limit)
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self._limit = float(min(max(initial_limit or self.min_limit, self.min_limit), self.max_limit))
+        self.slow_start = True
+        self._limit_gauge = limit_gauge
+        self._limit_gauge.set(self.limit)
+        self._latency_histogram = latency_histogram
+        self.baseline_latency: Optional[float] = None
+        self.smoothed_latency: Optional[float] = None
+        self._last_decrease = float("-inf")
+        self._clock = clock
+        self.in_flight = 0
+        self._waiters: List[asyncio.Future] = []
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _set_limit(self, limit: float) -> None:
+        self._limit = min(max(limit, self.min_limit), self.max_limit)
+        self._limit_gauge.set(self.limit)
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        if self.in_flight < self.limit:
+            waiters, self._waiters = self._waiters, []
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait until fewer than `limit` requests are in flight, and count one more until the block exits."""
+        while self.in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._wake_waiters()
+
+    def _decrease(self, started_at: float, reason: str) -> None:
+        if started_at < self._last_decrease:
+            return
+        self._last_decrease = self._clock()
+        self.slow_start = False
+        previous_limit = self.limit
+        self._set_limit(self._limit * self.backoff_ratio)
+        if self.limit != previous_limit:
+            logger.info(f"Lowered the upstream concurrency limit from {previous_limit} to {self.limit} ({reason}).")
+
+    def on_success(self, started_at: float, latency: float) -> None:
+        """Record a request started at `started_at` (monotonic time) that succeeded after `latency` seconds."""
+        if self.baseline_latency is None:
+            self.baseline_latency = self.smoothed_latency = latency
+        else:
+            drift = BASELINE_DRIFT if self.limit <= self.min_limit else 0
+            self.baseline_latency = min(latency, self.baseline_latency + drift * (latency - self.baseline_latency))
+            self.smoothed_latency += LATENCY_SMOOTHING * (latency - self.smoothed_latency)
+        if self.smoothed_latency > self.latency_tolerance * self.baseline_latency:
+            self._decrease(started_at, f"latency {self.smoothed_latency:.3f}s over {self.baseline_latency:.3f}s")
+        else:
+            self._set_limit(self._limit + (1 if self.slow_start else 1 / self._limit))
+
+    @contextlib.asynccontextmanager
+    async def request(self) -> AsyncIterator[None]:
+        """Make an upstream request in a slot, adapting the limit to its latency or error."""
+        async with self.slot():
+            start_time = self._clock()
+            try:
+                yield
+            except asyncio.TimeoutError:
+                self.on_timeout(start_time)
+                raise
+            except Exception as e:
+                self.on_error(start_time, e)
+                raise
+            latency = self._clock() - start_time
+            self._latency_histogram.observe(latency)
+            self.on_success(start_time, latency)
+
+    def on_timeout(self, started_at: float) -> None:
+        self._decrease(started_at, "timeout")
+
+    def on_error(self, started_at: float, error: BaseException) -> None:
+        if signals_overload(error):
+            self._decrease(started_at, f"status {error.status}")
+
+
+def create_limiter(
+    settings: BaseWorkerSettings, limit_gauge: Gauge, latency_histogram: Histogram
+) -> AdaptiveConcurrencyLimiter:
+    """Limiter of the worker's upstream requests, fixed at `batch_size` unless adaptive concurrency is enabled."""
+    return AdaptiveConcurrencyLimiter(
+        settings.min_concurrency if settings.adaptive_concurrency else settings.batch_size,
+        settings.batch_size,
+        settings.concurrency_latency_tolerance,
+        settings.concurrency_backoff_ratio,
+        limit_gauge,
+        latency_histogram,
+        settings.initial_concurrency or settings.batch_size,
+    )
@@ -0,0 +1,348 @@
+import asyncio
+import logging
+import time
+import traceback
+from datetime import datetime, timezone
+from enum import Enum
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from ..database import AsyncSessionLocal
+from .circuit_breaker import CircuitOpenError
+from .common_settings import BaseWorkerSettings
+from .concurrency import AdaptiveConcurrencyLimiter
+from .retry import format_error, next_attempt_at
+from .upstream import Upstream
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Task = TypeVar("Task")
+Result = TypeVar("Result")
+
+
+class Wakeup:
+    """Event a waiting worker loop can be woken up with, e.g. when a database notification arrives."""
+
+    def __init__(self):
+        self._event = asyncio.Event()
+
+    def set(self) -> None:
+        self._event.set()
+
+    async def wait(self, timeout: float) -> None:
+        """Wait until `set` is called, or until `timeout` seconds have passed."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._event.clear()
+
+
+class DispatchWindow:
+    """Bounded window of in-flight dispatches, whose size is the current limit of `limiter`."""
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter, in_flight_gauge: Gauge, wakeup: Optional[Wakeup] = None):
+        self.limiter = limiter
+        self.in_flight = 0
+        self._in_flight_gauge = in_flight_gauge
+        self.wakeup = wakeup or Wakeup()
+
+    @property
+    def size(self) -> int:
+        return self.limiter.limit
+
+    @property
+    def free_slots(self) -> int:
+        return max(self.size - self.in_flight, 0)
+
+    def acquire(self, count: int) -> "ClaimSlots":
+        """Take `count` slots for the items of a claim, which are released through the returned `ClaimSlots`."""
+        self.in_flight += count
+        self._in_flight_gauge.set(self.in_flight)
+        return ClaimSlots(self, count)
+
+    def _release(self, count: int) -> None:
+        self.in_flight -= count
+        self._in_flight_gauge.set(self.in_flight)
+        self.wakeup.set()
+
+
+class ClaimSlots:
+    """Slots of a `DispatchWindow` held by the items of a claim, each released once."""
+
+    def __init__(self, window: DispatchWindow, count: int):
+        self._window = window
+        self.held = count
+
+    def release(self, count: int = 1) -> None:
+        count = min(count, self.held)
+        if count > 0:
+            self.held -= count
+            self._window._release(count)
+
+    def release_remaining(self) -> None:
+        self.release(self.held)
+
+    async def track(self, dispatch: Awaitable[T], slots: int = 1) -> T:
+        """Await the dispatch of items holding `slots` slots and release them when it finishes."""
+        try:
+            return await dispatch
+        finally:
+            self.release(slots)
+
+
+async def stream_dispatch(
+    window: DispatchWindow,
+    claim: Callable[[int], Awaitable[Optional[Awaitable[None]]]],
+    housekeeping: Callable[[], Awaitable[None]],
+    interval_seconds: float,
+    idle_seconds: float,
+    max_open_claims: int,
+) -> None:
+    """
+    Keep `window` full while there is pending work, with at most `max_open_claims` claims dispatched at once.
+    `claim(free_slots)` returns the dispatch of the items it claimed, or None when the queue is empty.
+    """
+    open_claims: Set[asyncio.Task] = set()
+
+    def on_claim_done(task: asyncio.Task) -> None:
+        open_claims.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Dispatch of a claim failed.", exc_info=task.exception())
+        window.wakeup.set()
+
+    last_housekeeping = float("-inf")
+    try:
+        while True:
+            if time.monotonic() - last_housekeeping >= interval_seconds:
+                await housekeeping()
+                last_housekeeping = time.monotonic()
+
+            dispatch = None
+            if window.free_slots > 0 and len(open_claims) < max_open_claims:
+                dispatch = await claim(window.free_slots)
+            if dispatch is not None:
+                task = asyncio.create_task(dispatch)
+                open_claims.add(task)
+                task.add_done_callback(on_claim_done)
+                continue
+            await window.wakeup.wait(idle_seconds if window.in_flight == 0 else interval_seconds)
+    finally:
+        pending_claims = list(open_claims)
+        for task in pending_claims:
+            task.cancel()
+        await asyncio.gather(*pending_claims, return_exceptions=True)
+
+
+class DispatchMetrics(NamedTuple):
+    """Metrics of the dispatch loop of a worker."""
+
+    batch_size: Histogram
+    batch_dispatch_duration: Histogram
+    in_flight_dispatches: Gauge
+    total_dispatches: Counter
+    failed_dispatches: Counter
+    timeouts: Counter
+    retries_scheduled: Counter
+    dead_lettered: Counter
+
+
+class QueueWorker(Generic[Task, Result]):
+    """
+    Claims tasks from a queue and dispatches them to `upstream`, a batch every interval or streaming in a window.
+    Subclasses claim, dispatch and commit their own kind of tasks.
+    """
+
+    # Statuses of the tasks retried later, and of those given up on
+    pending_status: Enum
+    failed_status: Enum
+
+    def __init__(
+        self,
+        settings: BaseWorkerSettings,
+        upstream: Upstream,
+        metrics: DispatchMetrics,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        wakeup: Optional[Wakeup] = None,
+    ):
+        self.settings = settings
+        self.upstream = upstream
+        self.metrics = metrics
+        self.session_factory = session_factory
+        self.wakeup = wakeup or Wakeup()
+        # Work is claimed again as soon as a replica of the upstream recovers
+        upstream.balancer.on_state_change(self.wakeup.set)
+
+    async def housekeeping(self) -> None:
+        """Periodic upkeep of the worker, e.g. updating its queue depth gauge."""
+
+    async def get_batch(self, session: AsyncSession, batch_size: int) -> Sequence[Task]:
+        """Lease up to `batch_size` tasks to the worker, and commit."""
+        raise NotImplementedError
+
+    def describe(self, batch: Sequence[Task]) -> str:
+        raise NotImplementedError
+
+    async def settle_locally(self, session: AsyncSession, batch: Sequence[Task]) -> Tuple[List[Result], List[Task]]:
+        """Settle the tasks that need no upstream request, returning their results and the other tasks."""
+        return [], list(batch)
+
+    def dispatches(self, session: AsyncSession, tasks: Sequence[Task]) -> List[Tuple[Awaitable[List[Result]], int]]:
+        """The dispatches of `tasks`, with the number of tasks each one settles."""
+        raise NotImplementedError
+
+    async def commit_results(self, session: AsyncSession, results: Sequence[Result]) -> None:
+        raise NotImplementedError
+
+    async def handle_dispatch(
+        self, dispatch: Awaitable[None], description: str, reraise: Tuple[Type[Exception], ...] = ()
+    ) -> Optional[str]:
+        """
+        Await a dispatch, returning None if it succeeded or the error it failed with. `reraise` errors are not an
+        outcome of the dispatch, e.g. an unsupported protocol the caller falls back from, and are raised uncounted.
+        """
+        try:
+            # The upstream latency is observed by the concurrency limiter, which may hold the request back first
+            await dispatch
+        except reraise:
+            raise
+        except CircuitOpenError as e:
+            logger.warning(f"Not dispatching {description}: {e}.")
+            error = e
+        except asyncio.TimeoutError as e:
+            logger.error(f"Timeout while dispatching {description}.")
+            self.metrics.timeouts.inc()
+            error = e
+        except Exception as e:
+            logger.error(f"Error processing {description}: {e}")
+            logger.error("Stack trace:")
+            for line in traceback.format_exception(type(e), e, e.__traceback__):
+                logger.error(line)
+            error = e
+        else:
+            self.metrics.total_dispatches.inc()
+            return None
+        self.metrics.total_dispatches.inc()
+        self.metrics.failed_dispatches.inc()
+        return format_error(error)
+
+    def retry_update(self, attempts: int, error: str, description: str) -> Dict[str, Any]:
+        """
+        Update of a task that failed its `attempts`-th attempt: its lease is released and it is retried after a
+        backoff, or left FAILED once it has used up its attempts.
+        """
+        retry_at = next_attempt_at(datetime.now(timezone.utc), attempts, self.settings)
+        if retry_at is None:
+            logger.warning(f"Giving up on {description} after {attempts} attempts: {error}")
+            self.metrics.dead_lettered.inc()
+        else:
+            self.metrics.retries_scheduled.inc()
+        return {
+            "status": self.pending_status if retry_at else self.failed_status,
+            "next_attempt_at": retry_at,
+            "last_error": error,
+            "lease_owner": None,
+            "lease_expires_at": None,
+        }
+
+    async def dispatch_batch(
+        self, session: AsyncSession, batch: Sequence[Task], slots: Optional[ClaimSlots] = None
+    ) -> None:
+        self.metrics.batch_size.observe(len(batch))
+        logger.info(f"Dispatching {self.describe(batch)}.")
+        batch_start_time = time.monotonic()
+        settled, tasks = await self.settle_locally(session, batch)
+        if slots is not None and settled:
+            slots.release(len(settled))
+        await self.commit_results(session, settled)
+
+        dispatches = self.dispatches(session, tasks)
+        if slots is not None:
+            dispatches = [(slots.track(dispatch, size), size) for dispatch, size in dispatches]
+        # Results are committed in micro-batches as they arrive, so a slow request does not hold back the others
+        finished_results: List[Result] = []
+        for finished in asyncio.as_completed([dispatch for dispatch, _ in dispatches]):
+            finished_results.extend(await finished)
+            if len(finished_results) >= self.settings.result_commit_size:
+                await self.commit_results(session, finished_results)
+                finished_results = []
+        await self.commit_results(session, finished_results)
+        self.metrics.batch_dispatch_duration.observe(time.monotonic() - batch_start_time)
+
+    async def run_batches(self) -> None:
+        while True:
+            await self.housekeeping()
+            # No more work is claimed than the concurrency limit lets through at once, so that claimed tasks do not
+            # wait on the limiter until their lease expires, and none while every upstream replica is considered down,
+            # except the trials probing their recovery
+            claim_size = self.upstream.balancer.claimable(min(self.settings.batch_size, self.upstream.limiter.limit))
+            batch: Sequence[Task] = []
+            if claim_size:
+                async with self.session_factory() as session:
+                    batch = await self.get_batch(session, claim_size)
+                    if batch:
+                        self.metrics.in_flight_dispatches.set(len(batch))
+                        await self.dispatch_batch(session, batch)
+                        self.metrics.in_flight_dispatches.set(0)
+
+            if not claim_size or len(batch) < claim_size:
+                # The queue has been drained or the upstream is down, so wait until new work is announced or a circuit
+                # breaker changes state
+                await self.wakeup.wait(self.settings.idle_poll_seconds)
+            else:
+                await asyncio.sleep(self.settings.interval_seconds)
+
+    async def run_streaming(self) -> None:
+        window = DispatchWindow(self.upstream.limiter, self.metrics.in_flight_dispatches, self.wakeup)
+
+        async def claim(free_slots: int) -> Optional[Awaitable[None]]:
+            claim_size = self.upstream.balancer.claimable(free_slots)
+            if not claim_size:
+                return None
+            session = self.session_factory()
+            batch = await self.get_batch(session, claim_size)
+            if not batch:
+                await session.close()
+                return None
+            slots = window.acquire(len(batch))
+
+            async def dispatch() -> None:
+                try:
+                    async with session:
+                        await self.dispatch_batch(session, batch, slots)
+                finally:
+                    slots.release_remaining()
+
+            return dispatch()
+
+        await stream_dispatch(
+            window,
+            claim,
+            self.housekeeping,
+            self.settings.interval_seconds,
+            self.settings.idle_poll_seconds,
+            self.settings.streaming_max_open_claims,
+        )
+
+    async def run(self) -> None:
+        if self.settings.dispatch_mode == "streaming":
+            await self.run_streaming()
+        else:
+            await self.run_batches()
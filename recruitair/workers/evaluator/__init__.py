@@ -1,100 +1,327 @@
 import asyncio
+import contextlib
 import logging
 import time
-import traceback
-from typing import Sequence, Tuple
+from typing import AsyncContextManager, Awaitable, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import exists, select, text
-from sqlalchemy.ext.asyncio import AsyncSession
+from aiohttp import TCPConnector
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from ..dispatch import DispatchMetrics, QueueWorker, Wakeup
+from ..handoff import EvaluationHandoff, evaluation_handoff
+from ..hedging import RequestHedger
+from ..http_client import create_http_client
+from ..leases import WORKER_ID, lease_window, seconds_since
+from ..upstream import Upstream, UpstreamMetrics, create_upstream
 from .evaluator_settings import EvaluatorWorkerSettings
 
 logger = logging.getLogger(__name__)
 settings = EvaluatorWorkerSettings()
 
-from ...database import get_async_session
-from ...database.models import Applicant, ApplicantScore, Criterion
-from .applicant_evaluation import evaluate_applicant
+from ...database import AsyncSessionLocal, get_async_session
+from ...database.models import (
+    Applicant,
+    Criterion,
+    EvaluationTask,
+    EvaluationTaskStatus,
+    claim_evaluations,
+    dequeue_evaluations,
+    release_evaluations,
+)
+from ...database.notifications import EVALUATION_CHANNEL, listen
+from .applicant_evaluation import (
+    BatchEvaluationUnsupported,
+    discard_scores,
+    evaluate_applicant,
+    evaluate_applicant_criteria,
+    record_score,
+    write_scores,
+)
+from .evaluation_cache import EvaluationCache
 from .monitoring import (
     evaluator_batch_dispatch_duration,
     evaluator_batch_obtaining_duration,
     evaluator_batch_size,
+    evaluator_batched_fallbacks,
+    evaluator_batched_request_size,
+    evaluator_circuit_breaker_state,
+    evaluator_concurrency_limit,
+    evaluator_dead_lettered,
     evaluator_failed_dispatches,
+    evaluator_handed_over_evaluations,
+    evaluator_hedge_delay,
+    evaluator_hedge_wins,
+    evaluator_hedged_requests,
+    evaluator_http_connections_created,
+    evaluator_http_connections_reused,
+    evaluator_in_flight_dispatches,
+    evaluator_queue_depth,
+    evaluator_queue_wait,
+    evaluator_retries_scheduled,
     evaluator_single_dispatch_duration,
+    evaluator_throttle_wait,
+    evaluator_throttled_responses,
     evaluator_timeouts,
     evaluator_total_dispatches,
+    evaluator_transaction_duration,
+    evaluator_upstream_outstanding_requests,
+    evaluator_upstream_request_duration,
+)
+
+_CLAIMED_ATTEMPTS_KEY = "recruitair_claimed_attempts"
+
+upstream_metrics = UpstreamMetrics(
+    evaluator_concurrency_limit,
+    evaluator_single_dispatch_duration,
+    evaluator_throttle_wait,
+    evaluator_throttled_responses,
+    evaluator_circuit_breaker_state,
+    evaluator_upstream_request_duration,
+    evaluator_upstream_outstanding_requests,
+)
+dispatch_metrics = DispatchMetrics(
+    evaluator_batch_size,
+    evaluator_batch_dispatch_duration,
+    evaluator_in_flight_dispatches,
+    evaluator_total_dispatches,
+    evaluator_failed_dispatches,
+    evaluator_timeouts,
+    evaluator_retries_scheduled,
+    evaluator_dead_lettered,
 )
 
+# Outcome of an evaluation task: (applicant_id, criteria_id, error), where error is None if it was scored
+EvaluationResult = Tuple[int, int, Optional[str]]
+
+
+def group_by_applicant(
+    batch: Sequence[Tuple[Applicant, Criterion]],
+) -> List[Tuple[Applicant, List[Criterion]]]:
+    groups: Dict[int, Tuple[Applicant, List[Criterion]]] = {}
+    for applicant, criterion in batch:
+        groups.setdefault(applicant.id, (applicant, []))[1].append(criterion)
+    return list(groups.values())
+
+
+class EvaluatorWorker(QueueWorker[Tuple[Applicant, Criterion], EvaluationResult]):
+    """Scores applicants against the criteria of their job offer with the evaluator API."""
+
+    pending_status = EvaluationTaskStatus.PENDING
+    failed_status = EvaluationTaskStatus.FAILED
+
+    def __init__(
+        self,
+        settings: EvaluatorWorkerSettings,
+        upstream: Upstream,
+        cache: Optional[EvaluationCache] = None,
+        handoff: EvaluationHandoff = evaluation_handoff,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+    ):
+        super().__init__(settings, upstream, dispatch_metrics, session_factory)
+        self.cache = cache
+        self.handoff = handoff
+        # Cleared the first time the evaluator API turns out not to implement the batched protocol
+        self.batched_evaluation_supported = settings.batched_evaluation
+        handoff.on_put(self.wakeup.set)
+
+    async def housekeeping(self) -> None:
+        async with self.session_factory() as session:
+            queue_depth = await session.scalar(
+                select(func.count())
+                .select_from(EvaluationTask)
+                .where(EvaluationTask.status == EvaluationTaskStatus.PENDING)
+            )
+        evaluator_queue_depth.set(queue_depth)
 
-async def get_batch(session: AsyncSession, batch_size: int) -> Sequence[Tuple[Applicant, Criterion]]:
-    start_time = time.monotonic()
-    query = (
-        select(Applicant, Criterion)
-        .join(Criterion, Applicant.offer_id == Criterion.offer_id)
-        .where(
-            ~exists().where(
-                (ApplicantScore.applicant_id == Applicant.id) & (Criterion.id == ApplicantScore.criteria_id)
+    async def get_batch(self, session: AsyncSession, batch_size: int) -> Sequence[Tuple[Applicant, Criterion]]:
+        start_time = time.monotonic()
+        now, lease_expires_at = lease_window(self.settings.lease_seconds)
+        # Evaluations handed over by the extractor of this process are already leased
+        claimed = self.handoff.take(batch_size, now)
+        evaluator_handed_over_evaluations.inc(len(claimed))
+        if len(claimed) < batch_size:
+            # Lease the next queued evaluations in the configured order and commit right away, so that no lock is held
+            # while they are dispatched
+            claim = claim_evaluations(
+                WORKER_ID,
+                now,
+                lease_expires_at,
+                batch_size - len(claimed),
+                self.settings.scheduling_policy,
+                self.settings.prioritize_important_criteria,
+            )
+            claimed += (await session.execute(claim)).tuples().all()
+        for _, _, attempts, created_at, priority in claimed:
+            if attempts == 1:
+                evaluator_queue_wait.labels(priority=str(priority)).observe(seconds_since(created_at, now))
+        # Remember the attempt number of every claimed pair, to schedule its retry if it fails
+        session.info[_CLAIMED_ATTEMPTS_KEY] = {
+            (applicant_id, criteria_id): attempts for applicant_id, criteria_id, attempts, _, _ in claimed
+        }
+        batch = []
+        if claimed:
+            result = await session.execute(
+                select(Applicant, Criterion)
+                .join(Criterion, Criterion.offer_id == Applicant.offer_id)
+                .where(
+                    tuple_(Applicant.id, Criterion.id).in_(
+                        [(applicant_id, criteria_id) for applicant_id, criteria_id, _, _, _ in claimed]
+                    )
+                )
             )
+            batch = result.tuples().all()
+        await session.commit()
+        evaluator_transaction_duration.labels(kind="claim").observe(time.monotonic() - start_time)
+        if batch:
+            evaluator_batch_obtaining_duration.observe(time.monotonic() - start_time)
+        return batch
+
+    def describe(self, batch: Sequence[Tuple[Applicant, Criterion]]) -> str:
+        pairs = ", ".join(f"(a:{applicant.id}, c:{criterion.id})" for applicant, criterion in batch)
+        return f"applicant and criterion pairs {pairs}"
+
+    async def settle_locally(
+        self, session: AsyncSession, batch: Sequence[Tuple[Applicant, Criterion]]
+    ) -> Tuple[List[EvaluationResult], List[Tuple[Applicant, Criterion]]]:
+        """Record the cached scores of the batch, returning the pairs that have none."""
+        if self.cache is None:
+            return [], list(batch)
+        cached_scores = await self.cache.lookup(session, batch)
+        uncached = []
+        for applicant, criterion in batch:
+            if (applicant.id, criterion.id) in cached_scores:
+                record_score(applicant, criterion, cached_scores[(applicant.id, criterion.id)], session)
+            else:
+                uncached.append((applicant, criterion))
+        return [(applicant_id, criteria_id, None) for applicant_id, criteria_id in cached_scores], uncached
+
+    async def handle_applicant_score(
+        self, applicant: Applicant, criterion: Criterion, session: AsyncSession
+    ) -> Optional[str]:
+        return await self.handle_dispatch(
+            evaluate_applicant(applicant, criterion, session, self.upstream, self.cache),
+            f"applicant id {applicant.id} for criterion id {criterion.id}",
         )
-        .order_by(Applicant.created_at)
-    )
-    offset = 0
-    batch = []
-    while len(batch) < batch_size:
-        result = await session.execute(query.offset(offset))
-        candidate_row = result.first()
-        if not candidate_row:
-            break
-        offset += 1
-        applicant, criterion = candidate_row
-        # Before adding it to the batch, attempt locking the combination of Applicant and Criterion to avoid race
-        # conditions with other worker instances. If the lock cannot be acquired, skip this candidate.
-        lock_acquired = await session.execute(
-            text("SELECT pg_try_advisory_xact_lock(:lock_key)").bindparams(lock_key=hash((applicant.id, criterion.id)))
+
+    async def handle_applicant_criteria(
+        self, applicant: Applicant, criteria: Sequence[Criterion], session: AsyncSession
+    ) -> List[Optional[str]]:
+        """Score an applicant against `criteria`, batched in one request when the evaluator API supports it."""
+        if len(criteria) > 1 and self.batched_evaluation_supported:
+            try:
+                error = await self.handle_dispatch(
+                    evaluate_applicant_criteria(applicant, criteria, session, self.upstream, self.cache),
+                    f"applicant id {applicant.id} for criteria ids {[criterion.id for criterion in criteria]}",
+                    reraise=(BatchEvaluationUnsupported,),
+                )
+                if error is None:
+                    evaluator_batched_request_size.observe(len(criteria))
+                return [error] * len(criteria)
+            except BatchEvaluationUnsupported as e:
+                if self.batched_evaluation_supported:
+                    logger.warning(f"The evaluator API does not support batched evaluations ({e}), falling back.")
+                    self.batched_evaluation_supported = False
+                evaluator_batched_fallbacks.inc()
+        return list(
+            await asyncio.gather(
+                *(self.handle_applicant_score(applicant, criterion, session) for criterion in criteria)
+            )
         )
-        if lock_acquired.scalar():
-            batch.append((applicant, criterion))
-    if batch:
-        evaluator_batch_obtaining_duration.observe(time.monotonic() - start_time)
-    return batch
 
+    async def evaluate_group(
+        self, session: AsyncSession, applicant: Applicant, criteria: List[Criterion]
+    ) -> List[EvaluationResult]:
+        errors = await self.handle_applicant_criteria(applicant, criteria, session)
+        return [(applicant.id, criterion.id, error) for criterion, error in zip(criteria, errors)]
 
-async def handle_applicant_score(applicant: Applicant, criterion: Criterion, session: AsyncSession):
-    evaluator_total_dispatches.inc()
-    try:
+    def dispatches(
+        self, session: AsyncSession, tasks: Sequence[Tuple[Applicant, Criterion]]
+    ) -> List[Tuple[Awaitable[List[EvaluationResult]], int]]:
+        return [
+            (self.evaluate_group(session, applicant, criteria), len(criteria))
+            for applicant, criteria in group_by_applicant(tasks)
+        ]
+
+    async def commit_results(self, session: AsyncSession, results: Sequence[EvaluationResult]) -> None:
+        """Dequeue the scored pairs together with their scores, and schedule a retry of the failed ones."""
         start_time = time.monotonic()
-        await evaluate_applicant(applicant, criterion, session)
-        evaluator_single_dispatch_duration.observe(time.monotonic() - start_time)
-    except asyncio.TimeoutError:
-        logger.error(f"Timeout while evaluating applicant id {applicant.id} for criterion id {criterion.id}.")
-        evaluator_timeouts.inc()
-        evaluator_failed_dispatches.inc()
-    except Exception as e:
-        logger.error(f"Error processing applicant id {applicant.id} and criterion id {criterion.id}: {e}")
-        logger.error("Stack trace:")
-        for line in traceback.format_exception(type(e), e, e.__traceback__):
-            logger.error(line)
-        evaluator_failed_dispatches.inc()
-
-
-async def evaluator_worker():
+        evaluated = [(applicant_id, criteria_id) for applicant_id, criteria_id, error in results if error is None]
+        failed = [
+            (applicant_id, criteria_id, error) for applicant_id, criteria_id, error in results if error is not None
+        ]
+        if evaluated:
+            # Tasks whose lease expired and went to another worker are left to it, and so are their scores
+            dequeued = (await session.execute(dequeue_evaluations(WORKER_ID, evaluated))).tuples().all()
+            await write_scores(session, dequeued)
+            discard_scores(session, evaluated)
+        if failed:
+            claimed_attempts = session.info.get(_CLAIMED_ATTEMPTS_KEY, {})
+            await session.execute(
+                release_evaluations(WORKER_ID),
+                [
+                    {
+                        "applicant_id": applicant_id,
+                        "criteria_id": criteria_id,
+                        **self.retry_update(
+                            claimed_attempts.get((applicant_id, criteria_id), 1),
+                            error,
+                            f"applicant id {applicant_id} for criterion id {criteria_id}",
+                        ),
+                    }
+                    for applicant_id, criteria_id, error in failed
+                ],
+            )
+        if self.cache is not None:
+            await self.cache.flush(session)
+        await session.commit()
+        evaluator_transaction_duration.labels(kind="results").observe(time.monotonic() - start_time)
+
+
+def listen_for_work(wakeup: Wakeup) -> AsyncContextManager[None]:
+    if settings.listen_for_notifications:
+        return listen(EVALUATION_CHANNEL, wakeup.set)
+    return contextlib.nullcontext()
+
+
+async def evaluator_worker(connector: Optional[TCPConnector] = None):
+    """Run the evaluator worker, pooling its upstream connections in `connector` if given (see the pipeline worker)."""
     logger.info(
-        f"Starting Evaluator Worker with batch size {settings.batch_size} "
+        f"Starting Evaluator Worker in {settings.dispatch_mode} dispatch mode with batch size {settings.batch_size} "
         f"and interval {settings.interval_seconds} seconds."
     )
 
-    while True:
+    cache = None
+    if settings.evaluation_cache:
+        cache = EvaluationCache(settings.evaluator_model_version, settings.evaluation_cache_size)
         async with get_async_session() as session:
-            batch = await get_batch(session, settings.batch_size)
-            if batch:
-                evaluator_batch_size.observe(len(batch))
-                logger.info(
-                    f"Dispatching applicant and criterion pairs {', '.join(f'(a:{applicant.id}, c:{criterion.id})' for applicant, criterion in batch)}."
-                )
-                batch_start_time = time.monotonic()
-                tasks = [handle_applicant_score(applicant, criterion, session) for (applicant, criterion) in batch]
-                await asyncio.gather(*tasks)
-                await session.commit()
-                evaluator_batch_dispatch_duration.observe(time.monotonic() - batch_start_time)
+            await cache.purge_stale(session)
 
-            await asyncio.sleep(settings.interval_seconds)
+    base_urls = [
+        str(base_url) for base_url in [settings.evaluator_api_base_url, *settings.evaluator_api_replica_base_urls]
+    ]
+    hedger = (
+        RequestHedger(
+            settings.hedge_percentile,
+            settings.hedge_budget,
+            evaluator_hedged_requests,
+            evaluator_hedge_wins,
+            evaluator_hedge_delay,
+        )
+        if settings.hedge_requests
+        else None
+    )
+    async with create_http_client(
+        settings,
+        str(settings.evaluator_api_base_url),
+        settings.evaluator_api_bearer_token,
+        settings.http_timeout,
+        evaluator_http_connections_created,
+        evaluator_http_connections_reused,
+        connector,
+    ) as http_client:
+        worker = EvaluatorWorker(
+            settings, create_upstream(settings, http_client, base_urls, upstream_metrics, hedger), cache
+        )
+        async with listen_for_work(worker.wakeup):
+            await worker.run()
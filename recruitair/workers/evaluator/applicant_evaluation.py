@@ -1,16 +1,24 @@
-from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Sequence, Tuple
 
-from aiohttp import ClientSession, ClientTimeout
+from aiohttp import ClientResponseError
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...database.models import Applicant, ApplicantScore, Criterion
-from . import logger, settings
-from .monitoring import (
-    evaluator_score_value,
-    evaluator_scores_computed,
-    evaluator_time_since_schedule,
-)
+from ...database.models import Applicant, Criterion, insert_scores
+from ..leases import seconds_since
+from ..upstream import Upstream
+from . import logger
+from .evaluation_cache import EvaluationCache
+from .monitoring import evaluator_score_value, evaluator_scores_computed, evaluator_time_since_schedule
+
+_PENDING_SCORES_KEY = "recruitair_pending_scores"
+
+# Status codes with which an upstream without the batched protocol answers to eval/batch
+BATCH_UNSUPPORTED_STATUSES = (404, 405, 501)
+
+
+class BatchEvaluationUnsupported(Exception):
+    """The evaluator API does not implement the batched eval/batch endpoint."""
 
 
 class ApplicantEvaluationResponse(BaseModel):
@@ -19,32 +27,99 @@ class ApplicantEvaluationResponse(BaseModel):
     )
 
 
-async def evaluate_applicant(applicant: Applicant, criterion: Criterion, session: AsyncSession) -> None:
-    async with ClientSession(
-        str(settings.evaluator_api_base_url),
-        headers={"Authorization": f"Bearer {settings.evaluator_api_bearer_token}"},
-        timeout=ClientTimeout(settings.http_timeout),
-    ) as http_client:
-        async with http_client.post(
-            "eval",
-            json={"criteria_description": criterion.description, "applicant_cv": applicant.cv},
-        ) as response:
-            response.raise_for_status()
-            logger.info(f"Successfully evaluated applicant id {applicant.id} for criterion id {criterion.id}.")
-
-            response_data = await response.json()
-            evaluation_response = ApplicantEvaluationResponse.model_validate(response_data)
-            new_applicant_score = ApplicantScore(
-                applicant_id=applicant.id,
-                criteria_id=criterion.id,
-                score=evaluation_response.score,
-            )
-            session.add(new_applicant_score)
-            evaluator_scores_computed.inc()
-            evaluator_score_value.observe(evaluation_response.score)
-            # The age is set by the minimum age between applicant and criterion
-            age_seconds = min(
-                (datetime.now(timezone.utc) - applicant.created_at).total_seconds(),
-                (datetime.now(timezone.utc) - criterion.created_at).total_seconds(),
-            )
-            evaluator_time_since_schedule.observe(age_seconds)
+class ApplicantBatchEvaluationResponse(BaseModel):
+    scores: List[float] = Field(
+        ...,
+        description="The scores assigned to the applicant, in the same order as the given criteria descriptions",
+    )
+
+
+def record_score(applicant: Applicant, criterion: Criterion, score: float, session: AsyncSession) -> None:
+    """Stage a score in `session`. Staged scores are written by `write_scores`."""
+    session.info.setdefault(_PENDING_SCORES_KEY, {})[(applicant.id, criterion.id)] = {
+        "applicant_id": applicant.id,
+        "criteria_id": criterion.id,
+        "score": score,
+    }
+    # The age is set by the minimum age between applicant and criterion
+    age_seconds = min(seconds_since(applicant.created_at), seconds_since(criterion.created_at))
+    evaluator_time_since_schedule.observe(age_seconds)
+
+
+async def write_scores(session: AsyncSession, pairs: Iterable[Tuple[int, int]]) -> None:
+    """
+    Write the scores staged in `session` for the given (applicant_id, criteria_id) pairs with a single multi-row insert,
+    keeping the scores that already exist.
+    """
+    pending_scores = session.info.get(_PENDING_SCORES_KEY, {})
+    rows = [pending_scores.pop(pair) for pair in pairs if pair in pending_scores]
+    if rows:
+        await session.execute(insert_scores(session.bind.dialect.name), rows)
+
+
+def discard_scores(session: AsyncSession, pairs: Iterable[Tuple[int, int]]) -> None:
+    """Drop the scores staged in `session` for the given pairs, e.g. those whose lease was lost."""
+    pending_scores = session.info.get(_PENDING_SCORES_KEY, {})
+    for pair in pairs:
+        pending_scores.pop(pair, None)
+
+
+def record_evaluation(
+    applicant: Applicant,
+    criterion: Criterion,
+    score: float,
+    session: AsyncSession,
+    cache: Optional[EvaluationCache] = None,
+) -> None:
+    """Record a score computed by the evaluator API, and cache it if a `cache` is given."""
+    record_score(applicant, criterion, score, session)
+    evaluator_scores_computed.inc()
+    evaluator_score_value.observe(score)
+    if cache is not None:
+        cache.store(session, applicant, criterion, score)
+
+
+async def evaluate_applicant(
+    applicant: Applicant,
+    criterion: Criterion,
+    session: AsyncSession,
+    upstream: Upstream,
+    cache: Optional[EvaluationCache] = None,
+) -> None:
+    response_data = await upstream.post(
+        "eval", {"criteria_description": criterion.description, "applicant_cv": applicant.cv}
+    )
+    logger.info(f"Successfully evaluated applicant id {applicant.id} for criterion id {criterion.id}.")
+    evaluation_response = ApplicantEvaluationResponse.model_validate(response_data)
+    record_evaluation(applicant, criterion, evaluation_response.score, session, cache)
+
+
+async def evaluate_applicant_criteria(
+    applicant: Applicant,
+    criteria: Sequence[Criterion],
+    session: AsyncSession,
+    upstream: Upstream,
+    cache: Optional[EvaluationCache] = None,
+) -> None:
+    """Score an applicant against several criteria with a single request, uploading the CV only once."""
+    try:
+        response_data = await upstream.post(
+            "eval/batch",
+            {"criteria_descriptions": [criterion.description for criterion in criteria], "applicant_cv": applicant.cv},
+        )
+    except ClientResponseError as e:
+        if e.status in BATCH_UNSUPPORTED_STATUSES:
+            raise BatchEvaluationUnsupported(f"eval/batch answered with status {e.status}") from e
+        raise
+
+    evaluation_response = ApplicantBatchEvaluationResponse.model_validate(response_data)
+    if len(evaluation_response.scores) != len(criteria):
+        raise ValueError(f"Expected {len(criteria)} scores, got {len(evaluation_response.scores)}")
+    # Validate every score before recording any, so that a bad response leaves the whole group queued
+    scores = [ApplicantEvaluationResponse(score=score).score for score in evaluation_response.scores]
+    logger.info(
+        f"Successfully evaluated applicant id {applicant.id} for criteria ids "
+        f"{[criterion.id for criterion in criteria]}."
+    )
+    for criterion, score in zip(criteria, scores):
+        record_evaluation(applicant, criterion, score, session, cache)
@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...database.models import Applicant, Criterion, EvaluationCacheEntry, cache_evaluations, content_hash
+from . import logger
+from .monitoring import evaluator_cache_hits, evaluator_cache_misses
+
+CacheKey = Tuple[str, str]
+
+_PENDING_CACHE_ENTRIES_KEY = "recruitair_pending_cache_entries"
+
+
+class EvaluationCache:
+    """
+    Scores keyed by the content hashes of (CV, criterion description), so that duplicated CVs and criteria are scored
+    without calling the evaluator API. An in-process LRU sits in front of the evaluation_cache table, and only
+    entries computed by `model_version` are ever read, so upgrading the evaluator model invalidates the cache.
+    """
+
+    def __init__(self, model_version: str, max_size: int):
+        self.model_version = model_version
+        self.max_size = max_size
+        self._entries: "OrderedDict[CacheKey, float]" = OrderedDict()
+
+    @staticmethod
+    def key(applicant: Applicant, criterion: Criterion) -> CacheKey:
+        return content_hash(applicant.cv), content_hash(criterion.description)
+
+    def _get_local(self, key: CacheKey) -> Optional[float]:
+        score = self._entries.get(key)
+        if score is not None:
+            self._entries.move_to_end(key)
+        return score
+
+    def _put_local(self, key: CacheKey, score: float) -> None:
+        self._entries[key] = score
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def lookup(
+        self, session: AsyncSession, batch: Sequence[Tuple[Applicant, Criterion]]
+    ) -> Dict[Tuple[int, int], float]:
+        """Return the cached scores of the given pairs, keyed by (applicant_id, criteria_id)."""
+        keys = {(applicant.id, criterion.id): self.key(applicant, criterion) for applicant, criterion in batch}
+        scores: Dict[CacheKey, float] = {}
+        tiers: Dict[CacheKey, str] = {}
+        for key in set(keys.values()):
+            score = self._get_local(key)
+            if score is not None:
+                scores[key], tiers[key] = score, "memory"
+
+        missing = list(set(keys.values()) - scores.keys())
+        if missing:
+            result = await session.execute(
+                select(EvaluationCacheEntry.cv_hash, EvaluationCacheEntry.criterion_hash, EvaluationCacheEntry.score)
+                .where(EvaluationCacheEntry.model_version == self.model_version)
+                .where(tuple_(EvaluationCacheEntry.cv_hash, EvaluationCacheEntry.criterion_hash).in_(missing))
+            )
+            for cv_hash, criterion_hash, score in result.tuples():
+                key = (cv_hash, criterion_hash)
+                scores[key], tiers[key] = score, "database"
+                self._put_local(key, score)
+
+        for key in keys.values():
+            if key in tiers:
+                evaluator_cache_hits.labels(tier=tiers[key]).inc()
+            else:
+                evaluator_cache_misses.inc()
+        return {pair: scores[key] for pair, key in keys.items() if key in scores}
+
+    def store(self, session: AsyncSession, applicant: Applicant, criterion: Criterion, score: float) -> None:
+        """Cache a score computed by the evaluator API. It is persisted by `flush`, with the rest of the batch."""
+        key = self.key(applicant, criterion)
+        self._put_local(key, score)
+        session.info.setdefault(_PENDING_CACHE_ENTRIES_KEY, {})[key] = score
+
+    async def flush(self, session: AsyncSession) -> None:
+        """Write the scores stored in `session` to the evaluation_cache table with a single statement."""
+        pending = session.info.pop(_PENDING_CACHE_ENTRIES_KEY, {})
+        if not pending:
+            return
+        await session.execute(
+            cache_evaluations(session.bind.dialect.name),
+            [
+                {
+                    "cv_hash": cv_hash,
+                    "criterion_hash": criterion_hash,
+                    "model_version": self.model_version,
+                    "score": score,
+                }
+                for (cv_hash, criterion_hash), score in pending.items()
+            ],
+        )
+
+    async def purge_stale(self, session: AsyncSession) -> None:
+        """Delete the entries computed by other model versions, which can no longer be read."""
+        result = await session.execute(
+            delete(EvaluationCacheEntry).where(EvaluationCacheEntry.model_version != self.model_version)
+        )
+        await session.commit()
+        if result.rowcount:
+            logger.info(f"Purged {result.rowcount} evaluation cache entries of previous model versions.")
@@ -1,9 +1,61 @@
+from typing import List
+
 from pydantic import Field, HttpUrl
 
+from ...database.models import SchedulingPolicy
 from ..common_settings import BaseWorkerSettings
 
 
 class EvaluatorWorkerSettings(BaseWorkerSettings):
     evaluator_api_base_url: HttpUrl = Field(..., description="Base URL for the evaluator API endpoint")
+    evaluator_api_replica_base_urls: List[HttpUrl] = Field(
+        [],
+        description=(
+            "Base URLs of further replicas of the evaluator API, which requests are balanced across along with "
+            "evaluator_api_base_url"
+        ),
+    )
     evaluator_api_bearer_token: str = Field(..., description="Bearer token for authenticating with the evaluator API")
     http_timeout: int = Field(30, description="HTTP timeout in seconds for requests to the evaluator API")
+    hedge_requests: bool = Field(
+        False,
+        description=(
+            "Whether to send a duplicate of the evaluator API requests that have not answered after hedge_percentile "
+            "of recent latencies, to another replica if there is one, keeping the first answer"
+        ),
+    )
+    hedge_percentile: float = Field(
+        95, gt=0, lt=100, description="Percentile of recent latencies after which a request is hedged"
+    )
+    hedge_budget: float = Field(0.05, gt=0, le=1, description="Maximum fraction of the requests that are hedged")
+    scheduling_policy: SchedulingPolicy = Field(
+        SchedulingPolicy.FIFO,
+        description=(
+            "Order in which queued evaluations are claimed: 'fifo' (oldest first), 'fair' (round-robin across job "
+            "offers) or 'weighted' (round-robin where offers of priority p get p + 1 evaluations per round). 'fair' "
+            "and 'weighted' rank the whole queue on every claim, so they suit queues of moderate size"
+        ),
+    )
+    prioritize_important_criteria: bool = Field(
+        True, description="Whether to evaluate the most important criteria of a job offer first"
+    )
+    batched_evaluation: bool = Field(
+        False,
+        description=(
+            "Group claimed evaluations by applicant and score all of their criteria with a single request to the "
+            "evaluator API's eval/batch endpoint, falling back to one request per criterion if it is not available"
+        ),
+    )
+    evaluator_model_version: str = Field(
+        "default",
+        description=(
+            "Version of the model served by the evaluator API. Cached scores are only reused by workers configured with "
+            "the same version, so changing it invalidates the evaluation cache"
+        ),
+    )
+    evaluation_cache: bool = Field(
+        False, description="Whether to reuse the scores of identical (CV, criterion description) pairs"
+    )
+    evaluation_cache_size: int = Field(
+        10000, description="Maximum number of scores kept in the in-process evaluation cache"
+    )
@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 evaluator_batch_obtaining_duration = Histogram(
     "evaluator_batch_obtaining_duration_seconds",
@@ -21,6 +21,123 @@ evaluator_single_dispatch_duration = Histogram(
     "Duration of a single evaluator dispatch call in seconds",
 )
 
+evaluator_transaction_duration = Histogram(
+    "evaluator_transaction_duration_seconds",
+    "Duration of evaluator database transactions in seconds, by kind (claim or results)",
+    ["kind"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+evaluator_queue_wait = Histogram(
+    "evaluator_queue_wait_seconds",
+    "Seconds evaluations waited in the queue before their first claim, by job offer priority class",
+    ["priority"],
+    buckets=(1, 5, 15, 30, 60, 300, 900, 1800, 3600, 7200, 14400, 43200, 86400),
+)
+
+evaluator_batched_request_size = Histogram(
+    "evaluator_batched_request_size",
+    "Number of criteria scored by a single batched request to the evaluator API",
+    buckets=(2, 3, 5, 10, 20, 50, 100),
+)
+
+evaluator_batched_fallbacks = Counter(
+    "evaluator_batched_fallbacks_total",
+    "Total number of times the evaluator fell back to per-criterion requests because batches are unsupported",
+)
+
+evaluator_cache_hits = Counter(
+    "evaluator_cache_hits_total",
+    "Total number of applicant evaluations answered by the evaluation cache, by cache tier",
+    ["tier"],
+)
+
+evaluator_cache_misses = Counter(
+    "evaluator_cache_misses_total",
+    "Total number of applicant evaluations not found in the evaluation cache",
+)
+
+evaluator_http_connections_created = Counter(
+    "evaluator_http_connections_created_total",
+    "Total number of new connections opened to the evaluator API",
+)
+
+evaluator_http_connections_reused = Counter(
+    "evaluator_http_connections_reused_total",
+    "Total number of evaluator dispatches that reused a pooled keep-alive connection",
+)
+
+evaluator_in_flight_dispatches = Gauge(
+    "evaluator_in_flight_dispatches",
+    "Number of applicant evaluations currently dispatched to the evaluator API",
+    multiprocess_mode="livesum",
+)
+
+evaluator_concurrency_limit = Gauge(
+    "evaluator_concurrency_limit",
+    "Current limit of applicant evaluations dispatched to the evaluator API at the same time",
+    multiprocess_mode="livesum",
+)
+
+evaluator_throttle_wait = Histogram(
+    "evaluator_throttle_wait_seconds",
+    "Time applicant evaluation requests waited for the rate limit of the evaluator API in seconds",
+    buckets=(0.0, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0),
+)
+
+evaluator_throttled_responses = Counter(
+    "evaluator_throttled_responses_total",
+    "Total number of evaluator API answers asking to retry later, whose request was re-sent after the requested delay",
+)
+
+evaluator_circuit_breaker_state = Gauge(
+    "evaluator_circuit_breaker_state",
+    "State of the circuit breaker of every evaluator API replica (0 closed, 1 half-open, 2 open)",
+    ["upstream"],
+    multiprocess_mode="livemax",
+)
+
+evaluator_upstream_request_duration = Histogram(
+    "evaluator_upstream_request_duration_seconds",
+    "Duration of the successful requests to every evaluator API replica in seconds",
+    ["upstream"],
+)
+
+evaluator_upstream_outstanding_requests = Gauge(
+    "evaluator_upstream_outstanding_requests",
+    "Number of requests in flight to every evaluator API replica",
+    ["upstream"],
+    multiprocess_mode="livesum",
+)
+
+evaluator_handed_over_evaluations = Counter(
+    "evaluator_handed_over_evaluations_total",
+    "Total number of evaluations handed over in memory by the extractor of the same process, instead of claimed",
+)
+
+evaluator_hedged_requests = Counter(
+    "evaluator_hedged_requests_total",
+    "Total number of evaluator API requests that were slow enough to be duplicated",
+)
+
+evaluator_hedge_wins = Counter(
+    "evaluator_hedge_wins_total",
+    "Total number of hedged evaluator API requests answered first by the duplicate",
+)
+
+evaluator_hedge_delay = Gauge(
+    "evaluator_hedge_delay_seconds",
+    "Seconds after which an evaluator API request that has not answered is hedged",
+    multiprocess_mode="livemax",
+)
+
+evaluator_queue_depth = Gauge(
+    "evaluator_queue_depth",
+    "Number of applicant evaluations waiting in the evaluation queue",
+    # Every worker process measures the same queue
+    multiprocess_mode="livemax",
+)
+
 evaluator_total_dispatches = Counter(
     "evaluator_total_dispatches",
     "Total number of evaluator dispatch attempts",
@@ -31,6 +148,16 @@ evaluator_failed_dispatches = Counter(
     "Total number of failed evaluator dispatch attempts",
 )
 
+evaluator_retries_scheduled = Counter(
+    "evaluator_retries_scheduled_total",
+    "Total number of failed applicant evaluations scheduled for a retry with backoff",
+)
+
+evaluator_dead_lettered = Counter(
+    "evaluator_dead_lettered_total",
+    "Total number of applicant evaluations marked FAILED after running out of attempts",
+)
+
 evaluator_timeouts = Counter(
     "evaluator_timeouts_total",
     "Total number of evaluator dispatch attempts that timed out",
@@ -1,76 +1,243 @@
-import asyncio
+import contextlib
 import logging
 import time
-import traceback
-from typing import Sequence
+from datetime import datetime, timezone
+from typing import AsyncContextManager, Awaitable, List, Optional, Sequence, Tuple
 
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from aiohttp import TCPConnector
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from ..dispatch import DispatchMetrics, QueueWorker, Wakeup
+from ..handoff import EvaluationHandoff, evaluation_handoff
+from ..http_client import create_http_client
+from ..leases import WORKER_ID, lease_window, seconds_since
+from ..upstream import Upstream, UpstreamMetrics, create_upstream
 from .extractor_settings import ExtractorWorkerSettings
 
 logger = logging.getLogger(__name__)
 settings = ExtractorWorkerSettings()
 
-from ...database import get_async_session
-from ...database.models import JobOffer, JobOfferStatus
-from .criteria_extraction import extract_criteria
+from ...database import AsyncSessionLocal
+from ...database.models import (
+    Criterion,
+    JobOffer,
+    JobOfferStatus,
+    claim_job_offers,
+    complete_job_offers,
+    enqueue_evaluations,
+    reap_job_offer_leases,
+)
+from ...database.notifications import EVALUATION_CHANNEL, EXTRACTION_CHANNEL, listen, notify_async
+from .criteria_extraction import clone_extracted_duplicates, extract_criteria, write_criteria
 from .monitoring import (
     extractor_batch_dispatch_duration,
     extractor_batch_size,
+    extractor_circuit_breaker_state,
+    extractor_concurrency_limit,
+    extractor_dead_lettered,
     extractor_failed_dispatches,
+    extractor_http_connections_created,
+    extractor_http_connections_reused,
+    extractor_in_flight_dispatches,
+    extractor_leases_reaped,
+    extractor_queue_depth,
+    extractor_queue_wait,
+    extractor_retries_scheduled,
     extractor_single_dispatch_duration,
+    extractor_throttle_wait,
+    extractor_throttled_responses,
     extractor_timeouts,
     extractor_total_dispatches,
+    extractor_transaction_duration,
+    extractor_upstream_outstanding_requests,
+    extractor_upstream_request_duration,
+)
+
+dispatch_metrics = DispatchMetrics(
+    extractor_batch_size,
+    extractor_batch_dispatch_duration,
+    extractor_in_flight_dispatches,
+    extractor_total_dispatches,
+    extractor_failed_dispatches,
+    extractor_timeouts,
+    extractor_retries_scheduled,
+    extractor_dead_lettered,
 )
 
+# Outcome of an extraction task: (job_offer, error), where error is None if its criteria were extracted
+ExtractionResult = Tuple[JobOffer, Optional[str]]
 
-async def get_batch(session: AsyncSession, batch_size: int) -> Sequence[JobOffer]:
-    query = (
-        select(JobOffer)
-        .where(JobOffer.status == JobOfferStatus.PENDING)
-        .order_by(JobOffer.created_at)
-        .limit(batch_size)
-        .with_for_update(skip_locked=True)
-    )
-    result = await session.execute(query)
-    return result.scalars().all()
+upstream_metrics = UpstreamMetrics(
+    extractor_concurrency_limit,
+    extractor_single_dispatch_duration,
+    extractor_throttle_wait,
+    extractor_throttled_responses,
+    extractor_circuit_breaker_state,
+    extractor_upstream_request_duration,
+    extractor_upstream_outstanding_requests,
+)
+
+
+class ExtractorWorker(QueueWorker[JobOffer, ExtractionResult]):
+    """Extracts the criteria of job offers with the extractor API."""
+
+    pending_status = JobOfferStatus.PENDING
+    failed_status = JobOfferStatus.FAILED
 
+    def __init__(
+        self,
+        settings: ExtractorWorkerSettings,
+        upstream: Upstream,
+        handoff: EvaluationHandoff = evaluation_handoff,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+    ):
+        super().__init__(settings, upstream, dispatch_metrics, session_factory)
+        self.handoff = handoff
 
-async def handle_job_offer(job_offer: JobOffer, session: AsyncSession):
-    extractor_total_dispatches.inc()
-    try:
+    async def reap_expired_leases(self) -> None:
+        """Return the offers whose lease expired, e.g. because their worker crashed, to the queue."""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                reap_job_offer_leases(datetime.now(timezone.utc), self.settings.max_attempts)
+            )
+            await session.commit()
+        if result.rowcount:
+            logger.warning(f"Reaped {result.rowcount} job offers whose lease expired.")
+            extractor_leases_reaped.inc(result.rowcount)
+
+    async def update_queue_depth(self) -> None:
+        async with self.session_factory() as session:
+            queue_depth = await session.scalar(
+                select(func.count()).select_from(JobOffer).where(JobOffer.status == JobOfferStatus.PENDING)
+            )
+        extractor_queue_depth.set(queue_depth)
+
+    async def housekeeping(self) -> None:
+        await self.reap_expired_leases()
+        await self.update_queue_depth()
+
+    async def get_batch(self, session: AsyncSession, batch_size: int) -> Sequence[JobOffer]:
         start_time = time.monotonic()
-        await extract_criteria(job_offer, session)
-        extractor_single_dispatch_duration.observe(time.monotonic() - start_time)
-    except asyncio.TimeoutError:
-        logger.error(f"Timeout while extracting criteria for job offer id {job_offer.id}.")
-        extractor_timeouts.inc()
-        extractor_failed_dispatches.inc()
-    except Exception as e:
-        logger.error(f"Error processing job offer id {job_offer.id}: {e}")
-        logger.error("Stack trace:")
-        for line in traceback.format_exception(type(e), e, e.__traceback__):
-            logger.error(line)
-        extractor_failed_dispatches.inc()
-
-
-async def extractor_worker():
+        # Lease the oldest pending offers of the highest priority and commit right away, so that no lock is held while
+        # they are dispatched
+        now, lease_expires_at = lease_window(self.settings.lease_seconds)
+        claimed_ids = (
+            (await session.execute(claim_job_offers(WORKER_ID, now, lease_expires_at, batch_size))).scalars().all()
+        )
+        batch = []
+        if claimed_ids:
+            batch = (
+                (
+                    await session.execute(
+                        select(JobOffer).where(JobOffer.id.in_(claimed_ids)).order_by(JobOffer.created_at)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+        await session.commit()
+        extractor_transaction_duration.labels(kind="claim").observe(time.monotonic() - start_time)
+        for job_offer in batch:
+            if job_offer.attempts == 1:
+                extractor_queue_wait.labels(priority=str(job_offer.priority)).observe(
+                    seconds_since(job_offer.created_at, now)
+                )
+        return batch
+
+    def describe(self, batch: Sequence[JobOffer]) -> str:
+        return f"job offers with ids {[job_offer.id for job_offer in batch]}"
+
+    async def settle_locally(
+        self, session: AsyncSession, batch: Sequence[JobOffer]
+    ) -> Tuple[List[ExtractionResult], List[JobOffer]]:
+        """Give the offers reposted with the text of an offer already extracted its criteria, returning the others."""
+        if not self.settings.deduplicate_extractions:
+            return [], list(batch)
+        cloned = await clone_extracted_duplicates(session, batch)
+        return [(job_offer, None) for job_offer in cloned], [
+            job_offer for job_offer in batch if job_offer not in cloned
+        ]
+
+    async def extract(self, session: AsyncSession, job_offer: JobOffer) -> List[ExtractionResult]:
+        error = await self.handle_dispatch(
+            extract_criteria(job_offer, session, self.upstream, self.settings.deduplicate_extractions),
+            f"job offer id {job_offer.id}",
+        )
+        return [(job_offer, error)]
+
+    def dispatches(
+        self, session: AsyncSession, tasks: Sequence[JobOffer]
+    ) -> List[Tuple[Awaitable[List[ExtractionResult]], int]]:
+        return [(self.extract(session, job_offer), 1) for job_offer in tasks]
+
+    async def commit_results(self, session: AsyncSession, results: Sequence[ExtractionResult]) -> None:
+        """Mark the extracted offers DONE together with their criteria, and schedule a retry of the failed ones."""
+        start_time = time.monotonic()
+        extracted_ids = [job_offer.id for job_offer, error in results if error is None]
+        failed = [
+            {"id": job_offer.id, **self.retry_update(job_offer.attempts, error, f"job offer id {job_offer.id}")}
+            for job_offer, error in results
+            if error is not None
+        ]
+        if extracted_ids:
+            # Offers whose lease was lost meanwhile are left to the worker that holds it now
+            extracted_ids = (await session.execute(complete_job_offers(WORKER_ID, extracted_ids))).scalars().all()
+            await write_criteria(session, extracted_ids)
+        handed_over = []
+        if extracted_ids and self.handoff.enabled:
+            # Schedule the evaluation of every applicant of the offers against their new criteria, leased to the
+            # evaluator of this process and handed over to it once committed
+            _, lease_expires_at = lease_window(self.settings.lease_seconds)
+            handed_over = (
+                await session.execute(
+                    enqueue_evaluations(
+                        Criterion.offer_id.in_(extracted_ids), lease_owner=WORKER_ID, lease_expires_at=lease_expires_at
+                    )
+                )
+            ).all()
+        elif extracted_ids:
+            # Schedule the evaluation of every applicant of the offers against their new criteria
+            await session.execute(enqueue_evaluations(Criterion.offer_id.in_(extracted_ids)))
+            await notify_async(session, EVALUATION_CHANNEL)
+        if failed:
+            # The claimed offers loaded in the session are not refreshed, as bulk updates by primary key with an extra
+            # criteria do not support it
+            await session.execute(
+                update(JobOffer).where(JobOffer.lease_owner == WORKER_ID).execution_options(synchronize_session=None),
+                failed,
+            )
+        await session.commit()
+        extractor_transaction_duration.labels(kind="results").observe(time.monotonic() - start_time)
+        if handed_over:
+            self.handoff.put(handed_over, lease_expires_at)
+
+
+def listen_for_work(wakeup: Wakeup) -> AsyncContextManager[None]:
+    if settings.listen_for_notifications:
+        return listen(EXTRACTION_CHANNEL, wakeup.set)
+    return contextlib.nullcontext()
+
+
+async def extractor_worker(connector: Optional[TCPConnector] = None):
+    """Run the extractor worker, pooling its upstream connections in `connector` if given (see the pipeline worker)."""
     logger.info(
-        f"Starting Extractor Worker with batch size {settings.batch_size} "
+        f"Starting Extractor Worker in {settings.dispatch_mode} dispatch mode with batch size {settings.batch_size} "
         f"and interval {settings.interval_seconds} seconds."
     )
 
-    while True:
-        async with get_async_session() as session:
-            batch = await get_batch(session, settings.batch_size)
-            if batch:
-                extractor_batch_size.observe(len(batch))
-                logger.info(f"Dispatching job offers with ids {[job_offer.id for job_offer in batch]}.")
-                batch_start_time = time.monotonic()
-                tasks = [handle_job_offer(job_offer, session) for job_offer in batch]
-                await asyncio.gather(*tasks)
-                await session.commit()
-                extractor_batch_dispatch_duration.observe(time.monotonic() - batch_start_time)
-
-        await asyncio.sleep(settings.interval_seconds)
+    base_urls = [
+        str(base_url) for base_url in [settings.extractor_api_base_url, *settings.extractor_api_replica_base_urls]
+    ]
+    async with create_http_client(
+        settings,
+        str(settings.extractor_api_base_url),
+        settings.extractor_api_bearer_token,
+        settings.http_timeout,
+        extractor_http_connections_created,
+        extractor_http_connections_reused,
+        connector,
+    ) as http_client:
+        worker = ExtractorWorker(settings, create_upstream(settings, http_client, base_urls, upstream_metrics))
+        async with listen_for_work(worker.wakeup):
+            await worker.run()
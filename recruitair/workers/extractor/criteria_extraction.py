@@ -1,19 +1,26 @@
-from datetime import datetime, timezone
-from typing import List
+import asyncio
+from typing import Dict, Iterable, List, Sequence
 
-from aiohttp import ClientSession, ClientTimeout
 from pydantic import BaseModel, Field
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...database.models import Criterion, JobOffer, JobOfferStatus
-from . import logger, settings
+from ...database.models import Criterion, JobOffer, content_hash, extracted_duplicates
+from ..leases import seconds_since
+from ..upstream import Upstream
+from . import logger
 from .monitoring import (
+    extractor_criteria_cloned,
     extractor_criteria_computed,
     extractor_criteria_description_length,
     extractor_criteria_importance_value,
+    extractor_dedup_hits,
+    extractor_dedup_misses,
     extractor_time_since_schedule,
 )
 
+_PENDING_CRITERIA_KEY = "recruitair_pending_criteria"
+
 
 class CriteriaExtractionResponse(BaseModel):
     class CriteriaItem(BaseModel):
@@ -25,31 +32,123 @@ class CriteriaExtractionResponse(BaseModel):
     criteria: List[CriteriaItem]
 
 
-async def extract_criteria(job_offer: JobOffer, session: AsyncSession) -> None:
-    async with ClientSession(
-        str(settings.extractor_api_base_url),
-        headers={"Authorization": f"Bearer {settings.extractor_api_bearer_token}"},
-        timeout=ClientTimeout(settings.http_timeout),
-    ) as http_client:
-        async with http_client.post(
-            "eval",
-            json={"offer_text": job_offer.text},
-        ) as response:
-            response.raise_for_status()
-            logger.info(f"Successfully extracted criteria for job offer id {job_offer.id}.")
-
-            response_data = await response.json()
-            criteria_response = CriteriaExtractionResponse.model_validate(response_data)
-            for criterion in criteria_response.criteria:
-                new_criterion = Criterion(
-                    offer_id=job_offer.id,
-                    description=criterion.description,
-                    importance=criterion.importance,
-                )
-                extractor_criteria_description_length.observe(len(criterion.description))
-                extractor_criteria_importance_value.observe(criterion.importance)
-                extractor_criteria_computed.inc()
-                session.add(new_criterion)
-            job_offer.status = JobOfferStatus.DONE
-            age_seconds = (datetime.now(timezone.utc) - job_offer.created_at).total_seconds()
-            extractor_time_since_schedule.observe(age_seconds)
+# Extraction requests in progress in this worker by offer text hash, shared by the identical offers dispatched meanwhile
+_in_flight_extractions: Dict[str, "asyncio.Future[List[CriteriaExtractionResponse.CriteriaItem]]"] = {}
+
+
+def offer_text_hash(job_offer: JobOffer) -> str:
+    return job_offer.text_hash or content_hash(job_offer.text)
+
+
+def stage_criteria(job_offer: JobOffer, criteria: Iterable[Dict], session: AsyncSession) -> None:
+    """Stage criteria of `job_offer` in `session`. Staged criteria are written by `write_criteria`."""
+    pending_criteria = session.info.setdefault(_PENDING_CRITERIA_KEY, {}).setdefault(job_offer.id, [])
+    for criterion in criteria:
+        pending_criteria.append(
+            {"offer_id": job_offer.id, "description": criterion["description"], "importance": criterion["importance"]}
+        )
+    age_seconds = seconds_since(job_offer.created_at)
+    extractor_time_since_schedule.observe(age_seconds)
+
+
+async def request_criteria(job_offer: JobOffer, upstream: Upstream) -> List[CriteriaExtractionResponse.CriteriaItem]:
+    response_data = await upstream.post("eval", {"offer_text": job_offer.text})
+    logger.info(f"Successfully extracted criteria for job offer id {job_offer.id}.")
+
+    criteria_response = CriteriaExtractionResponse.model_validate(response_data)
+    for criterion in criteria_response.criteria:
+        extractor_criteria_description_length.observe(len(criterion.description))
+        extractor_criteria_importance_value.observe(criterion.importance)
+        extractor_criteria_computed.inc()
+    return criteria_response.criteria
+
+
+async def request_criteria_once(
+    job_offer: JobOffer, upstream: Upstream
+) -> List[CriteriaExtractionResponse.CriteriaItem]:
+    """
+    Request the criteria of `job_offer`, unless an offer with the same text is being extracted already, in which case
+    its outcome (criteria or error) is shared.
+    """
+    key = offer_text_hash(job_offer)
+    in_flight = _in_flight_extractions.get(key)
+    if in_flight is not None:
+        extractor_dedup_hits.labels(source="in_flight").inc()
+        criteria = await asyncio.shield(in_flight)
+        extractor_criteria_cloned.inc(len(criteria))
+        return criteria
+
+    extractor_dedup_misses.inc()
+    future = asyncio.get_running_loop().create_future()
+    _in_flight_extractions[key] = future
+    try:
+        criteria = await request_criteria(job_offer, upstream)
+    except asyncio.CancelledError:
+        future.set_exception(RuntimeError(f"Extraction of job offer id {job_offer.id} was cancelled"))
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(criteria)
+    finally:
+        del _in_flight_extractions[key]
+        # The outcome may have no waiters, which must not be reported as an unretrieved exception
+        if future.done() and not future.cancelled():
+            future.exception()
+    return criteria
+
+
+async def extract_criteria(
+    job_offer: JobOffer, session: AsyncSession, upstream: Upstream, deduplicate: bool = False
+) -> None:
+    """Extract the criteria of `job_offer`, sharing the request of an identical offer in flight if `deduplicate`."""
+    if deduplicate:
+        criteria = await request_criteria_once(job_offer, upstream)
+    else:
+        criteria = await request_criteria(job_offer, upstream)
+    stage_criteria(job_offer, [criterion.model_dump() for criterion in criteria], session)
+
+
+async def clone_extracted_duplicates(session: AsyncSession, batch: Sequence[JobOffer]) -> List[JobOffer]:
+    """
+    Stage for every offer of `batch` with the same text as an offer already DONE a copy of that offer's criteria, and
+    return those offers. The others have to be sent to the extractor API.
+    """
+    donor_ids = dict(
+        (await session.execute(extracted_duplicates({offer_text_hash(job_offer) for job_offer in batch})))
+        .tuples()
+        .all()
+    )
+    if not donor_ids:
+        return []
+    donor_criteria: Dict[int, List[Dict]] = {donor_id: [] for donor_id in donor_ids.values()}
+    result = await session.execute(
+        select(Criterion.offer_id, Criterion.description, Criterion.importance)
+        .where(Criterion.offer_id.in_(donor_criteria.keys()))
+        .order_by(Criterion.id)
+    )
+    for offer_id, description, importance in result.tuples():
+        donor_criteria[offer_id].append({"description": description, "importance": importance})
+
+    cloned = []
+    for job_offer in batch:
+        donor_id = donor_ids.get(offer_text_hash(job_offer))
+        if donor_id is None:
+            continue
+        stage_criteria(job_offer, donor_criteria[donor_id], session)
+        logger.info(
+            f"Copied the criteria of job offer id {donor_id} to job offer id {job_offer.id} with the same text."
+        )
+        extractor_dedup_hits.labels(source="done_offer").inc()
+        extractor_criteria_cloned.inc(len(donor_criteria[donor_id]))
+        cloned.append(job_offer)
+    return cloned
+
+
+async def write_criteria(session: AsyncSession, offer_ids: Iterable[int]) -> None:
+    """Write the criteria extracted in `session` for the given offers with a single multi-row insert."""
+    pending_criteria = session.info.get(_PENDING_CRITERIA_KEY, {})
+    rows = [row for offer_id in offer_ids for row in pending_criteria.pop(offer_id, [])]
+    if rows:
+        await session.execute(insert(Criterion), rows)
@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic import Field, HttpUrl
 
 from ..common_settings import BaseWorkerSettings
@@ -5,5 +7,19 @@ from ..common_settings import BaseWorkerSettings
 
 class ExtractorWorkerSettings(BaseWorkerSettings):
     extractor_api_base_url: HttpUrl = Field(..., description="Base URL for the extractor API endpoint")
+    extractor_api_replica_base_urls: List[HttpUrl] = Field(
+        [],
+        description=(
+            "Base URLs of further replicas of the extractor API, which requests are balanced across along with "
+            "extractor_api_base_url"
+        ),
+    )
     extractor_api_bearer_token: str = Field(..., description="Bearer token for authenticating with the extractor API")
     http_timeout: int = Field(30, description="HTTP timeout in seconds for requests to the extractor API")
+    deduplicate_extractions: bool = Field(
+        True,
+        description=(
+            "Copy the criteria of a job offer already extracted with the same text instead of calling the extractor "
+            "API, and share a single request between identical offers extracted at the same time"
+        ),
+    )
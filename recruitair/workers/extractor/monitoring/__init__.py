@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 extractor_batch_size = Histogram(
     "extractor_batch_size",
@@ -16,6 +16,80 @@ extractor_single_dispatch_duration = Histogram(
     "Duration of a single extractor dispatch call in seconds",
 )
 
+extractor_transaction_duration = Histogram(
+    "extractor_transaction_duration_seconds",
+    "Duration of extractor database transactions in seconds, by kind",
+    ["kind"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+extractor_queue_wait = Histogram(
+    "extractor_queue_wait_seconds",
+    "Seconds job offers waited in the queue before their first claim, by priority class",
+    ["priority"],
+    buckets=(1, 5, 15, 30, 60, 300, 900, 1800, 3600, 7200, 14400, 43200, 86400),
+)
+
+extractor_http_connections_created = Counter(
+    "extractor_http_connections_created_total",
+    "Total number of new connections opened to the extractor API",
+)
+
+extractor_http_connections_reused = Counter(
+    "extractor_http_connections_reused_total",
+    "Total number of extractor dispatches that reused a pooled keep-alive connection",
+)
+
+extractor_in_flight_dispatches = Gauge(
+    "extractor_in_flight_dispatches",
+    "Number of criteria extractions currently dispatched to the extractor API",
+    multiprocess_mode="livesum",
+)
+
+extractor_concurrency_limit = Gauge(
+    "extractor_concurrency_limit",
+    "Current limit of criteria extractions dispatched to the extractor API at the same time",
+    multiprocess_mode="livesum",
+)
+
+extractor_throttle_wait = Histogram(
+    "extractor_throttle_wait_seconds",
+    "Time criteria extraction requests waited for the rate limit of the extractor API in seconds",
+    buckets=(0.0, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0),
+)
+
+extractor_throttled_responses = Counter(
+    "extractor_throttled_responses_total",
+    "Total number of extractor API answers asking to retry later, whose request was re-sent after the requested delay",
+)
+
+extractor_circuit_breaker_state = Gauge(
+    "extractor_circuit_breaker_state",
+    "State of the circuit breaker of every extractor API replica (0 closed, 1 half-open, 2 open)",
+    ["upstream"],
+    multiprocess_mode="livemax",
+)
+
+extractor_upstream_request_duration = Histogram(
+    "extractor_upstream_request_duration_seconds",
+    "Duration of the successful requests to every extractor API replica in seconds",
+    ["upstream"],
+)
+
+extractor_upstream_outstanding_requests = Gauge(
+    "extractor_upstream_outstanding_requests",
+    "Number of requests in flight to every extractor API replica",
+    ["upstream"],
+    multiprocess_mode="livesum",
+)
+
+extractor_queue_depth = Gauge(
+    "extractor_queue_depth",
+    "Number of job offers waiting for criteria extraction",
+    # Every worker process measures the same queue
+    multiprocess_mode="livemax",
+)
+
 extractor_total_dispatches = Counter(
     "extractor_total_dispatches",
     "Total number of extractor dispatch attempts",
@@ -26,6 +100,21 @@ extractor_failed_dispatches = Counter(
     "Total number of failed extractor dispatch attempts",
 )
 
+extractor_retries_scheduled = Counter(
+    "extractor_retries_scheduled_total",
+    "Total number of failed job offer extractions scheduled for a retry with backoff",
+)
+
+extractor_dead_lettered = Counter(
+    "extractor_dead_lettered_total",
+    "Total number of job offers marked FAILED after running out of extraction attempts",
+)
+
+extractor_leases_reaped = Counter(
+    "extractor_leases_reaped_total",
+    "Total number of IN_PROGRESS job offers returned to the queue after their lease expired",
+)
+
 extractor_timeouts = Counter(
     "extractor_timeouts_total",
     "Total number of extractor dispatch attempts that timed out",
@@ -42,6 +131,22 @@ extractor_criteria_computed = Counter(
     "Total number of criteria successfully computed by the extractor service",
 )
 
+extractor_criteria_cloned = Counter(
+    "extractor_criteria_cloned_total",
+    "Total number of criteria copied from a job offer with the same text instead of being computed",
+)
+
+extractor_dedup_hits = Counter(
+    "extractor_dedup_hits_total",
+    "Total number of job offers whose criteria were reused from an identical offer text, by source",
+    ["source"],
+)
+
+extractor_dedup_misses = Counter(
+    "extractor_dedup_misses_total",
+    "Total number of job offers whose text had to be sent to the extractor service",
+)
+
 extractor_criteria_importance_value = Histogram(
     "extractor_criteria_importance_value",
     "Distribution of job offer analysis criteria assigned by the extractor service",
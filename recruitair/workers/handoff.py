@@ -0,0 +1,51 @@
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, List, Sequence, Tuple
+
+
+class EvaluationHandoff:
+    """
+    In-memory handoff of evaluations from the extractor to the evaluator, when both run in the same process (see the
+    pipeline worker).
+
+    Once enabled, the extractor queues the evaluations of the criteria it extracts already leased to the process, in
+    the transaction that writes the criteria, and puts the claimed rows here once it is committed. The evaluator takes
+    them before claiming from the queue, so the first scores of an offer do not wait for a polling cycle. Evaluations
+    whose lease expired before they were taken, or that were still here when the process stopped, are left to the
+    queue, where any evaluator can claim them.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        # Groups of claimed rows put together, with the expiry of their lease
+        self._pending: Deque[Tuple[datetime, List[Any]]] = deque()
+        self._listeners: List[Callable[[], None]] = []
+
+    def on_put(self, listener: Callable[[], None]) -> None:
+        """Call `listener` whenever evaluations are handed over, e.g. to wake up the evaluator."""
+        self._listeners.append(listener)
+
+    def put(self, rows: Sequence[Any], lease_expires_at: datetime) -> None:
+        if rows:
+            self._pending.append((lease_expires_at, list(rows)))
+            for listener in self._listeners:
+                listener()
+
+    def take(self, count: int, now: datetime) -> List[Any]:
+        """Take up to `count` of the rows handed over, oldest first, skipping those whose lease has expired."""
+        taken: List[Any] = []
+        while self._pending and len(taken) < count:
+            lease_expires_at, rows = self._pending[0]
+            if lease_expires_at <= now:
+                self._pending.popleft()
+                continue
+            chunk = rows[: count - len(taken)]
+            taken.extend(chunk)
+            del rows[: len(chunk)]
+            if not rows:
+                self._pending.popleft()
+        return taken
+
+
+# Shared by the extractor and the evaluator of the process, enabled by the pipeline worker
+evaluation_handoff = EvaluationHandoff()
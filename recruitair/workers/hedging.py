@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Number of recent latencies the hedge delay is computed from, and the number needed before hedging at all
+LATENCY_WINDOW = 500
+MIN_LATENCY_SAMPLES = 20
+# Latencies recorded between two computations of the hedge delay, which sorts the whole window
+DELAY_REFRESH_SAMPLES = 20
+# Hedges that can be sent in a burst, e.g. when the upstream suddenly slows down
+MAX_HEDGE_TOKENS = 10
+
+
+class RequestHedger:
+    """
+    Hedging of upstream requests, to cut their tail latency: a request that has not answered after the `percentile`-th
+    percentile of recent latencies is duplicated, and the first of the two to succeed wins while the other is
+    cancelled. If either fails, the other one is still awaited.
+
+    Every request earns `budget` hedge tokens and every hedge spends one, so that at most about `budget` of the
+    requests are hedged, e.g. 0.05 for 5%. This bounds the extra load put on an upstream that is slow because it is
+    overloaded.
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        budget: float,
+        hedged_requests: Counter,
+        hedge_wins: Counter,
+        delay_gauge: Gauge,
+    ):
+        self.percentile = percentile
+        self.budget = budget
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._samples_since_refresh = 0
+        self.delay: Optional[float] = None
+        self._tokens = 0.0
+        self._hedged_requests = hedged_requests
+        self._hedge_wins = hedge_wins
+        self._delay_gauge = delay_gauge
+
+    def _record_latency(self, latency: float) -> None:
+        self._latencies.append(latency)
+        self._samples_since_refresh += 1
+        if len(self._latencies) >= MIN_LATENCY_SAMPLES and self._samples_since_refresh >= DELAY_REFRESH_SAMPLES:
+            self._samples_since_refresh = 0
+            latencies = sorted(self._latencies)
+            self.delay = latencies[min(math.ceil(len(latencies) * self.percentile / 100), len(latencies)) - 1]
+            self._delay_gauge.set(self.delay)
+
+    async def run(self, request: Callable[[Callable[[], None]], Awaitable[T]]) -> T:
+        """
+        Await `request(on_sent)`, hedged with a second request if it is slow and the budget allows it.
+
+        `request` must call `on_sent` once it holds its concurrency slot and rate limit quota and sends the request
+        upstream, so that the hedge delay and the recorded latencies only count the time spent upstream, and not the
+        time spent waiting on the limits of the worker. The latency recorded for a hedged request is the time its
+        original took until the race was decided, which is a lower bound of its actual latency.
+        """
+        self._tokens = min(self._tokens + self.budget, MAX_HEDGE_TOKENS)
+        loop = asyncio.get_running_loop()
+        sent = loop.create_future()
+        sent_at: Optional[float] = None
+
+        def on_sent() -> None:
+            nonlocal sent_at
+            # A request re-sent after being throttled is timed from its last sending
+            sent_at = time.monotonic()
+            if not sent.done():
+                sent.set_result(None)
+
+        original = asyncio.ensure_future(request(on_sent))
+        hedge = None
+        try:
+            if self.delay is not None:
+                await asyncio.wait({original, sent}, return_when=asyncio.FIRST_COMPLETED)
+                while not original.done() and sent_at + self.delay > time.monotonic():
+                    await asyncio.wait({original}, timeout=sent_at + self.delay - time.monotonic())
+            if original.done() or self.delay is None or self._tokens < 1:
+                result = await original
+                if sent_at is not None:
+                    self._record_latency(time.monotonic() - sent_at)
+                return result
+
+            self._tokens -= 1
+            self._hedged_requests.inc()
+            hedge = asyncio.ensure_future(request(lambda: None))
+            pending = {original, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    self._record_latency(time.monotonic() - sent_at)
+                    if winner is hedge:
+                        self._hedge_wins.inc()
+                    return winner.result()
+            # Both failed, the error of the original request is reported
+            return original.result()
+        finally:
+            sent.cancel()
+            for task in (original, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
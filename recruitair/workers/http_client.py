@@ -0,0 +1,117 @@
+import contextlib
+import json
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+from aiohttp import (
+    ClientResponse,
+    ClientSession,
+    ClientTimeout,
+    TCPConnector,
+    TraceConfig,
+    TraceConnectionCreateEndParams,
+    TraceConnectionReuseconnParams,
+)
+from prometheus_client import Counter
+
+from .common_settings import BaseWorkerSettings
+from .concurrency import AdaptiveConcurrencyLimiter
+from .load_balancing import Endpoint, LoadBalancer
+from .rate_limit import RateLimiter, UpstreamThrottled
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def create_connector(settings: BaseWorkerSettings) -> TCPConnector:
+    """Create the pool of keep-alive connections of the HTTP clients of a worker process."""
+    return TCPConnector(
+        limit=settings.http_max_connections,
+        limit_per_host=settings.http_max_connections_per_host,
+        keepalive_timeout=settings.http_keepalive_timeout,
+        ttl_dns_cache=settings.http_dns_cache_ttl,
+    )
+
+
+def create_http_client(
+    settings: BaseWorkerSettings,
+    base_url: str,
+    bearer_token: str,
+    timeout: float,
+    connections_created: Counter,
+    connections_reused: Counter,
+    connector: Optional[TCPConnector] = None,
+) -> ClientSession:
+    """
+    Create the long-lived HTTP client shared by every upstream call of a worker.
+
+    Connections are kept alive and pooled across calls, and the number of connections opened and reused is
+    recorded in the given counters. The client must be closed on shutdown, e.g. by using it as a context manager.
+    A `connector` shared with other clients of the process is left open, to be closed by its creator.
+    """
+
+    async def on_connection_create_end(
+        session: ClientSession, context: SimpleNamespace, params: TraceConnectionCreateEndParams
+    ) -> None:
+        connections_created.inc()
+
+    async def on_connection_reuseconn(
+        session: ClientSession, context: SimpleNamespace, params: TraceConnectionReuseconnParams
+    ) -> None:
+        connections_reused.inc()
+
+    trace_config = TraceConfig()
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+
+    return ClientSession(
+        base_url,
+        connector=connector or create_connector(settings),
+        connector_owner=connector is None,
+        headers={"Authorization": f"Bearer {bearer_token}"},
+        timeout=ClientTimeout(timeout),
+        trace_configs=[trace_config],
+    )
+
+
+@contextlib.asynccontextmanager
+async def post_json(
+    http_client: ClientSession,
+    balancer: LoadBalancer,
+    path: str,
+    payload: Any,
+    limiter: AdaptiveConcurrencyLimiter,
+    rate_limiter: RateLimiter,
+    tried: Optional[List[Endpoint]] = None,
+    on_sent: Optional[Callable[[], None]] = None,
+) -> AsyncIterator[ClientResponse]:
+    """
+    POST `payload` as JSON to `path` of a replica of the upstream picked by `balancer`, within the rate and concurrency
+    limits of the worker. Responses asking to retry after a while are re-sent once the upstream allows it, instead of
+    failing the request.
+
+    Replicas in `tried` are avoided if possible, and the replica picked is appended to it. `on_sent` is called when the
+    request is sent, once it is within the limits, e.g. to time the upstream alone.
+    """
+    # Serialized once, to be charged to the byte quota and re-sent as is
+    body = json.dumps(payload).encode("utf-8")
+    throttled_seconds = 0.0
+    while True:
+        await rate_limiter.acquire(len(body))
+        try:
+            async with limiter.request():
+                # Picked once a request slot is free, so that the requests in flight it is based on are current
+                endpoint = balancer.pick(tried or ())
+                if tried is not None:
+                    tried.append(endpoint)
+                if on_sent is not None:
+                    on_sent()
+                async with (
+                    endpoint.request(),
+                    http_client.post(endpoint.url(path), data=body, headers=JSON_HEADERS) as response,
+                ):
+                    rate_limiter.check_throttled(response, throttled_seconds)
+                    yield response
+                    return
+        except UpstreamThrottled as e:
+            throttled_seconds += e.retry_after
+            rate_limiter.pause(e.retry_after)
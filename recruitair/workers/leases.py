@@ -0,0 +1,21 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+# Owner recorded on the leases taken by this worker process
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def lease_window(lease_seconds: float) -> Tuple[datetime, datetime]:
+    """Return the current time and the expiry of a lease taken now."""
+    now = datetime.now(timezone.utc)
+    return now, now + timedelta(seconds=lease_seconds)
+
+
+def seconds_since(moment: datetime, now: Optional[datetime] = None) -> float:
+    """Seconds from `moment` to `now` (the current time by default), taking naive timestamps, as SQLite stores, as UTC."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return ((now or datetime.now(timezone.utc)) - moment).total_seconds()
@@ -0,0 +1,99 @@
+import contextlib
+import random
+import time
+from typing import AsyncIterator, Callable, List, Optional, Sequence
+from urllib.parse import urljoin
+
+from prometheus_client import Gauge, Histogram
+
+from .circuit_breaker import CircuitBreaker, CircuitState, create_circuit_breaker
+from .common_settings import BaseWorkerSettings
+
+
+class Endpoint:
+    """Replica of an upstream API, with its own circuit breaker."""
+
+    def __init__(self, base_url: str, breaker: CircuitBreaker, latency_histogram: Histogram, outstanding_gauge: Gauge):
+        self.base_url = base_url
+        self.breaker = breaker
+        self.outstanding = 0
+        self._latency_histogram = latency_histogram.labels(upstream=base_url)
+        self._outstanding_gauge = outstanding_gauge.labels(upstream=base_url)
+
+    @property
+    def available(self) -> bool:
+        """Whether the endpoint can take a request: its circuit is closed, or half-open with room for a trial."""
+        if self.breaker.state == CircuitState.HALF_OPEN:
+            return self.outstanding < self.breaker.half_open_requests
+        return self.breaker.state == CircuitState.CLOSED
+
+    def url(self, path: str) -> str:
+        return urljoin(self.base_url, path)
+
+    @contextlib.asynccontextmanager
+    async def request(self) -> AsyncIterator[None]:
+        """Make a request to the endpoint unless its circuit is open, counting it as outstanding and timing it."""
+        async with self.breaker.request():
+            self.outstanding += 1
+            self._outstanding_gauge.inc()
+            start_time = time.monotonic()
+            try:
+                yield
+            finally:
+                self.outstanding -= 1
+                self._outstanding_gauge.dec()
+            self._latency_histogram.observe(time.monotonic() - start_time)
+
+
+class LoadBalancer:
+    """
+    Client-side load balancing of the requests to the replicas of an upstream API. With the 'least_outstanding'
+    policy, requests go to the replica with the fewest requests in flight. With 'power_of_two_choices', they go to the
+    one with fewer requests in flight of two replicas picked at random.
+
+    Replicas whose circuit is open are ejected until it half-opens. Half-open replicas get at most
+    `circuit_breaker_half_open_requests` trial requests at a time, along with the closed ones. If no replica can take a
+    request, it is sent to the least loaded one anyway, and fails right away if every circuit is open.
+    """
+
+    def __init__(self, endpoints: Sequence[Endpoint], policy: str, rng: Optional[random.Random] = None):
+        self.endpoints = list(endpoints)
+        self.policy = policy
+        self._random = rng or random.Random()
+
+    def pick(self, tried: Sequence[Endpoint] = ()) -> Endpoint:
+        """Pick the endpoint of the next request, avoiding the `tried` ones (e.g. for a hedge) if possible."""
+        available = [endpoint for endpoint in self.endpoints if endpoint.available]
+        healthy = [endpoint for endpoint in available if endpoint not in tried] or available or self.endpoints
+        if self.policy == "power_of_two_choices" and len(healthy) > 2:
+            healthy = self._random.sample(healthy, 2)
+        least_outstanding = min(endpoint.outstanding for endpoint in healthy)
+        return self._random.choice([endpoint for endpoint in healthy if endpoint.outstanding == least_outstanding])
+
+    def claimable(self, count: int) -> int:
+        """How many of `count` tasks may be claimed now, given the circuit breakers of the endpoints."""
+        if any(endpoint.breaker.state == CircuitState.CLOSED for endpoint in self.endpoints):
+            return count
+        claimable = 0
+        for endpoint in self.endpoints:
+            claimable += endpoint.breaker.claimable(count - claimable)
+        return claimable
+
+    def on_state_change(self, listener: Callable[[], None]) -> None:
+        """Call `listener` whenever the circuit breaker of an endpoint changes state."""
+        for endpoint in self.endpoints:
+            endpoint.breaker.on_state_change(listener)
+
+
+def create_load_balancer(
+    settings: BaseWorkerSettings,
+    base_urls: Sequence[str],
+    breaker_gauge: Gauge,
+    latency_histogram: Histogram,
+    outstanding_gauge: Gauge,
+) -> LoadBalancer:
+    endpoints: List[Endpoint] = []
+    for base_url in dict.fromkeys(base_urls):
+        breaker = create_circuit_breaker(settings, base_url, breaker_gauge)
+        endpoints.append(Endpoint(base_url, breaker, latency_histogram, outstanding_gauge))
+    return LoadBalancer(endpoints, settings.load_balancing_policy)
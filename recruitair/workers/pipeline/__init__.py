@@ -0,0 +1,35 @@
+import asyncio
+import logging
+
+from ..evaluator import evaluator_worker
+from ..evaluator import settings as evaluator_settings
+from ..extractor import extractor_worker
+from ..handoff import evaluation_handoff
+from ..http_client import create_connector
+
+logger = logging.getLogger(__name__)
+# The pipeline has no settings of its own. Both workers read theirs from the same RECRUITAIR_* environment, and the
+# settings of the pipeline processes (processes, shutdown timeout, metrics) and of their shared upstream connection pool
+# (http_max_connections...) are the evaluator's. Every other setting, e.g. the batch size, is read by each worker from
+# its own settings.
+settings = evaluator_settings
+
+
+async def pipeline_worker():
+    """
+    Run the extractor and the evaluator workers on the same event loop, sharing the database pool of the process and a
+    pool of upstream connections. The evaluations of the criteria extracted are handed over to the evaluator in memory,
+    so the first scores of a new offer do not wait for the evaluator to poll the queue.
+
+    Evaluations handed over but not yet dispatched when the process stops stay leased to it, and are claimed again from
+    the queue once their lease expires.
+    """
+    logger.info("Starting Pipeline Worker.")
+    evaluation_handoff.enabled = True
+    connector = create_connector(settings)
+    try:
+        async with asyncio.TaskGroup() as workers:
+            workers.create_task(extractor_worker(connector))
+            workers.create_task(evaluator_worker(connector))
+    finally:
+        await connector.close()
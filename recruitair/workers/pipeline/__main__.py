@@ -0,0 +1,27 @@
+from prometheus_client import start_http_server
+
+from ..supervisor import Supervisor
+from . import pipeline_worker, settings
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+    import logging
+
+    parser = argparse.ArgumentParser(description="Run the extractor and evaluator workers in the same processes.")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=settings.processes,
+        help="Number of worker processes to run under a supervisor (defaults to the processes setting).",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.processes > 1:
+        Supervisor(pipeline_worker, settings.model_copy(update={"processes": args.processes}), "pipeline").run()
+    else:
+        if settings.expose_metrics:
+            start_http_server(settings.metrics_server_port)
+        asyncio.run(pipeline_worker())
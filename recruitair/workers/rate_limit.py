@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+from aiohttp import ClientResponse, ClientResponseError
+from prometheus_client import Counter, Histogram
+
+from .common_settings import BaseWorkerSettings
+
+logger = logging.getLogger(__name__)
+
+# Upstream answers asking to slow down, which are re-sent after their Retry-After instead of failing
+THROTTLED_STATUSES = (429, 503)
+
+
+class UpstreamThrottled(ClientResponseError):
+    """The upstream answered that it is over quota, and asked to retry after `retry_after` seconds."""
+
+    def __init__(self, response: ClientResponse, retry_after: float):
+        super().__init__(
+            response.request_info,
+            response.history,
+            status=response.status,
+            message=f"Throttled, retry after {retry_after:.1f} seconds",
+            headers=response.headers,
+        )
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait according to a Retry-After header, given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+class TokenBucket:
+    """Tokens refilled at `rate` per second of `clock`, up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.tokens + (now - self._updated_at) * self.rate, self.capacity)
+        self._updated_at = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` tokens can be taken. Amounts over the capacity only need a full bucket."""
+        self._refill()
+        return max(min(amount, self.capacity) - self.tokens, 0) / self.rate
+
+    def take(self, amount: float) -> None:
+        # The bucket may go into debt for amounts over its capacity, which delays the next takers accordingly
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """
+    Client-side quota of the requests sent to an upstream API, as token buckets of requests and payload bytes per
+    second (either may be unlimited). Work over quota is delayed rather than failed, and when the upstream itself
+    answers that it is over quota, every request is held back until its Retry-After has passed.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: Optional[float],
+        bytes_per_second: Optional[float],
+        burst_seconds: float,
+        retry_after_max_seconds: float,
+        wait_histogram: Histogram,
+        throttled_responses: Counter,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.requests = (
+            TokenBucket(requests_per_second, max(requests_per_second * burst_seconds, 1), clock)
+            if requests_per_second
+            else None
+        )
+        self.bytes = (
+            TokenBucket(bytes_per_second, bytes_per_second * burst_seconds, clock) if bytes_per_second else None
+        )
+        self._clock = clock
+        self.retry_after_max_seconds = retry_after_max_seconds
+        self._paused_until = 0.0
+        self._wait_histogram = wait_histogram
+        self._throttled_responses = throttled_responses
+
+    def _delay(self, payload_bytes: int) -> float:
+        delay = self._paused_until - self._clock()
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay(1))
+        if self.bytes is not None:
+            delay = max(delay, self.bytes.delay(payload_bytes))
+        return delay
+
+    async def acquire(self, payload_bytes: int) -> None:
+        """Wait until a request with `payload_bytes` bytes of payload can be sent."""
+        start_time = self._clock()
+        while (delay := self._delay(payload_bytes)) > 0:
+            await asyncio.sleep(delay)
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.bytes is not None:
+            self.bytes.take(payload_bytes)
+        self._wait_histogram.observe(self._clock() - start_time)
+
+    def check_throttled(self, response: ClientResponse, throttled_seconds: float) -> None:
+        """
+        Raise UpstreamThrottled if `response` asks to retry after a while, unless the request has already been held
+        back `throttled_seconds` and waiting longer would exceed `retry_after_max_seconds`, in which case the response
+        is left to fail like any other error.
+        """
+        if response.status not in THROTTLED_STATUSES:
+            return
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is None or throttled_seconds + retry_after > self.retry_after_max_seconds:
+            return
+        self._throttled_responses.inc()
+        raise UpstreamThrottled(response, retry_after)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every request back for `seconds`."""
+        if self._paused_until < self._clock() + seconds:
+            logger.warning(f"The upstream is over quota, holding requests back for {seconds:.1f} seconds.")
+            self._paused_until = self._clock() + seconds
+
+
+def create_rate_limiter(
+    settings: BaseWorkerSettings, wait_histogram: Histogram, throttled_responses: Counter
+) -> RateLimiter:
+    return RateLimiter(
+        settings.rate_limit_requests_per_second,
+        settings.rate_limit_bytes_per_second,
+        settings.rate_limit_burst_seconds,
+        settings.retry_after_max_seconds,
+        wait_histogram,
+        throttled_responses,
+    )
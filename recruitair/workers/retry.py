@@ -0,0 +1,27 @@
+import random
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Longest error message stored with a failed task
+MAX_ERROR_LENGTH = 1000
+
+
+def backoff_seconds(attempts: int, base_seconds: float, max_seconds: float) -> float:
+    """
+    Exponential backoff with jitter before retrying a task that failed `attempts` times: a random delay between half
+    and all of `base_seconds * 2 ** (attempts - 1)`, capped at `max_seconds`. The jitter spreads the retries of tasks
+    that failed together, e.g. during an upstream outage.
+    """
+    delay = min(max_seconds, base_seconds * 2 ** max(attempts - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def next_attempt_at(now: datetime, attempts: int, settings) -> Optional[datetime]:
+    """When to retry a task after its `attempts`-th failed attempt, or None if it has run out of attempts."""
+    if attempts >= settings.max_attempts:
+        return None
+    return now + timedelta(seconds=backoff_seconds(attempts, settings.retry_base_seconds, settings.retry_max_seconds))
+
+
+def format_error(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}"[:MAX_ERROR_LENGTH]
@@ -0,0 +1,152 @@
+import asyncio
+import glob
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import time
+from multiprocessing.connection import wait
+from multiprocessing.process import BaseProcess
+from typing import Awaitable, Callable, Dict, Optional
+
+from ..database import async_engine
+from .common_settings import BaseWorkerSettings
+
+logger = logging.getLogger(__name__)
+
+# Children are spawned rather than forked, so that each one imports the worker afresh and gets its own database pool,
+# HTTP client and lease owner id instead of sharing the parent's
+_context = multiprocessing.get_context("spawn")
+
+# A child that lived at least this long is considered healthy, and its restart backoff is reset
+HEALTHY_UPTIME_SECONDS = 60
+MAX_RESTART_DELAY_SECONDS = 60
+
+
+def run_child(worker: Callable[[], Awaitable[None]]) -> None:
+    """Entry point of a worker process: run `worker` until it finishes or SIGTERM is received."""
+    logging.basicConfig(level=logging.INFO)
+    # Interrupts are handled by the supervisor, which stops its children with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    async def main() -> None:
+        task = asyncio.current_task()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        try:
+            await worker()
+        except asyncio.CancelledError:
+            logger.info(f"Worker process {os.getpid()} stopped.")
+        finally:
+            # Close the pooled database connections instead of leaving them to be dropped with the process
+            await async_engine.dispose()
+
+    asyncio.run(main())
+
+
+class Supervisor:
+    """
+    Runs `processes` copies of a worker in child processes, restarting the ones that crash (with a backoff when they
+    crash right away) until SIGTERM or SIGINT is received, upon which the children are stopped gracefully.
+
+    When metrics are exposed, the children write them to a shared multiprocess directory and the supervisor serves
+    their aggregate on `metrics_server_port`.
+    """
+
+    def __init__(self, worker: Callable[[], Awaitable[None]], settings: BaseWorkerSettings, name: str):
+        self.worker = worker
+        self.settings = settings
+        self.name = name
+        self.children: Dict[int, BaseProcess] = {}
+        self._started_at: Dict[int, float] = {}
+        self._restart_delays: Dict[int, float] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._stopping = False
+
+    def _start_child(self, slot: int) -> None:
+        process = _context.Process(target=run_child, args=(self.worker,), name=f"{self.name}-{slot}")
+        process.start()
+        self.children[slot] = process
+        self._started_at[slot] = time.monotonic()
+        logger.info(f"Started {process.name} with pid {process.pid}.")
+
+    def _schedule_restart(self, slot: int) -> None:
+        process = self.children.pop(slot)
+        if self.settings.expose_metrics:
+            from prometheus_client import multiprocess
+
+            multiprocess.mark_process_dead(process.pid)
+        delay = self._restart_delays.get(slot, 0)
+        if time.monotonic() - self._started_at[slot] >= HEALTHY_UPTIME_SECONDS:
+            delay = 0
+        logger.error(
+            f"{process.name} (pid {process.pid}) exited with code {process.exitcode}, restarting it in {delay} seconds."
+        )
+        self._restart_delays[slot] = min(max(2 * delay, 1), MAX_RESTART_DELAY_SECONDS)
+        self._restart_at[slot] = time.monotonic() + delay
+
+    def _request_stop(self, signum: int, frame) -> None:
+        logger.info(f"Received signal {signum}, stopping the worker processes.")
+        self._stopping = True
+
+    def _stop_children(self) -> None:
+        for process in self.children.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.settings.shutdown_timeout_seconds
+        for process in self.children.values():
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop in time, killing it.")
+                process.kill()
+                process.join()
+
+    def _serve_metrics(self) -> Optional[str]:
+        """Serve the metrics of every child, returning the multiprocess directory if it was created for this run."""
+        if not self.settings.expose_metrics:
+            return None
+        directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+        if directory:
+            # Metrics left over by a previous run would be added to the new ones. Only the metric files are removed, the
+            # directory being the user's
+            os.makedirs(directory, exist_ok=True)
+            for path in glob.glob(os.path.join(directory, "*.db")):
+                os.remove(path)
+            created = None
+        else:
+            directory = tempfile.mkdtemp(prefix=f"recruitair-{self.name}-metrics-")
+            # Inherited by the children, whose metrics are then written to the directory
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+            created = directory
+
+        from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=directory)
+        start_http_server(self.settings.metrics_server_port, registry=registry)
+        return created
+
+    def run(self) -> None:
+        logger.info(f"Starting {self.settings.processes} {self.name} processes.")
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        metrics_directory_created = self._serve_metrics()
+        for slot in range(self.settings.processes):
+            self._start_child(slot)
+        try:
+            while not self._stopping:
+                # Wake up as soon as a child exits, or once a second to notice a stop request or a due restart
+                wait([process.sentinel for process in self.children.values()], timeout=1)
+                for slot, process in list(self.children.items()):
+                    if not process.is_alive():
+                        self._schedule_restart(slot)
+                for slot, restart_at in list(self._restart_at.items()):
+                    if restart_at <= time.monotonic() and not self._stopping:
+                        del self._restart_at[slot]
+                        self._start_child(slot)
+        finally:
+            self._stop_children()
+            if metrics_directory_created:
+                shutil.rmtree(metrics_directory_created, ignore_errors=True)
+        logger.info(f"All {self.name} processes stopped.")
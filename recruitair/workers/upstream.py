@@ -0,0 +1,83 @@
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence
+
+from aiohttp import ClientSession
+from prometheus_client import Counter, Gauge, Histogram
+
+from .common_settings import BaseWorkerSettings
+from .concurrency import AdaptiveConcurrencyLimiter, create_limiter
+from .hedging import RequestHedger
+from .http_client import post_json
+from .load_balancing import Endpoint, LoadBalancer, create_load_balancer
+from .rate_limit import RateLimiter, create_rate_limiter
+
+
+class UpstreamMetrics(NamedTuple):
+    """Metrics of the requests of a worker to its upstream API."""
+
+    concurrency_limit: Gauge
+    request_duration: Histogram
+    throttle_wait: Histogram
+    throttled_responses: Counter
+    circuit_breaker_state: Gauge
+    replica_request_duration: Histogram
+    replica_outstanding_requests: Gauge
+
+
+class Upstream:
+    """
+    Upstream API of a worker: its requests are rate and concurrency limited, balanced across the replicas of the API,
+    and hedged if a `hedger` is given.
+    """
+
+    def __init__(
+        self,
+        http_client: ClientSession,
+        limiter: AdaptiveConcurrencyLimiter,
+        rate_limiter: RateLimiter,
+        balancer: LoadBalancer,
+        hedger: Optional[RequestHedger] = None,
+    ):
+        self.http_client = http_client
+        self.limiter = limiter
+        self.rate_limiter = rate_limiter
+        self.balancer = balancer
+        self.hedger = hedger
+
+    async def post(self, path: str, payload: Any) -> Any:
+        """POST `payload` as JSON to `path` and return the decoded JSON answer, raising if its status is an error."""
+        # The replicas the request was sent to, which a hedge avoids
+        tried: List[Endpoint] = []
+
+        async def send(on_sent: Optional[Callable[[], None]] = None) -> Any:
+            async with post_json(
+                self.http_client, self.balancer, path, payload, self.limiter, self.rate_limiter, tried, on_sent
+            ) as response:
+                response.raise_for_status()
+                return await response.json()
+
+        if self.hedger is None:
+            return await send()
+        return await self.hedger.run(send)
+
+
+def create_upstream(
+    settings: BaseWorkerSettings,
+    http_client: ClientSession,
+    base_urls: Sequence[str],
+    metrics: UpstreamMetrics,
+    hedger: Optional[RequestHedger] = None,
+) -> Upstream:
+    """Create the upstream of a worker process, whose requests are balanced across the replicas at `base_urls`."""
+    return Upstream(
+        http_client,
+        create_limiter(settings, metrics.concurrency_limit, metrics.request_duration),
+        create_rate_limiter(settings, metrics.throttle_wait, metrics.throttled_responses),
+        create_load_balancer(
+            settings,
+            base_urls,
+            metrics.circuit_breaker_state,
+            metrics.replica_request_duration,
+            metrics.replica_outstanding_requests,
+        ),
+        hedger,
+    )
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import aiohttp
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import insert
+
+from recruitair.database import AsyncSessionLocal, SessionLocal, async_engine
+from recruitair.database.models import Applicant, Base, JobOffer
+
+# The API and the legacy API are served from child processes, so that the load generator does not share their event
+# loop or their GIL. Both are configured from the RECRUITAIR_DB_* environment variables, like the API itself.
+SERVE_FLAG = "--serve"
+
+legacy_app = FastAPI(title="RecruitAIr API (sync routes)")
+
+
+@legacy_app.get("/job_offers/{offer_id}")
+def legacy_get_job_offer(offer_id: int):
+    """GET /job_offers/{offer_id} as served before the API moved to async routes, on FastAPI's threadpool."""
+    with SessionLocal() as db:
+        offer = db.query(JobOffer).filter(JobOffer.id == offer_id).first()
+        if not offer:
+            raise HTTPException(status_code=404, detail="Offer not found")
+        return {"job_offer": offer.to_dict()}
+
+
+@legacy_app.get("/job_offers/{offer_id}/applicants")
+def legacy_get_applicants(offer_id: int, limit: int = 100, offset: int = 0):
+    """GET /job_offers/{offer_id}/applicants as served before the API moved to async routes."""
+    with SessionLocal() as db:
+        offer = db.query(JobOffer).filter(JobOffer.id == offer_id).first()
+        if not offer:
+            raise HTTPException(status_code=404, detail="Offer not found")
+        results = (
+            db.query(Applicant)
+            .filter(Applicant.offer_id == offer_id)
+            .order_by(Applicant.id)
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+        return {"applicants": [applicant.to_dict() for applicant in results]}
+
+
+def serve(variant: str, port: int) -> None:
+    import uvicorn
+
+    from recruitair.api import app
+
+    uvicorn.run(legacy_app if variant == "sync" else app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def seed(applicants: int) -> int:
+    """Create the tables if needed, and an offer with `applicants` applicants to read."""
+    async with async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        offer_id = await session.scalar(insert(JobOffer).returning(JobOffer.id), [{"text": "Benchmark offer"}])
+        await session.execute(
+            insert(Applicant), [{"offer_id": offer_id, "cv": f"Benchmark applicant {i}"} for i in range(applicants)]
+        )
+        await session.commit()
+    await async_engine.dispose()
+    return offer_id
+
+
+async def wait_until_up(server: subprocess.Popen, base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as http_client:
+        while True:
+            try:
+                async with http_client.get(f"{base_url}/job_offers/0") as response:
+                    await response.read()
+                    return
+            except aiohttp.ClientConnectionError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+
+async def run_load(base_url: str, paths: list, total_requests: int, concurrency: int) -> tuple:
+    """Send `total_requests` GET requests cycling through `paths` from `concurrency` clients at once."""
+    latencies = []
+    errors = 0
+    next_request = 0
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as http_client:
+
+        async def client() -> None:
+            nonlocal next_request, errors
+            while next_request < total_requests:
+                path = paths[next_request % len(paths)]
+                next_request += 1
+                start_time = time.monotonic()
+                try:
+                    async with http_client.get(f"{base_url}{path}") as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+                latencies.append(time.monotonic() - start_time)
+
+        start_time = time.monotonic()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        duration = time.monotonic() - start_time
+    return duration, latencies, errors
+
+
+async def run_benchmark(total_requests: int, concurrency_levels: list, applicants: int, page_size: int, port: int):
+    offer_id = await seed(applicants)
+    paths = [f"/job_offers/{offer_id}", f"/job_offers/{offer_id}/applicants?limit={page_size}"]
+    base_url = f"http://127.0.0.1:{port}"
+
+    print(f"{'routes':>7} {'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for variant in ("sync", "async"):
+        server = subprocess.Popen([sys.executable, __file__, SERVE_FLAG, variant, str(port)])
+        try:
+            await wait_until_up(server, base_url)
+            # Warm up the connection pools of the server
+            await run_load(base_url, paths, min(total_requests, 200), 10)
+            for concurrency in concurrency_levels:
+                duration, latencies, errors = await run_load(base_url, paths, total_requests, concurrency)
+                percentiles = statistics.quantiles(latencies, n=100)
+                print(
+                    f"{variant:>7} {concurrency:>8} {total_requests:>9} {errors:>7} {total_requests / duration:>9.1f} "
+                    f"{percentiles[49] * 1000:>9.1f} {percentiles[98] * 1000:>9.1f}"
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == SERVE_FLAG:
+        serve(sys.argv[2], int(sys.argv[3]))
+        sys.exit()
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare the requests per second and latency of the read routes of the API served by sync routes on "
+            "FastAPI's threadpool (as before) and by async routes on the event loop (as now), at several levels of "
+            "concurrency. The database is configured by the RECRUITAIR_DB_* environment variables, and an offer with "
+            "its applicants is added to it, so point it at a scratch database."
+        )
+    )
+    parser.add_argument("--requests", type=int, default=5000, help="Number of requests sent per concurrency level.")
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[10, 100, 500], help="Numbers of concurrent clients to test."
+    )
+    parser.add_argument("--applicants", type=int, default=1000, help="Number of applicants of the benchmark offer.")
+    parser.add_argument("--page-size", type=int, default=50, help="Number of applicants listed per request.")
+    parser.add_argument("--port", type=int, default=8123, help="Local port the API is served on.")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.requests, args.concurrency, args.applicants, args.page_size, args.port))
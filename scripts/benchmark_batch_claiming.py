@@ -0,0 +1,157 @@
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmark_env import use_placeholder_environment
+
+use_placeholder_environment()
+
+from sqlalchemy import exists, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from recruitair.database.models import (
+    Applicant,
+    ApplicantScore,
+    Base,
+    Criterion,
+    JobOffer,
+    enqueue_evaluations,
+)
+from recruitair.workers.evaluator import EvaluatorWorker, settings, upstream_metrics
+from recruitair.workers.upstream import create_upstream
+
+CRITERIA_PER_OFFER = 10
+APPLICANTS_PER_OFFER = 100
+INSERT_CHUNK_SIZE = 5000
+
+
+async def get_batch_legacy(session: AsyncSession, batch_size: int):
+    """Claim path used before the evaluation queue: one Applicant x Criterion anti-join query per candidate row."""
+    query = (
+        select(Applicant, Criterion)
+        .join(Criterion, Applicant.offer_id == Criterion.offer_id)
+        .where(
+            ~exists().where(
+                (ApplicantScore.applicant_id == Applicant.id) & (Criterion.id == ApplicantScore.criteria_id)
+            )
+        )
+        .order_by(Applicant.created_at)
+    )
+    offset = 0
+    batch = []
+    while len(batch) < batch_size:
+        result = await session.execute(query.offset(offset))
+        candidate_row = result.first()
+        if not candidate_row:
+            break
+        offset += 1
+        applicant, criterion = candidate_row
+        if session.bind.dialect.name == "postgresql":
+            lock_acquired = await session.execute(
+                text("SELECT pg_try_advisory_xact_lock(:lock_key)").bindparams(
+                    lock_key=hash((applicant.id, criterion.id))
+                )
+            )
+            if not lock_acquired.scalar():
+                continue
+        batch.append((applicant, criterion))
+    return batch
+
+
+async def seed_backlog(session: AsyncSession, pending_pairs: int) -> None:
+    """Create enough offers, criteria and applicants to have `pending_pairs` unscored combinations."""
+    pairs_per_offer = CRITERIA_PER_OFFER * APPLICANTS_PER_OFFER
+    num_offers = max(1, pending_pairs // pairs_per_offer)
+    offer_ids = (
+        await session.scalars(
+            insert(JobOffer).returning(JobOffer.id), [{"text": f"Benchmark offer {i}"} for i in range(num_offers)]
+        )
+    ).all()
+    criteria_rows = [
+        {"offer_id": offer_id, "description": f"Criterion {i}", "importance": 0.5}
+        for offer_id in offer_ids
+        for i in range(CRITERIA_PER_OFFER)
+    ]
+    applicant_rows = [
+        {"offer_id": offer_id, "cv": f"Applicant {i} for offer {offer_id}"}
+        for offer_id in offer_ids
+        for i in range(APPLICANTS_PER_OFFER)
+    ]
+    for rows, model in ((criteria_rows, Criterion), (applicant_rows, Applicant)):
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            await session.execute(insert(model), rows[start : start + INSERT_CHUNK_SIZE])
+    await session.execute(enqueue_evaluations(Applicant.offer_id.in_(offer_ids)))
+    await session.commit()
+
+
+async def time_claims(session_factory: async_sessionmaker, claim, batch_size: int, repeats: int) -> list:
+    durations = []
+    for _ in range(repeats):
+        async with session_factory() as session:
+            start_time = time.monotonic()
+            batch = await claim(session, batch_size)
+            durations.append(time.monotonic() - start_time)
+            assert len(batch) == batch_size, f"Expected a full batch, got {len(batch)} pairs"
+            # The queue claim commits its leases, so every repetition claims the next pairs of the backlog. The
+            # legacy claim is rolled back and claims the same pairs again.
+            await session.rollback()
+    return durations
+
+
+async def run_benchmark(database_url: str, backlog_sizes: list, batch_size: int, repeats: int, skip_legacy: bool):
+    engine = create_async_engine(database_url)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    print(f"{'backlog':>10} {'path':>8} {'median (s)':>12} {'max (s)':>10}")
+    for backlog_size in backlog_sizes:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+            await connection.run_sync(Base.metadata.create_all)
+        async with session_factory() as session:
+            await seed_backlog(session, backlog_size)
+
+        # The worker only claims, it never sends a request upstream
+        upstream = create_upstream(settings, None, [str(settings.evaluator_api_base_url)], upstream_metrics)
+        get_batch = EvaluatorWorker(settings, upstream, session_factory=session_factory).get_batch
+        paths = [("queue", get_batch)] if skip_legacy else [("legacy", get_batch_legacy), ("queue", get_batch)]
+        for name, claim in paths:
+            durations = await time_claims(session_factory, claim, batch_size, repeats)
+            print(f"{backlog_size:>10} {name:>8} {statistics.median(durations):>12.4f} {max(durations):>10.4f}")
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare evaluator batch claiming time against backlog size for the legacy per-row claim and the "
+            "evaluation queue claim. WARNING: all tables in the target database are dropped and recreated, so point it "
+            "at a scratch database."
+        )
+    )
+    parser.add_argument("database_url", type=str, help="Async database URL, e.g. postgresql+asyncpg://user:pw@host/db")
+    parser.add_argument(
+        "--backlog-sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="Number of pending (applicant, criterion) pairs to benchmark against.",
+    )
+    parser.add_argument("--batch-size", type=int, default=100, help="Number of pairs claimed per batch.")
+    parser.add_argument("--repeats", type=int, default=5, help="Number of claims timed per backlog size and path.")
+    parser.add_argument(
+        "--skip-legacy",
+        action="store_true",
+        help="Only time the evaluation queue claim (the legacy path is very slow).",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.database_url, args.backlog_sizes, args.batch_size, args.repeats, args.skip_legacy))
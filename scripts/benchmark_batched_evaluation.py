@@ -0,0 +1,171 @@
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmark_env import use_placeholder_environment
+
+# The benchmark never touches the database and brings its own upstream. The concurrency is kept fixed, so that both
+# protocols are compared under the same number of simultaneous requests.
+use_placeholder_environment(
+    {
+        "RECRUITAIR_EVALUATOR_API_BASE_URL": "http://127.0.0.1:3198/evaluator/",
+        "RECRUITAIR_ADAPTIVE_CONCURRENCY": "false",
+    }
+)
+
+from aiohttp import web
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import recruitair.workers.evaluator as evaluator
+from recruitair.database.models import Applicant, Criterion
+from recruitair.workers.evaluator.monitoring import (
+    evaluator_http_connections_created,
+    evaluator_http_connections_reused,
+)
+from recruitair.workers.http_client import create_http_client
+from recruitair.workers.upstream import create_upstream
+
+MOCK_PORT = 3198
+
+
+class MockEvaluator:
+    """
+    Evaluator API stand-in serving at most `capacity` requests at a time. Every request costs `request_latency` seconds
+    plus `criterion_latency` seconds per scored criterion, and the uploaded bytes are counted.
+    """
+
+    def __init__(self, request_latency: float, criterion_latency: float, capacity: int):
+        self.request_latency = request_latency
+        self.criterion_latency = criterion_latency
+        self.capacity = asyncio.Semaphore(capacity)
+        self.requests = 0
+        self.uploaded_bytes = 0
+
+    async def evaluate(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        self.requests += 1
+        self.uploaded_bytes += len(body)
+        async with self.capacity:
+            await asyncio.sleep(self.request_latency + self.criterion_latency)
+        return web.json_response({"score": 0.85})
+
+    async def evaluate_batch(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        self.requests += 1
+        self.uploaded_bytes += len(body)
+        descriptions = (await request.json())["criteria_descriptions"]
+        async with self.capacity:
+            await asyncio.sleep(self.request_latency + self.criterion_latency * len(descriptions))
+        return web.json_response({"scores": [0.85] * len(descriptions)})
+
+
+def build_pairs(applicants: int, criteria_per_applicant: int, cv_bytes: int) -> list:
+    """In-memory (applicant, criterion) pairs, ordered by applicant like the queued evaluations of new applicants."""
+    created_at = datetime.now(timezone.utc)
+    criteria = [
+        Criterion(id=i, offer_id=1, description=f"Criterion {i}", importance=0.5, created_at=created_at)
+        for i in range(criteria_per_applicant)
+    ]
+    candidates = [
+        Applicant(id=i, offer_id=1, cv=f"Applicant {i} " + "x" * cv_bytes, created_at=created_at)
+        for i in range(applicants)
+    ]
+    return [(applicant, criterion) for applicant in candidates for criterion in criteria]
+
+
+async def evaluate_all(pairs: list, batch_size: int, batched: bool) -> float:
+    settings = evaluator.settings.model_copy(update={"batched_evaluation": batched})
+    start_time = time.monotonic()
+    async with create_http_client(
+        settings,
+        str(settings.evaluator_api_base_url),
+        settings.evaluator_api_bearer_token,
+        settings.http_timeout,
+        evaluator_http_connections_created,
+        evaluator_http_connections_reused,
+    ) as http_client:
+        upstream = create_upstream(
+            settings, http_client, [str(settings.evaluator_api_base_url)], evaluator.upstream_metrics
+        )
+        worker = evaluator.EvaluatorWorker(settings, upstream)
+        for start in range(0, len(pairs), batch_size):
+            # Scores are only added to an unbound session, the benchmark measures the upstream calls
+            session = AsyncSession()
+            groups = evaluator.group_by_applicant(pairs[start : start + batch_size])
+            results = await asyncio.gather(
+                *(worker.handle_applicant_criteria(applicant, criteria, session) for applicant, criteria in groups)
+            )
+            assert not any(any(errors) for errors in results), "Some evaluations failed"
+            await session.close()
+    return time.monotonic() - start_time
+
+
+async def run_benchmark(
+    applicants: int,
+    criteria_per_applicant: int,
+    cv_bytes: int,
+    batch_size: int,
+    request_latency: float,
+    criterion_latency: float,
+    capacity: int,
+):
+    mock = MockEvaluator(request_latency, criterion_latency, capacity)
+    mock_app = web.Application(client_max_size=1024**3)
+    mock_app.router.add_post("/evaluator/eval", mock.evaluate)
+    mock_app.router.add_post("/evaluator/eval/batch", mock.evaluate_batch)
+    runner = web.AppRunner(mock_app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", MOCK_PORT).start()
+
+    pairs = build_pairs(applicants, criteria_per_applicant, cv_bytes)
+    print(f"{'protocol':>10} {'pairs':>8} {'requests':>9} {'uploaded (MB)':>14} {'seconds':>9} {'pairs/s':>9}")
+    for name, batched in (("per-pair", False), ("batched", True)):
+        mock.requests = mock.uploaded_bytes = 0
+        duration = await evaluate_all(pairs, batch_size, batched)
+        print(
+            f"{name:>10} {len(pairs):>8} {mock.requests:>9} {mock.uploaded_bytes / 1e6:>14.2f} "
+            f"{duration:>9.2f} {len(pairs) / duration:>9.1f}"
+        )
+
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare evaluator throughput between one eval request per (applicant, criterion) pair and one eval/batch "
+            "request per applicant, against a local mock evaluator API with simulated latency."
+        )
+    )
+    parser.add_argument("--applicants", type=int, default=200, help="Number of applicants to evaluate.")
+    parser.add_argument("--criteria", type=int, default=8, help="Number of criteria each applicant is scored against.")
+    parser.add_argument("--cv-bytes", type=int, default=20_000, help="Size of every applicant CV in bytes.")
+    parser.add_argument("--batch-size", type=int, default=100, help="Number of pairs dispatched per batch.")
+    parser.add_argument(
+        "--request-latency", type=float, default=0.05, help="Simulated fixed latency of every request in seconds."
+    )
+    parser.add_argument(
+        "--criterion-latency", type=float, default=0.01, help="Simulated latency per scored criterion in seconds."
+    )
+    parser.add_argument(
+        "--capacity", type=int, default=16, help="Number of requests the mock evaluator API serves concurrently."
+    )
+    args = parser.parse_args()
+
+    asyncio.run(
+        run_benchmark(
+            args.applicants,
+            args.criteria,
+            args.cv_bytes,
+            args.batch_size,
+            args.request_latency,
+            args.criterion_latency,
+            args.capacity,
+        )
+    )
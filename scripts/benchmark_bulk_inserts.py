@@ -0,0 +1,156 @@
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmark_env import use_placeholder_environment
+
+use_placeholder_environment()
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from recruitair.api.resources.applicants import CreateApplicantsRequest, create_applicants
+from recruitair.api.resources.criteria import (
+    AddJobOfferCriteriaRequest,
+    CriteriaItem,
+    add_job_offer_criteria,
+)
+from recruitair.database.models import Applicant, Base, Criterion, JobOffer, enqueue_evaluations
+from recruitair.database.notifications import EVALUATION_CHANNEL, notify_async
+
+# Criteria of the offer the applicants are added to, and applicants of the offer the criteria are added to, so that
+# both requests enqueue evaluations like in production
+EXISTING_ROWS = 5
+
+
+async def create_applicants_legacy(db: AsyncSession, offer_id: int, request: CreateApplicantsRequest) -> list:
+    """Insert path used before: one ORM object per applicant, then one SELECT per applicant to read it back."""
+    created_applicants = [Applicant(cv=item.cv, offer_id=offer_id) for item in request.applicants]
+    db.add_all(created_applicants)
+    await db.flush()
+    await db.execute(enqueue_evaluations(Applicant.id.in_([applicant.id for applicant in created_applicants])))
+    await notify_async(db, EVALUATION_CHANNEL)
+    await db.commit()
+    for applicant in created_applicants:
+        await db.refresh(applicant)
+    return [applicant.to_dict() for applicant in created_applicants]
+
+
+async def add_job_offer_criteria_legacy(db: AsyncSession, offer_id: int, request: AddJobOfferCriteriaRequest) -> list:
+    """Insert path used before: one ORM object per criterion, then one SELECT per criterion to read it back."""
+    created_criteria = [
+        Criterion(offer_id=offer_id, description=item.description, importance=item.importance)
+        for item in request.criteria
+    ]
+    db.add_all(created_criteria)
+    await db.flush()
+    await db.execute(enqueue_evaluations(Criterion.id.in_([criterion.id for criterion in created_criteria])))
+    await notify_async(db, EVALUATION_CHANNEL)
+    await db.commit()
+    for criterion in created_criteria:
+        await db.refresh(criterion)
+    return [criterion.to_dict() for criterion in created_criteria]
+
+
+async def create_applicants_current(db: AsyncSession, offer_id: int, request: CreateApplicantsRequest) -> list:
+    return (await create_applicants(offer_id, request, db)).applicants
+
+
+async def add_job_offer_criteria_current(db: AsyncSession, offer_id: int, request: AddJobOfferCriteriaRequest) -> list:
+    return (await add_job_offer_criteria(offer_id, request, db)).criteria
+
+
+async def seed_offer(session_factory: async_sessionmaker) -> int:
+    async with session_factory() as session:
+        offer_id = await session.scalar(insert(JobOffer).returning(JobOffer.id), [{"text": "Benchmark offer"}])
+        await session.execute(
+            insert(Criterion),
+            [{"offer_id": offer_id, "description": f"Criterion {i}", "importance": 0.5} for i in range(EXISTING_ROWS)],
+        )
+        await session.execute(
+            insert(Applicant), [{"offer_id": offer_id, "cv": f"Applicant {i}"} for i in range(EXISTING_ROWS)]
+        )
+        await session.commit()
+    return offer_id
+
+
+async def time_inserts(session_factory: async_sessionmaker, insert_rows, build_request, batch_size: int, repeats: int):
+    durations = []
+    for _ in range(repeats):
+        offer_id = await seed_offer(session_factory)
+        request = build_request(batch_size)
+        async with session_factory() as session:
+            start_time = time.monotonic()
+            rows = await insert_rows(session, offer_id, request)
+            durations.append(time.monotonic() - start_time)
+        assert len(rows) == batch_size, f"Expected {batch_size} rows, got {len(rows)}"
+    return durations
+
+
+def build_applicants_request(batch_size: int) -> CreateApplicantsRequest:
+    return CreateApplicantsRequest(
+        applicants=[CreateApplicantsRequest.ApplicantItem(cv=f"Benchmark applicant {i}") for i in range(batch_size)]
+    )
+
+
+def build_criteria_request(batch_size: int) -> AddJobOfferCriteriaRequest:
+    return AddJobOfferCriteriaRequest(
+        criteria=[CriteriaItem(description=f"Benchmark criterion {i}", importance=0.5) for i in range(batch_size)]
+    )
+
+
+async def run_benchmark(database_url: str, batch_sizes: list, repeats: int):
+    engine = create_async_engine(database_url)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+
+    endpoints = [
+        ("applicants", build_applicants_request, create_applicants_legacy, create_applicants_current),
+        ("criteria", build_criteria_request, add_job_offer_criteria_legacy, add_job_offer_criteria_current),
+    ]
+    print(f"{'endpoint':>10} {'batch':>6} {'path':>8} {'median (s)':>12} {'max (s)':>10} {'speedup':>8}")
+    for name, build_request, legacy, current in endpoints:
+        for batch_size in batch_sizes:
+            medians = {}
+            for path, insert_rows in (("legacy", legacy), ("current", current)):
+                durations = await time_inserts(session_factory, insert_rows, build_request, batch_size, repeats)
+                medians[path] = statistics.median(durations)
+                speedup = f"{medians['legacy'] / medians[path]:.1f}x"
+                print(
+                    f"{name:>10} {batch_size:>6} {path:>8} {medians[path]:>12.4f} {max(durations):>10.4f} "
+                    f"{speedup:>8}"
+                )
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare the latency of the applicant and criteria creation endpoints against the batch size, between the "
+            "legacy path (ORM objects refreshed one by one) and the current one (a single INSERT ... RETURNING). "
+            "WARNING: all tables in the target database are dropped and recreated, so point it at a scratch database."
+        )
+    )
+    parser.add_argument("database_url", type=str, help="Async database URL, e.g. postgresql+asyncpg://user:pw@host/db")
+    parser.add_argument(
+        "--batch-sizes",
+        type=int,
+        nargs="+",
+        default=[1, 10, 100, 500, 1000],
+        help="Numbers of rows created per request.",
+    )
+    parser.add_argument("--repeats", type=int, default=5, help="Number of requests timed per batch size and path.")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.database_url, args.batch_sizes, args.repeats))
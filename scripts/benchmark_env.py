@@ -0,0 +1,22 @@
+import os
+from typing import Dict, Optional
+
+# Settings of the API and the workers are loaded at import time. The benchmarks bring their own database connection and
+# upstream, so these placeholder values only make the modules importable.
+PLACEHOLDER_ENVIRONMENT = {
+    "RECRUITAIR_DB_USERNAME": "benchmark",
+    "RECRUITAIR_DB_PASSWORD": "benchmark",
+    "RECRUITAIR_DB_HOST": "localhost",
+    "RECRUITAIR_DB_DATABASE": "benchmark",
+    "RECRUITAIR_EVALUATOR_API_BASE_URL": "http://localhost/",
+    "RECRUITAIR_EVALUATOR_API_BEARER_TOKEN": "benchmark",
+}
+
+
+def use_placeholder_environment(overrides: Optional[Dict[str, str]] = None) -> None:
+    """
+    Set the placeholder settings, and `overrides`, that are not already set in the environment. Must be called before
+    anything from `recruitair` is imported.
+    """
+    for key, value in {**PLACEHOLDER_ENVIRONMENT, **(overrides or {})}.items():
+        os.environ.setdefault(key, value)
@@ -11,6 +11,8 @@ import urllib.request
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
+from recruitair.database.models import content_hash
+
 JOB_POSTINGS_DEMO_DATASET = "https://datasets-server.huggingface.co/rows?dataset=datastax%2Flinkedin_job_listings&config=default&split=train&offset=0&length=100"
 CVS_DEMO_DATASET = "https://datasets-server.huggingface.co/rows?dataset=lang-uk%2Frecruitment-dataset-candidate-profiles-english&config=default&split=train&offset=0&length=100"
 
@@ -33,11 +35,11 @@ def create_examples(
                 session.execute(
                     text(
                         """
-                    INSERT INTO job_offers (text, status)
-                    VALUES (:text, 'PENDING')
+                    INSERT INTO job_offers (text, text_hash, status)
+                    VALUES (:text, :text_hash, 'PENDING')
                     """
                     ),
-                    {"text": job_text},
+                    {"text": job_text, "text_hash": content_hash(job_text)},
                 )
             session.commit()
             total_offers = session.execute(text("SELECT COUNT(*) FROM job_offers")).scalar()
@@ -124,6 +126,40 @@ def create_examples(
             print(f"Inserted {inserted_scores} scores into the database.")
             print(f"There are now {total_scores} scores in the database.")
 
+        if add_applicants or add_criteria or add_scores:
+            # Keep the evaluation queue in sync with the rows inserted above
+            session.execute(
+                text(
+                    """
+                INSERT INTO evaluation_tasks (applicant_id, criteria_id, offer_id)
+                SELECT applicants.id, criteria.id, applicants.offer_id
+                FROM applicants JOIN criteria ON criteria.offer_id = applicants.offer_id
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM applicant_scores
+                    WHERE applicant_scores.applicant_id = applicants.id AND applicant_scores.criteria_id = criteria.id
+                ) AND NOT EXISTS (
+                    SELECT 1 FROM evaluation_tasks
+                    WHERE evaluation_tasks.applicant_id = applicants.id AND evaluation_tasks.criteria_id = criteria.id
+                )
+                """
+                )
+            )
+            session.execute(
+                text(
+                    """
+                DELETE FROM evaluation_tasks
+                WHERE EXISTS (
+                    SELECT 1 FROM applicant_scores
+                    WHERE applicant_scores.applicant_id = evaluation_tasks.applicant_id
+                    AND applicant_scores.criteria_id = evaluation_tasks.criteria_id
+                )
+                """
+                )
+            )
+            session.commit()
+            total_tasks = session.execute(text("SELECT COUNT(*) FROM evaluation_tasks")).scalar()
+            print(f"There are now {total_tasks} evaluations queued in the database.")
+
 
 if __name__ == "__main__":
     import argparse
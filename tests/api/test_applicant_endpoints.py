@@ -1,4 +1,5 @@
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
 
 # # ------------- APPLICANT TESTS ------------- #
 
@@ -105,6 +106,44 @@ def test_get_applicants_for_offer(client: TestClient):
     assert applicant["offer_id"] == offer_id
 
 
+def test_get_applicants_with_cursor(client: TestClient):
+    offer_id = client.post("/job_offers", json={"text": "Backend Engineer"}).json()["job_offer"]["id"]
+    cvs = [f"Skills: {'Python' if i % 2 else 'Go'} #{i}" for i in range(10)]
+    response = client.post(f"/job_offers/{offer_id}/applicants", json={"applicants": [{"cv": cv} for cv in cvs]})
+    python_ids = [applicant["id"] for applicant in response.json()["applicants"] if "Python" in applicant["cv"]]
+
+    data = client.get(f"/job_offers/{offer_id}/applicants", params={"limit": 2, "cv": "Python"}).json()
+    assert [applicant["id"] for applicant in data["applicants"]] == python_ids[0:2]
+    assert data["previous_cursor"] is None
+
+    params = {"limit": 2, "cv": "Python", "cursor": data["next_cursor"]}
+    data = client.get(f"/job_offers/{offer_id}/applicants", params=params).json()
+    assert [applicant["id"] for applicant in data["applicants"]] == python_ids[2:4]
+
+    params["cursor"] = data["next_cursor"]
+    data = client.get(f"/job_offers/{offer_id}/applicants", params=params).json()
+    assert [applicant["id"] for applicant in data["applicants"]] == python_ids[4:5]
+    assert data["next_cursor"] is None
+
+    params["cursor"] = data["previous_cursor"]
+    data = client.get(f"/job_offers/{offer_id}/applicants", params=params).json()
+    assert [applicant["id"] for applicant in data["applicants"]] == python_ids[2:4]
+
+
+def test_search_applicants(client: TestClient):
+    offer_id = client.post("/job_offers", json={"text": "Backend Engineer"}).json()["job_offer"]["id"]
+    cvs = ["Skills: Python, FastAPI", "Skills: Go, Kubernetes", "Skills: python, Django, Kubernetes"]
+    response = client.post(f"/job_offers/{offer_id}/applicants", json={"applicants": [{"cv": cv} for cv in cvs]})
+    ids = [applicant["id"] for applicant in response.json()["applicants"]]
+
+    response = client.get(f"/job_offers/{offer_id}/applicants", params={"q": "Python kubernetes"})
+    assert response.status_code == 200
+    assert [applicant["id"] for applicant in response.json()["applicants"]] == [ids[2]]
+
+    response = client.get(f"/job_offers/{offer_id}/applicants", params={"q": "kubernetes -django"})
+    assert [applicant["id"] for applicant in response.json()["applicants"]] == [ids[1]]
+
+
 def test_get_applicants_invalid_offer(client: TestClient):
     invalid_offer_id = 9999
 
@@ -112,3 +151,29 @@ def test_get_applicants_invalid_offer(client: TestClient):
     response = client.get(f"/job_offers/{invalid_offer_id}/applicants")
     assert response.status_code == 404
     assert "detail" in response.json()
+
+
+def test_create_applicants_schedules_evaluations(client: TestClient, db_session: Session):
+    # Create a job offer with criteria first
+    response = client.post("/job_offers", json={"text": "Backend Engineer"})
+    offer_id = response.json()["job_offer"]["id"]
+    criteria = [
+        {"description": "Experience in backend development", "importance": 0.5},
+        {"description": "Proficiency in Python and FastAPI", "importance": 0.5},
+    ]
+    response = client.post(f"/job_offers/{offer_id}/criteria", json={"criteria": criteria})
+    criteria_ids = {criterion["id"] for criterion in response.json()["criteria"]}
+
+    cv_texts = ["Name: John Doe\nSkills: Python", "Name: Mary Anne\nSkills: FastAPI"]
+    response = client.post(f"/job_offers/{offer_id}/applicants", json={"applicants": [{"cv": cv} for cv in cv_texts]})
+    applicant_ids = {applicant["id"] for applicant in response.json()["applicants"]}
+
+    from recruitair.database.models import EvaluationTask
+
+    tasks = db_session.query(EvaluationTask).all()
+
+    # Every applicant is queued for evaluation against every criterion of the offer
+    assert {(task.applicant_id, task.criteria_id) for task in tasks} == {
+        (applicant_id, criterion_id) for applicant_id in applicant_ids for criterion_id in criteria_ids
+    }
+    assert all(task.offer_id == offer_id for task in tasks)
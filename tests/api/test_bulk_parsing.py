@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from recruitair.api.bulk import MAX_ITEM_BYTES, iter_json_array_items, iter_ndjson_items
+
+# ------------- BULK BODY PARSING TESTS ------------- #
+
+
+def parse(parser, body: bytes, chunk_size: int) -> list:
+    """Run `parser` on `body` received in chunks of `chunk_size` bytes, and return the items it yields."""
+
+    async def chunks():
+        for start in range(0, len(body), chunk_size):
+            yield body[start : start + chunk_size]
+
+    async def collect():
+        return [item async for item in parser(chunks())]
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7])
+def test_json_array_streamed_in_small_chunks(chunk_size: int):
+    items = [{"text": "Backend Engineer"}, 2.5, -1e3, 123456, "a, b]", True, None, [1, 2], {"text": "Ingénieur 🚀"}]
+    body = json.dumps(items).encode("utf-8")
+    assert [json.loads(item) for item in parse(iter_json_array_items, body, chunk_size)] == items
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7])
+def test_ndjson_streamed_in_small_chunks(chunk_size: int):
+    body = '{"text": "Ingénieur 🚀"}\n\n{"text": "Data Engineer"}'.encode("utf-8")
+    assert parse(iter_ndjson_items, body, chunk_size) == ['{"text": "Ingénieur 🚀"}', '{"text": "Data Engineer"}']
+
+
+@pytest.mark.parametrize("body", [b"[2.x, 1]", b"[1 2]", b"[1,]", b"[2", b"{}"])
+def test_malformed_json_array(body: bytes):
+    for chunk_size in (1, 3, len(body)):
+        with pytest.raises(HTTPException):
+            parse(iter_json_array_items, body, chunk_size)
+
+
+def test_item_size_is_measured_in_bytes():
+    # Fewer characters than the limit, but more bytes
+    text = "🚀" * (MAX_ITEM_BYTES // 4 + 1)
+    with pytest.raises(HTTPException):
+        parse(iter_ndjson_items, f'{{"text": "{text}'.encode("utf-8"), 64 * 1024)
+    with pytest.raises(HTTPException):
+        parse(iter_json_array_items, f'[{{"text": "{text}'.encode("utf-8"), 64 * 1024)
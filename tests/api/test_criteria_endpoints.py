@@ -1,4 +1,5 @@
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
 
 # # ------------- CRITERIA TESTS ------------- #
 
@@ -151,3 +152,41 @@ def test_update_criterion(client: TestClient):
     assert criterion["offer_id"] == offer_id
     assert criterion["description"] == updated_data["description"]
     assert criterion["importance"] == updated_data["importance"]
+
+
+def test_update_criterion_description_reschedules_evaluations(client: TestClient, db_session: Session):
+    # Create a job offer with one applicant and one criterion
+    response = client.post("/job_offers", json={"text": "Backend Engineer"})
+    offer_id = response.json()["job_offer"]["id"]
+    response = client.post(f"/job_offers/{offer_id}/applicants", json={"applicants": [{"cv": "Skills: Python"}]})
+    applicant_id = response.json()["applicants"][0]["id"]
+    response = client.post(
+        f"/job_offers/{offer_id}/criteria",
+        json={"criteria": [{"description": "Experience in backend development", "importance": 0.5}]},
+    )
+    criterion_id = response.json()["criteria"][0]["id"]
+
+    from recruitair.database.models import ApplicantScore, EvaluationTask
+
+    # Simulate the evaluator scoring the applicant (there's no endpoint for this)
+    assert [(task.applicant_id, task.criteria_id) for task in db_session.query(EvaluationTask).all()] == [
+        (applicant_id, criterion_id)
+    ]
+    db_session.query(EvaluationTask).delete()
+    db_session.add(ApplicantScore(criteria_id=criterion_id, applicant_id=applicant_id, score=0.5))
+    db_session.commit()
+
+    # Changing only the importance keeps the score
+    response = client.put(f"/job_offers/{offer_id}/criteria/{criterion_id}", json={"importance": 0.7})
+    assert response.status_code == 200
+    assert db_session.query(EvaluationTask).count() == 0
+
+    # Changing the description invalidates the score and queues the evaluation again
+    response = client.put(
+        f"/job_offers/{offer_id}/criteria/{criterion_id}", json={"description": "Experience with Python"}
+    )
+    assert response.status_code == 200
+    assert db_session.query(ApplicantScore).count() == 0
+    assert [(task.applicant_id, task.criteria_id) for task in db_session.query(EvaluationTask).all()] == [
+        (applicant_id, criterion_id)
+    ]
@@ -0,0 +1,126 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+# ------------- DEAD LETTER TESTS ------------- #
+
+
+def create_offer_with_applicant(client: TestClient):
+    response = client.post("/job_offers", json={"text": "Backend Engineer"})
+    offer_id = response.json()["job_offer"]["id"]
+    criteria = [
+        {"description": "Experience in backend development", "importance": 0.5},
+        {"description": "Proficiency in Python and FastAPI", "importance": 0.5},
+    ]
+    response = client.post(f"/job_offers/{offer_id}/criteria", json={"criteria": criteria})
+    criteria_ids = [criterion["id"] for criterion in response.json()["criteria"]]
+    response = client.post(f"/job_offers/{offer_id}/applicants", json={"applicants": [{"cv": "Skills: Python"}]})
+    applicant_id = response.json()["applicants"][0]["id"]
+    return offer_id, applicant_id, criteria_ids
+
+
+def test_list_and_requeue_dead_letter_job_offers(client: TestClient, db_session: Session):
+    from recruitair.database.models import JobOffer, JobOfferStatus
+
+    failed_offer_id = client.post("/job_offers", json={"text": "Broken offer"}).json()["job_offer"]["id"]
+    client.post("/job_offers", json={"text": "Healthy offer"})
+
+    offer = db_session.query(JobOffer).filter(JobOffer.id == failed_offer_id).one()
+    offer.status = JobOfferStatus.FAILED
+    offer.attempts = 5
+    offer.last_error = "ClientResponseError: 500"
+    db_session.commit()
+
+    response = client.get("/dead_letters/job_offers")
+    assert response.status_code == 200
+    data = response.json()
+    assert [offer["id"] for offer in data["job_offers"]] == [failed_offer_id]
+    assert data["job_offers"][0]["status"] == "FAILED"
+    assert data["job_offers"][0]["attempts"] == 5
+    assert data["job_offers"][0]["last_error"] == "ClientResponseError: 500"
+
+    response = client.post(f"/dead_letters/job_offers/{failed_offer_id}/requeue")
+    assert response.status_code == 200
+    assert response.json()["job_offer"]["status"] == "PENDING"
+    assert client.get("/dead_letters/job_offers").json()["job_offers"] == []
+
+    offer = db_session.query(JobOffer).filter(JobOffer.id == failed_offer_id).one()
+    assert offer.attempts == 0 and offer.last_error is None and offer.next_attempt_at is None
+
+
+def test_requeue_job_offer_that_is_not_dead_lettered(client: TestClient):
+    offer_id = client.post("/job_offers", json={"text": "Backend Engineer"}).json()["job_offer"]["id"]
+
+    response = client.post(f"/dead_letters/job_offers/{offer_id}/requeue")
+    assert response.status_code == 409
+
+    response = client.post("/dead_letters/job_offers/9999/requeue")
+    assert response.status_code == 404
+
+
+def test_list_and_requeue_dead_letter_evaluations(client: TestClient, db_session: Session):
+    from recruitair.database.models import EvaluationTask, EvaluationTaskStatus
+
+    offer_id, applicant_id, criteria_ids = create_offer_with_applicant(client)
+    other_offer_id, _, _ = create_offer_with_applicant(client)
+
+    # Every evaluation of both offers ran out of attempts
+    for task in db_session.query(EvaluationTask).all():
+        task.status = EvaluationTaskStatus.FAILED
+        task.attempts = 5
+        task.last_error = "ValueError: bad response"
+    db_session.commit()
+
+    response = client.get("/dead_letters/evaluations", params={"offer_id": offer_id})
+    assert response.status_code == 200
+    evaluations = response.json()["evaluations"]
+    assert {(task["applicant_id"], task["criteria_id"]) for task in evaluations} == {
+        (applicant_id, criterion_id) for criterion_id in criteria_ids
+    }
+    assert all(task["status"] == "FAILED" and task["attempts"] == 5 for task in evaluations)
+    assert len(client.get("/dead_letters/evaluations").json()["evaluations"]) == 4
+
+    # Re-queue a single pair, then the rest of the offer
+    response = client.post(
+        "/dead_letters/evaluations/requeue", json={"applicant_id": applicant_id, "criteria_id": criteria_ids[0]}
+    )
+    assert response.status_code == 200
+    assert response.json()["requeued"] == 1
+    response = client.post("/dead_letters/evaluations/requeue", json={"offer_id": offer_id})
+    assert response.json()["requeued"] == 1
+
+    assert client.get("/dead_letters/evaluations", params={"offer_id": offer_id}).json()["evaluations"] == []
+    remaining = client.get("/dead_letters/evaluations").json()["evaluations"]
+    assert {task["offer_id"] for task in remaining} == {other_offer_id}
+
+    requeued = db_session.query(EvaluationTask).filter(EvaluationTask.offer_id == offer_id).all()
+    assert all(task.status == EvaluationTaskStatus.PENDING and task.attempts == 0 for task in requeued)
+
+
+def test_list_dead_letter_evaluations_with_cursor(client: TestClient, db_session: Session):
+    from recruitair.database.models import EvaluationTask, EvaluationTaskStatus
+
+    for _ in range(3):
+        create_offer_with_applicant(client)
+    for task in db_session.query(EvaluationTask).all():
+        task.status = EvaluationTaskStatus.FAILED
+    db_session.commit()
+    expected = sorted((task.applicant_id, task.criteria_id) for task in db_session.query(EvaluationTask).all())
+
+    pairs, params = [], {"limit": 4}
+    while True:
+        data = client.get("/dead_letters/evaluations", params=params).json()
+        pairs.extend((task["applicant_id"], task["criteria_id"]) for task in data["evaluations"])
+        if data["next_cursor"] is None:
+            break
+        params["cursor"] = data["next_cursor"]
+    assert pairs == expected
+
+    # Back from the last page to the first one
+    data = client.get("/dead_letters/evaluations", params={"limit": 4, "cursor": data["previous_cursor"]}).json()
+    assert [(task["applicant_id"], task["criteria_id"]) for task in data["evaluations"]] == expected[:4]
+    assert data["previous_cursor"] is None
+
+    # A cursor of a listing by id is not a cursor of this one
+    offer_cursor = client.get("/job_offers", params={"limit": 1}).json()["next_cursor"]
+    response = client.get("/dead_letters/evaluations", params={"cursor": offer_cursor})
+    assert response.status_code == 400
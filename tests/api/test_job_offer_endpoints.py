@@ -1,4 +1,8 @@
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from recruitair.api.resources import job_offers
+from recruitair.database.models import JobOffer, content_hash
 
 # ------------- JOB OFFER TESTS ------------- #
 
@@ -16,6 +20,27 @@ def test_create_job_offer(client: TestClient):
     assert "id" in data["job_offer"]
 
 
+def test_create_job_offer_with_priority(client: TestClient):
+    response = client.post("/job_offers", json={"text": "Urgent Site Reliability Engineer", "priority": 3})
+    assert response.status_code == 200
+    assert response.json()["job_offer"]["priority"] == 3
+
+    response = client.post("/job_offers", json={"text": "Junior Data Scientist"})
+    assert response.status_code == 200
+    assert response.json()["job_offer"]["priority"] == 0
+
+    response = client.get(f"/job_offers/{response.json()['job_offer']['id']}")
+    assert response.status_code == 200
+    assert response.json()["job_offer"]["priority"] == 0
+
+
+def test_create_job_offer_invalid_priority(client: TestClient):
+    for priority in [-1, 10]:
+        response = client.post("/job_offers", json={"text": "Junior Data Scientist", "priority": priority})
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"] == ["body", "priority"]
+
+
 def test_create_job_offer_invalid(client: TestClient):
     response = client.post("/job_offers", json={})
     assert response.status_code == 422  # Unprocessable Entity
@@ -90,3 +115,129 @@ def test_get_job_offer_by_id(client: TestClient):
         assert offer[key] == new_offer[key]
     for key in offer:
         assert new_offer[key] == offer[key]
+
+
+def test_list_job_offers_with_cursor(client: TestClient):
+    ids = [client.post("/job_offers", json={"text": f"Data Engineer {i}"}).json()["job_offer"]["id"] for i in range(7)]
+    client.post("/job_offers", json={"text": "Backend Engineer"})
+
+    # Forward, through every page of the filtered offers
+    pages = []
+    params = {"limit": 3, "text": "Data"}
+    while True:
+        data = client.get("/job_offers", params=params).json()
+        pages.append([offer["id"] for offer in data["job_offers"]])
+        if data["next_cursor"] is None:
+            break
+        params["cursor"] = data["next_cursor"]
+    assert pages == [ids[0:3], ids[3:6], ids[6:7]]
+
+    # Backward, from the last page
+    data = client.get("/job_offers", params={"limit": 3, "text": "Data", "cursor": data["previous_cursor"]}).json()
+    assert [offer["id"] for offer in data["job_offers"]] == ids[3:6]
+    data = client.get("/job_offers", params={"limit": 3, "text": "Data", "cursor": data["previous_cursor"]}).json()
+    assert [offer["id"] for offer in data["job_offers"]] == ids[0:3]
+    assert data["previous_cursor"] is None
+    assert data["next_cursor"] is not None
+
+
+def test_list_job_offers_backward_to_the_last_rows(client: TestClient, db_session):
+    from recruitair.database.models import JobOffer
+
+    ids = [client.post("/job_offers", json={"text": f"Data Engineer {i}"}).json()["job_offer"]["id"] for i in range(4)]
+    cursor = client.get("/job_offers", params={"limit": 2}).json()["next_cursor"]
+    previous_cursor = client.get("/job_offers", params={"limit": 2, "cursor": cursor}).json()["previous_cursor"]
+
+    # The offers after the page before the cursor are deleted, so there is no next page anymore
+    db_session.query(JobOffer).filter(JobOffer.id.in_(ids[2:])).delete()
+    db_session.commit()
+    data = client.get("/job_offers", params={"limit": 2, "cursor": previous_cursor}).json()
+    assert [offer["id"] for offer in data["job_offers"]] == ids[:2]
+    assert data["next_cursor"] is None
+
+
+def test_list_job_offers_invalid_cursor(client: TestClient):
+    response = client.get("/job_offers", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+    client.post("/job_offers", json={"text": "Backend Engineer"})
+    client.post("/job_offers", json={"text": "Frontend Engineer"})
+    cursor = client.get("/job_offers", params={"limit": 1}).json()["next_cursor"]
+    response = client.get("/job_offers", params={"cursor": cursor, "offset": 1})
+    assert response.status_code == 400
+
+
+def test_search_job_offers(client: TestClient):
+    texts = ["Senior Python Developer", "Python and Java Engineer", "Java Architect", "Data Engineer (Python)"]
+    ids = [client.post("/job_offers", json={"text": text}).json()["job_offer"]["id"] for text in texts]
+
+    response = client.get("/job_offers", params={"q": "python"})
+    assert response.status_code == 200
+    assert {offer["id"] for offer in response.json()["job_offers"]} == {ids[0], ids[1], ids[3]}
+
+    response = client.get("/job_offers", params={"q": "python -java"})
+    assert {offer["id"] for offer in response.json()["job_offers"]} == {ids[0], ids[3]}
+
+    response = client.get("/job_offers", params={"q": "python", "limit": 2, "offset": 2})
+    assert len(response.json()["job_offers"]) == 1
+    assert response.json()["next_cursor"] is None
+
+    cursor = client.get("/job_offers", params={"limit": 1}).json()["next_cursor"]
+    response = client.get("/job_offers", params={"q": "python", "cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_bulk_create_job_offers(client: TestClient, db_session: Session):
+    offers = [{"text": "Backend Engineer"}, {"priority": 1}, {"text": "Data Engineer", "priority": 2}, "Designer"]
+    response = client.post("/job_offers/bulk", json=offers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert [error["index"] for error in data["errors"]] == [1, 3]
+    assert data["errors"][0]["errors"][0]["loc"] == ["text"]
+    ids = data["job_offer_ids"]
+    assert ids[1] is None and ids[3] is None
+
+    response = client.get(f"/job_offers/{ids[2]}")
+    assert response.json()["job_offer"]["text"] == "Data Engineer"
+    assert response.json()["job_offer"]["priority"] == 2
+    assert response.json()["job_offer"]["status"] == "PENDING"
+    # Offers reposted with the same text are found by hash by the extractor
+    assert db_session.get(JobOffer, ids[2]).text_hash == content_hash("Data Engineer")
+
+
+def test_bulk_create_job_offers_ndjson(client: TestClient):
+    body = '{"text": "Backend Engineer"}\n\n{"text": \n{"text": "Data Engineer"}\n'
+    response = client.post("/job_offers/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 2
+    assert data["errors"][0]["index"] == 1
+    assert data["errors"][0]["errors"][0]["type"] == "json_invalid"
+    texts = [
+        client.get(f"/job_offers/{offer_id}").json()["job_offer"]["text"] for offer_id in data["job_offer_ids"][::2]
+    ]
+    assert texts == ["Backend Engineer", "Data Engineer"]
+
+
+def test_bulk_create_job_offers_malformed(client: TestClient):
+    response = client.post(
+        "/job_offers/bulk",
+        content='[{"text": "Backend Engineer"}, {"text"',
+        headers={"Content-Type": "application/json"},
+    )
+    assert response.status_code == 400
+    # Nothing is created from a malformed body
+    assert client.get("/job_offers").json()["job_offers"] == []
+
+
+def test_bulk_create_job_offers_is_all_or_nothing(client: TestClient, monkeypatch):
+    # The first chunks are inserted before the body turns out to be malformed
+    monkeypatch.setattr(job_offers, "BULK_INSERT_CHUNK_SIZE", 1)
+    response = client.post(
+        "/job_offers/bulk",
+        content='[{"text": "Backend Engineer"}, {"text": "Data Engineer"}, {"text"',
+        headers={"Content-Type": "application/json"},
+    )
+    assert response.status_code == 400
+    assert client.get("/job_offers").json()["job_offers"] == []
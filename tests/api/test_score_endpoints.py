@@ -1,9 +1,10 @@
 from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
 
 # ------------- SCORE TESTS ------------- #
 
 
-def test_get_score_for_applicant(client: TestClient):
+def test_get_score_for_applicant(client: TestClient, db_session: Session):
     # Create a job offer first
     response = client.post("/job_offers", json={"text": "Data Scientist"})
     offer_id = response.json()["job_offer"]["id"]
@@ -22,15 +23,9 @@ def test_get_score_for_applicant(client: TestClient):
     applicant_id = response.json()["applicants"][0]["id"]
 
     # Create the scores directly in the database (there's no endpoint for this)
-    from recruitair.api import app
-    from recruitair.database import get_db_session
     from recruitair.database.models import ApplicantScore
 
-    # Get the get_db dependency
-    # This is a workaround to access the database session
-    db_dependency = app.dependency_overrides.get(get_db_session)
     score_values = [8.0, 9.0]  # Example scores for the criteria
-    db = next(db_dependency())
     scores = []
     for criterion, score_value in zip(criteria, score_values):
         score = ApplicantScore(
@@ -39,9 +34,8 @@ def test_get_score_for_applicant(client: TestClient):
             score=score_value,
         )
         scores.append(score)
-    db.add_all(scores)
-    db.commit()
-    db.close()
+    db_session.add_all(scores)
+    db_session.commit()
 
     # Retrieve score for the applicant
     response = client.get(f"/job_offers/{offer_id}/applicants/{applicant_id}/scores")
@@ -86,7 +80,7 @@ def test_get_score_for_nonexistent_applicant(client: TestClient):
     assert "detail" in data
 
 
-def test_update_applicant_score(client: TestClient):
+def test_update_applicant_score(client: TestClient, db_session: Session):
     # Create a job offer first
     response = client.post("/job_offers", json={"text": "Data Scientist"})
     offer_id = response.json()["job_offer"]["id"]
@@ -105,15 +99,9 @@ def test_update_applicant_score(client: TestClient):
     applicant_id = response.json()["applicants"][0]["id"]
 
     # Create the scores directly in the database (there's no endpoint for this)
-    from recruitair.api import app
-    from recruitair.database import get_db_session
     from recruitair.database.models import ApplicantScore
 
-    # Get the get_db dependency
-    # This is a workaround to access the database session
-    db_dependency = app.dependency_overrides.get(get_db_session)
     score_values = [0.8, 0.9]  # Example scores for the criteria
-    db = next(db_dependency())
     scores = []
     for criterion, score_value in zip(criteria, score_values):
         score = ApplicantScore(
@@ -122,9 +110,8 @@ def test_update_applicant_score(client: TestClient):
             score=score_value,
         )
         scores.append(score)
-    db.add_all(scores)
-    db.commit()
-    db.close()
+    db_session.add_all(scores)
+    db_session.commit()
 
     new_score_values = [0.95, 0.85]
 
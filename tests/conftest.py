@@ -1,6 +1,6 @@
 import os
 import sys
-from typing import Iterator
+from typing import AsyncIterator, Iterator
 
 # Add the project root directory to PYTHONPATH
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -14,15 +14,22 @@ os.environ["RECRUITAIR_DB_ASYNC_DRIVER"] = "sqlite+aiosqlite"
 os.environ["RECRUITAIR_DB_DATABASE"] = ":memory:"
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
 from recruitair.api import app
-from recruitair.database import get_db_session
+from recruitair.database import get_async_db_session, get_db_session
 from recruitair.database.models import Base
 
-engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+# A named in-memory DB with a shared cache, so that the tables created by the sync engine are seen by the async engine
+# the API uses. The sync engine keeps its connection open for the DB to live as long as the tests. The async engine
+# does not pool its connections, whose threads would otherwise outlive the event loops of the worker tests.
+TEST_DATABASE = "file:recruitair_tests?mode=memory&cache=shared&uri=true"
+engine = create_engine(f"sqlite:///{TEST_DATABASE}", connect_args={"check_same_thread": False}, poolclass=StaticPool)
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DATABASE}", poolclass=NullPool)
+TestAsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -36,16 +43,33 @@ def setup_and_teardown_database():
 
 
 def override_get_db_session() -> Iterator:
+    # Used by the tests to write to the DB directly
     session = TestSessionLocal()
-    # Create all the tables (it is an in-memory DB)
-    Base.metadata.create_all(bind=engine)
     try:
         yield session
     finally:
         session.close()
 
 
+async def override_get_async_db_session() -> AsyncIterator:
+    async with TestAsyncSessionLocal() as session:
+        yield session
+
+
 app.dependency_overrides[get_db_session] = override_get_db_session
+app.dependency_overrides[get_async_db_session] = override_get_async_db_session
+
+
+@pytest.fixture
+def db_session() -> Iterator:
+    # Session to read from and write to the DB directly
+    yield from override_get_db_session()
+
+
+@pytest.fixture
+def async_session_factory() -> async_sessionmaker:
+    # Sessions of the workers under test
+    return TestAsyncSessionLocal
 
 
 # --------- FASTAPI TEST CLIENT ---------
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta, timezone
+
+from recruitair.database.models import (
+    Applicant,
+    Criterion,
+    EvaluationTask,
+    EvaluationTaskStatus,
+    JobOffer,
+    dequeue_evaluations,
+    release_evaluations,
+)
+
+# ------------- EVALUATION LEASE TESTS ------------- #
+
+
+def create_leased_tasks(db, lease_owner: str):
+    """Queue two evaluations leased to `lease_owner`, and return their (applicant_id, criteria_id) pairs."""
+    offer = JobOffer(text="Backend Engineer")
+    db.add(offer)
+    db.flush()
+    applicant = Applicant(offer_id=offer.id, cv="Skills: Python")
+    criteria = [
+        Criterion(offer_id=offer.id, description="Python", importance=0.5),
+        Criterion(offer_id=offer.id, description="FastAPI", importance=0.5),
+    ]
+    db.add_all([applicant, *criteria])
+    db.flush()
+    lease_expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+    db.add_all(
+        EvaluationTask(
+            applicant_id=applicant.id,
+            criteria_id=criterion.id,
+            offer_id=offer.id,
+            attempts=1,
+            lease_owner=lease_owner,
+            lease_expires_at=lease_expires_at,
+        )
+        for criterion in criteria
+    )
+    db.commit()
+    return [(applicant.id, criterion.id) for criterion in criteria]
+
+
+def retry_update(applicant_id: int, criteria_id: int, status: EvaluationTaskStatus) -> dict:
+    return {
+        "applicant_id": applicant_id,
+        "criteria_id": criteria_id,
+        "status": status,
+        "next_attempt_at": None,
+        "last_error": "ClientResponseError: 500",
+        "lease_owner": None,
+        "lease_expires_at": None,
+    }
+
+
+def test_results_of_lost_leases_are_ignored(db_session):
+    # The lease of the stale worker expired, and both tasks were claimed again by another worker
+    scored, failed = create_leased_tasks(db_session, lease_owner="other-worker")
+
+    db_session.execute(dequeue_evaluations("stale-worker", [scored]))
+    db_session.execute(release_evaluations("stale-worker"), [retry_update(*failed, EvaluationTaskStatus.FAILED)])
+    db_session.commit()
+
+    tasks = db_session.query(EvaluationTask).order_by(EvaluationTask.criteria_id).all()
+    assert [(task.applicant_id, task.criteria_id) for task in tasks] == [scored, failed]
+    for task in tasks:
+        assert task.status == EvaluationTaskStatus.PENDING
+        assert task.lease_owner == "other-worker" and task.lease_expires_at is not None
+        assert task.last_error is None
+
+
+def test_results_of_held_leases_are_committed(db_session):
+    scored, failed = create_leased_tasks(db_session, lease_owner="worker")
+
+    db_session.execute(dequeue_evaluations("worker", [scored]))
+    db_session.execute(release_evaluations("worker"), [retry_update(*failed, EvaluationTaskStatus.FAILED)])
+    db_session.commit()
+
+    task = db_session.query(EvaluationTask).one()
+    assert (task.applicant_id, task.criteria_id) == failed
+    assert task.status == EvaluationTaskStatus.FAILED
+    assert task.lease_owner is None and task.last_error == "ClientResponseError: 500"
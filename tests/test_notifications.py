@@ -0,0 +1,62 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from recruitair.database.notifications import EVALUATION_CHANNEL, EXTRACTION_CHANNEL, listen
+
+# ------------- WORKER NOTIFICATION TESTS ------------- #
+
+
+def count_notifications(channel: str, action) -> int:
+    """Run the blocking `action` while listening on `channel`, and return how many notifications were received."""
+    received = []
+
+    async def scenario():
+        async with listen(channel, lambda: received.append(channel)):
+            await asyncio.to_thread(action)
+            # Let the event loop run the callbacks scheduled by the API thread
+            await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    return len(received)
+
+
+def test_create_job_offer_notifies_extractor(client: TestClient):
+    def create_job_offer():
+        response = client.post("/job_offers", json={"text": "Backend Engineer"})
+        assert response.status_code == 200
+
+    assert count_notifications(EXTRACTION_CHANNEL, create_job_offer) == 1
+
+
+def test_evaluation_write_paths_notify_evaluator(client: TestClient):
+    offer_id = client.post("/job_offers", json={"text": "Backend Engineer"}).json()["job_offer"]["id"]
+
+    def create_applicants():
+        response = client.post(f"/job_offers/{offer_id}/applicants", json={"applicants": [{"cv": "Skills: Python"}]})
+        assert response.status_code == 200
+
+    def add_criteria():
+        response = client.post(
+            f"/job_offers/{offer_id}/criteria", json={"criteria": [{"description": "Python", "importance": 0.5}]}
+        )
+        assert response.status_code == 200
+
+    assert count_notifications(EVALUATION_CHANNEL, create_applicants) == 1
+    assert count_notifications(EVALUATION_CHANNEL, add_criteria) == 1
+
+    criterion_id = client.get(f"/job_offers/{offer_id}/criteria").json()["criteria"][0]["id"]
+
+    def update_criterion_description():
+        response = client.put(f"/job_offers/{offer_id}/criteria/{criterion_id}", json={"description": "FastAPI"})
+        assert response.status_code == 200
+
+    assert count_notifications(EVALUATION_CHANNEL, update_criterion_description) == 1
+
+
+def test_failed_write_does_not_notify(client: TestClient):
+    def create_applicants_for_missing_offer():
+        response = client.post("/job_offers/9999/applicants", json={"applicants": [{"cv": "Skills: Python"}]})
+        assert response.status_code == 404
+
+    assert count_notifications(EVALUATION_CHANNEL, create_applicants_for_missing_offer) == 0
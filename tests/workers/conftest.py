@@ -0,0 +1,71 @@
+import os
+from typing import Any, Callable, List, Tuple
+
+import pytest
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+# Settings of the worker modules, loaded when they are imported. The database settings are only read by the workers'
+# settings here, the engines of the tests having been created by the top-level conftest already.
+for key, value in {
+    "RECRUITAIR_DB_USERNAME": "test",
+    "RECRUITAIR_DB_PASSWORD": "test",
+    "RECRUITAIR_DB_HOST": "localhost",
+    "RECRUITAIR_EVALUATOR_API_BASE_URL": "http://evaluator/",
+    "RECRUITAIR_EVALUATOR_API_BEARER_TOKEN": "test",
+    "RECRUITAIR_EXTRACTOR_API_BASE_URL": "http://extractor/",
+    "RECRUITAIR_EXTRACTOR_API_BEARER_TOKEN": "test",
+}.items():
+    os.environ.setdefault(key, value)
+
+from recruitair.workers.common_settings import BaseWorkerSettings
+from recruitair.workers.upstream import Upstream, UpstreamMetrics, create_upstream
+
+
+class FakeClock:
+    """Monotonic clock of the tests, which only moves when `advance` is called."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def create_upstream_metrics() -> UpstreamMetrics:
+    registry = CollectorRegistry()
+    return UpstreamMetrics(
+        Gauge("concurrency_limit", "Concurrency limit", registry=registry),
+        Histogram("request_duration", "Request duration", registry=registry),
+        Histogram("throttle_wait", "Throttle wait", registry=registry),
+        Counter("throttled_responses", "Throttled responses", registry=registry),
+        Gauge("circuit_breaker_state", "Circuit breaker state", ["upstream"], registry=registry),
+        Histogram("replica_request_duration", "Replica request duration", ["upstream"], registry=registry),
+        Gauge("replica_outstanding_requests", "Replica outstanding requests", ["upstream"], registry=registry),
+    )
+
+
+class FakeUpstream(Upstream):
+    """Upstream answering every request with `answer(path, payload)`, and recording the requests."""
+
+    def __init__(self, settings: BaseWorkerSettings, answer: Callable[[str, Any], Any]):
+        upstream = create_upstream(settings, None, ["http://upstream/"], create_upstream_metrics())
+        super().__init__(None, upstream.limiter, upstream.rate_limiter, upstream.balancer)
+        self.answer = answer
+        self.requests: List[Tuple[str, Any]] = []
+
+    async def post(self, path: str, payload: Any) -> Any:
+        self.requests.append((path, payload))
+        return await self.answer(path, payload)
+
+
+@pytest.fixture
+def fake_upstream() -> Callable[[BaseWorkerSettings, Callable[[str, Any], Any]], FakeUpstream]:
+    return FakeUpstream
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from aiohttp import ClientConnectionError
+from prometheus_client import CollectorRegistry, Gauge
+
+from recruitair.workers.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+# ------------- CIRCUIT BREAKER TESTS ------------- #
+
+RECOVERY_SECONDS = 30
+
+
+def create_breaker(clock) -> CircuitBreaker:
+    gauge = Gauge("circuit_breaker_state", "Circuit state", ["upstream"], registry=CollectorRegistry())
+    return CircuitBreaker("http://upstream", 3, RECOVERY_SECONDS, 2, gauge, clock=clock)
+
+
+async def fail(breaker: CircuitBreaker) -> None:
+    with pytest.raises(ClientConnectionError):
+        async with breaker.request():
+            raise ClientConnectionError()
+
+
+async def succeed(breaker: CircuitBreaker) -> None:
+    async with breaker.request():
+        pass
+
+
+def test_consecutive_outage_errors_open_the_circuit(clock):
+    async def scenario():
+        breaker = create_breaker(clock)
+        await fail(breaker)
+        await fail(breaker)
+        # A success resets the count of consecutive failures
+        await succeed(breaker)
+        await fail(breaker)
+        await fail(breaker)
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.claimable(10) == 10
+
+        await fail(breaker)
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.claimable(10) == 0
+        with pytest.raises(CircuitOpenError):
+            await succeed(breaker)
+
+    asyncio.run(scenario())
+
+
+def test_circuit_half_opens_after_recovery_and_closes_after_trials(clock):
+    async def scenario():
+        breaker = create_breaker(clock)
+        state_changes = []
+        breaker.on_state_change(lambda: state_changes.append(breaker._state))
+        for _ in range(3):
+            await fail(breaker)
+
+        clock.advance(RECOVERY_SECONDS - 1)
+        assert breaker.state == CircuitState.OPEN
+        clock.advance(1)
+        assert breaker.state == CircuitState.HALF_OPEN
+        # Only the trials are claimable, until they report
+        assert breaker.claimable(10) == 2
+        assert breaker.claimable(10) == 0
+
+        await succeed(breaker)
+        assert breaker.state == CircuitState.HALF_OPEN
+        await succeed(breaker)
+        assert breaker.state == CircuitState.CLOSED
+        assert state_changes == [CircuitState.OPEN, CircuitState.HALF_OPEN, CircuitState.CLOSED]
+
+    asyncio.run(scenario())
+
+
+def test_failed_trial_opens_the_circuit_again(clock):
+    async def scenario():
+        breaker = create_breaker(clock)
+        for _ in range(3):
+            await fail(breaker)
+        clock.advance(RECOVERY_SECONDS)
+        assert breaker.claimable(10) == 2
+
+        await fail(breaker)
+        assert breaker.state == CircuitState.OPEN
+        clock.advance(RECOVERY_SECONDS)
+        assert breaker.state == CircuitState.HALF_OPEN
+
+    asyncio.run(scenario())
+
+
+def test_unreported_trials_are_replaced_after_recovery(clock):
+    async def scenario():
+        breaker = create_breaker(clock)
+        for _ in range(3):
+            await fail(breaker)
+        clock.advance(RECOVERY_SECONDS)
+        assert breaker.claimable(10) == 2
+
+        clock.advance(RECOVERY_SECONDS)
+        assert breaker.claimable(10) == 2
+
+    asyncio.run(scenario())
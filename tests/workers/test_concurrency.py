@@ -0,0 +1,130 @@
+from typing import Optional
+
+from aiohttp import ClientResponseError
+from prometheus_client import CollectorRegistry, Gauge, Histogram
+
+from recruitair.workers.concurrency import AdaptiveConcurrencyLimiter
+from recruitair.workers.concurrency import create_limiter as create_worker_limiter
+from recruitair.workers.evaluator import settings
+
+# ------------- ADAPTIVE CONCURRENCY TESTS ------------- #
+
+LATENCY = 0.1
+
+
+def create_limiter(
+    clock, min_limit: int = 1, max_limit: int = 20, initial_limit: Optional[int] = None
+) -> AdaptiveConcurrencyLimiter:
+    registry = CollectorRegistry()
+    return AdaptiveConcurrencyLimiter(
+        min_limit,
+        max_limit,
+        2.0,
+        0.5,
+        Gauge("concurrency_limit", "Concurrency limit", registry=registry),
+        Histogram("request_duration", "Request duration", registry=registry),
+        initial_limit,
+        clock=clock,
+    )
+
+
+def overload_error(status: int) -> ClientResponseError:
+    return ClientResponseError(None, (), status=status)
+
+
+def test_limit_grows_by_one_per_success_during_slow_start(clock):
+    limiter = create_limiter(clock)
+    assert limiter.limit == 1
+    for _ in range(4):
+        limiter.on_success(clock(), LATENCY)
+    assert limiter.limit == 5 and limiter.slow_start
+
+
+def test_limit_grows_by_one_per_limit_successes_after_slow_start(clock):
+    limiter = create_limiter(clock)
+    for _ in range(3):
+        limiter.on_success(clock(), LATENCY)
+    clock.advance(1)
+    limiter.on_timeout(clock())
+    assert limiter.limit == 2 and not limiter.slow_start
+
+    clock.advance(1)
+    for expected_limit in (2, 2, 3):
+        limiter.on_success(clock(), LATENCY)
+        assert limiter.limit == expected_limit
+
+
+def test_limit_is_multiplied_by_the_backoff_ratio_when_the_upstream_is_congested(clock):
+    limiter = create_limiter(clock)
+    for _ in range(7):
+        limiter.on_success(clock(), LATENCY)
+    assert limiter.limit == 8
+
+    # The smoothed latency goes over twice the baseline latency
+    clock.advance(1)
+    limiter.on_success(clock(), LATENCY * 20)
+    assert limiter.limit == 4 and not limiter.slow_start
+
+
+def test_timeouts_and_overload_responses_lower_the_limit(clock):
+    limiter = create_limiter(clock)
+    for _ in range(7):
+        limiter.on_success(clock(), LATENCY)
+
+    clock.advance(1)
+    limiter.on_error(clock(), overload_error(429))
+    assert limiter.limit == 4
+    clock.advance(1)
+    limiter.on_timeout(clock())
+    assert limiter.limit == 2
+    # Errors of the request itself do not
+    clock.advance(1)
+    limiter.on_error(clock(), overload_error(400))
+    assert limiter.limit == 2
+
+
+def test_requests_started_before_a_decrease_do_not_lower_the_limit_again(clock):
+    limiter = create_limiter(clock)
+    for _ in range(7):
+        limiter.on_success(clock(), LATENCY)
+    started_at = clock()
+
+    clock.advance(1)
+    limiter.on_timeout(clock())
+    assert limiter.limit == 4
+    limiter.on_timeout(started_at)
+    limiter.on_error(started_at, overload_error(503))
+    assert limiter.limit == 4
+
+
+def test_limit_stays_within_its_bounds(clock):
+    limiter = create_limiter(clock, min_limit=2, max_limit=5)
+    for _ in range(10):
+        limiter.on_success(clock(), LATENCY)
+    assert limiter.limit == 5
+    for _ in range(10):
+        clock.advance(1)
+        limiter.on_timeout(clock())
+    assert limiter.limit == 2
+
+
+def test_limit_starts_at_the_initial_limit_within_its_bounds(clock):
+    limiter = create_limiter(clock, min_limit=2, max_limit=5, initial_limit=4)
+    assert limiter.limit == 4
+    clock.advance(1)
+    limiter.on_timeout(clock())
+    assert limiter.limit == 2
+    assert create_limiter(clock, min_limit=2, max_limit=5, initial_limit=10).limit == 5
+
+
+def test_worker_limit_starts_at_the_batch_size():
+    registry = CollectorRegistry()
+    metrics = (
+        Gauge("concurrency_limit", "Concurrency limit", registry=registry),
+        Histogram("request_duration", "Request duration", registry=registry),
+    )
+    for adaptive_concurrency in (False, True):
+        worker_settings = settings.model_copy(update={"adaptive_concurrency": adaptive_concurrency})
+        assert create_worker_limiter(worker_settings, *metrics).limit == settings.batch_size
+    worker_settings = settings.model_copy(update={"adaptive_concurrency": True, "initial_concurrency": 3})
+    assert create_worker_limiter(worker_settings, *metrics).limit == 3
@@ -0,0 +1,117 @@
+import asyncio
+
+from recruitair.database.models import (
+    Applicant,
+    ApplicantScore,
+    Criterion,
+    EvaluationCacheEntry,
+    EvaluationTask,
+    JobOffer,
+    content_hash,
+    enqueue_evaluations,
+)
+from recruitair.workers.evaluator import EvaluatorWorker, settings
+from recruitair.workers.evaluator.evaluation_cache import EvaluationCache
+
+# ------------- EVALUATION CACHE TESTS ------------- #
+
+
+def create_pairs(db, cvs, descriptions):
+    """Create an applicant per CV and a criterion per description of a job offer, and return their pairs."""
+    offer = JobOffer(text="Backend Engineer")
+    db.add(offer)
+    db.flush()
+    applicants = [Applicant(offer_id=offer.id, cv=cv) for cv in cvs]
+    criteria = [Criterion(offer_id=offer.id, description=description, importance=0.5) for description in descriptions]
+    db.add_all([*applicants, *criteria])
+    db.commit()
+    return [(applicant, criterion) for applicant in applicants for criterion in criteria]
+
+
+def cache_entry(cv: str, description: str, model_version: str, score: float) -> EvaluationCacheEntry:
+    return EvaluationCacheEntry(
+        cv_hash=content_hash(cv), criterion_hash=content_hash(description), model_version=model_version, score=score
+    )
+
+
+def lookup(async_session_factory, cache: EvaluationCache, pairs) -> dict:
+    async def scenario():
+        async with async_session_factory() as session:
+            return await cache.lookup(session, pairs)
+
+    return asyncio.run(scenario())
+
+
+def test_least_recently_used_scores_are_evicted(db_session, async_session_factory):
+    pairs = create_pairs(db_session, ["CV 1", "CV 2", "CV 3"], ["Python"])
+    cache = EvaluationCache("v1", max_size=2)
+
+    async def scenario():
+        async with async_session_factory() as session:
+            cache.store(session, *pairs[0], 0.1)
+            cache.store(session, *pairs[1], 0.2)
+            # Reading the first score makes the second one the least recently used
+            assert await cache.lookup(session, [pairs[0]]) == {(pairs[0][0].id, pairs[0][1].id): 0.1}
+            cache.store(session, *pairs[2], 0.3)
+            # Nothing was flushed to the database, so evicted scores are gone
+            return await cache.lookup(session, pairs)
+
+    scores = asyncio.run(scenario())
+    assert scores == {(pairs[0][0].id, pairs[0][1].id): 0.1, (pairs[2][0].id, pairs[2][1].id): 0.3}
+
+
+def test_scores_are_only_read_for_their_model_version(db_session, async_session_factory):
+    pairs = create_pairs(db_session, ["CV 1"], ["Python", "SQL"])
+    db_session.add_all([cache_entry("CV 1", "Python", "v1", 0.4), cache_entry("CV 1", "SQL", "v2", 0.6)])
+    db_session.commit()
+
+    assert lookup(async_session_factory, EvaluationCache("v1", 10), pairs) == {(pairs[0][0].id, pairs[0][1].id): 0.4}
+    assert lookup(async_session_factory, EvaluationCache("v2", 10), pairs) == {(pairs[1][0].id, pairs[1][1].id): 0.6}
+    assert lookup(async_session_factory, EvaluationCache("v3", 10), pairs) == {}
+
+
+def test_purge_stale_deletes_the_scores_of_other_model_versions(db_session, async_session_factory):
+    db_session.add_all(
+        [
+            cache_entry("CV 1", "Python", "v1", 0.4),
+            cache_entry("CV 1", "Python", "v2", 0.5),
+            cache_entry("CV 2", "SQL", "v2", 0.6),
+        ]
+    )
+    db_session.commit()
+
+    async def scenario():
+        async with async_session_factory() as session:
+            await EvaluationCache("v2", 10).purge_stale(session)
+
+    asyncio.run(scenario())
+    assert sorted(entry.score for entry in db_session.query(EvaluationCacheEntry)) == [0.5, 0.6]
+
+
+def test_cached_scores_are_written_without_calling_the_evaluator(db_session, async_session_factory, fake_upstream):
+    pairs = create_pairs(db_session, ["Skills: Python"], ["Python", "SQL"])
+    db_session.add(cache_entry("Skills: Python", "Python", settings.evaluator_model_version, 0.9))
+    db_session.execute(enqueue_evaluations(Applicant.id == pairs[0][0].id))
+    db_session.commit()
+
+    async def answer(path, payload):
+        return {"score": 0.2}
+
+    upstream = fake_upstream(settings, answer)
+    cache = EvaluationCache(settings.evaluator_model_version, 10)
+    worker = EvaluatorWorker(settings, upstream, cache, session_factory=async_session_factory)
+
+    async def scenario():
+        async with async_session_factory() as session:
+            batch = await worker.get_batch(session, settings.batch_size)
+            await worker.dispatch_batch(session, batch)
+
+    asyncio.run(scenario())
+
+    # Only the pair without a cached score is sent to the evaluator API
+    assert upstream.requests == [("eval", {"criteria_description": "SQL", "applicant_cv": "Skills: Python"})]
+    scores = {score.criteria_id: score.score for score in db_session.query(ApplicantScore)}
+    assert scores == {pairs[0][1].id: 0.9, pairs[1][1].id: 0.2}
+    assert db_session.query(EvaluationTask).count() == 0
+    # The score computed by the evaluator API is cached as well
+    assert db_session.query(EvaluationCacheEntry).count() == 2
@@ -0,0 +1,146 @@
+import asyncio
+
+from aiohttp import ClientResponseError
+from prometheus_client import REGISTRY
+
+from recruitair.database.models import (
+    Applicant,
+    ApplicantScore,
+    Criterion,
+    EvaluationTask,
+    JobOffer,
+    enqueue_evaluations,
+)
+from recruitair.workers.evaluator import EvaluatorWorker, settings
+from recruitair.workers.evaluator.monitoring import evaluator_failed_dispatches, evaluator_total_dispatches
+
+# ------------- EVALUATOR WORKER TESTS ------------- #
+
+
+def queue_evaluations(db, criteria: int = 2) -> Applicant:
+    """Queue the evaluations of an applicant against `criteria` criteria of its job offer."""
+    offer = JobOffer(text="Backend Engineer")
+    db.add(offer)
+    db.flush()
+    applicant = Applicant(offer_id=offer.id, cv="Skills: Python, FastAPI")
+    db.add(applicant)
+    db.add_all(Criterion(offer_id=offer.id, description=f"Criterion {i}", importance=0.5) for i in range(criteria))
+    db.flush()
+    db.execute(enqueue_evaluations(Applicant.id == applicant.id))
+    db.commit()
+    return applicant
+
+
+def dispatch_queue(worker: EvaluatorWorker, async_session_factory) -> None:
+    async def scenario():
+        async with async_session_factory() as session:
+            batch = await worker.get_batch(session, settings.batch_size)
+            await worker.dispatch_batch(session, batch)
+
+    asyncio.run(scenario())
+
+
+def batched_request_sizes() -> float:
+    return REGISTRY.get_sample_value("evaluator_batched_request_size_count") or 0
+
+
+def test_batched_evaluation_scores_every_criterion_with_one_request(db_session, async_session_factory, fake_upstream):
+    applicant = queue_evaluations(db_session, criteria=3)
+    worker_settings = settings.model_copy(update={"batched_evaluation": True})
+
+    async def answer(path, payload):
+        return {"scores": [0.25, 0.5, 0.75]}
+
+    upstream = fake_upstream(worker_settings, answer)
+    worker = EvaluatorWorker(worker_settings, upstream, session_factory=async_session_factory)
+    dispatches, request_sizes = evaluator_total_dispatches._value.get(), batched_request_sizes()
+    dispatch_queue(worker, async_session_factory)
+
+    assert [path for path, _ in upstream.requests] == ["eval/batch"]
+    assert upstream.requests[0][1]["applicant_cv"] == applicant.cv
+    scores = db_session.query(ApplicantScore).filter_by(applicant_id=applicant.id).order_by(ApplicantScore.criteria_id)
+    assert [score.score for score in scores] == [0.25, 0.5, 0.75]
+    assert db_session.query(EvaluationTask).count() == 0
+    assert evaluator_total_dispatches._value.get() == dispatches + 1
+    assert batched_request_sizes() == request_sizes + 1
+
+
+def test_batched_evaluation_falls_back_to_one_request_per_criterion(db_session, async_session_factory, fake_upstream):
+    applicant = queue_evaluations(db_session, criteria=2)
+    worker_settings = settings.model_copy(update={"batched_evaluation": True})
+
+    async def answer(path, payload):
+        if path == "eval/batch":
+            raise ClientResponseError(None, (), status=404)
+        return {"score": 0.5}
+
+    upstream = fake_upstream(worker_settings, answer)
+    worker = EvaluatorWorker(worker_settings, upstream, session_factory=async_session_factory)
+    dispatches, request_sizes = evaluator_total_dispatches._value.get(), batched_request_sizes()
+    dispatch_queue(worker, async_session_factory)
+
+    assert [path for path, _ in upstream.requests] == ["eval/batch", "eval", "eval"]
+    assert not worker.batched_evaluation_supported
+    assert db_session.query(ApplicantScore).filter_by(applicant_id=applicant.id).count() == 2
+    assert db_session.query(EvaluationTask).count() == 0
+    # The unsupported batched request is not counted as a dispatch, only the two requests it fell back to
+    assert evaluator_total_dispatches._value.get() == dispatches + 2
+    assert batched_request_sizes() == request_sizes
+
+    # Later applicants are scored one criterion at a time from the start
+    queue_evaluations(db_session, criteria=2)
+    upstream.requests.clear()
+    dispatch_queue(worker, async_session_factory)
+    assert [path for path, _ in upstream.requests] == ["eval", "eval"]
+
+
+def test_failed_batched_evaluation_is_retried_later(db_session, async_session_factory, fake_upstream):
+    queue_evaluations(db_session, criteria=2)
+    worker_settings = settings.model_copy(update={"batched_evaluation": True})
+
+    async def answer(path, payload):
+        return {"scores": [0.5]}
+
+    upstream = fake_upstream(worker_settings, answer)
+    worker = EvaluatorWorker(worker_settings, upstream, session_factory=async_session_factory)
+    dispatches, failures, request_sizes = (
+        evaluator_total_dispatches._value.get(),
+        evaluator_failed_dispatches._value.get(),
+        batched_request_sizes(),
+    )
+    dispatch_queue(worker, async_session_factory)
+
+    assert worker.batched_evaluation_supported
+    assert db_session.query(ApplicantScore).count() == 0
+    tasks = db_session.query(EvaluationTask).all()
+    assert len(tasks) == 2
+    assert all(task.lease_owner is None and task.next_attempt_at is not None for task in tasks)
+    assert all("Expected 2 scores, got 1" in task.last_error for task in tasks)
+    assert evaluator_total_dispatches._value.get() == dispatches + 1
+    assert evaluator_failed_dispatches._value.get() == failures + 1
+    assert batched_request_sizes() == request_sizes
+
+
+def test_scores_of_lost_leases_are_not_written(db_session, async_session_factory, fake_upstream):
+    applicant = queue_evaluations(db_session, criteria=2)
+
+    async def answer(path, payload):
+        return {"score": 0.5}
+
+    worker = EvaluatorWorker(settings, fake_upstream(settings, answer), session_factory=async_session_factory)
+
+    async def scenario():
+        async with async_session_factory() as session:
+            batch = await worker.get_batch(session, settings.batch_size)
+            # The lease of the first pair expires during the dispatch, and the pair is claimed by another worker
+            db_session.query(EvaluationTask).filter_by(criteria_id=batch[0][1].id).update({"lease_owner": "other"})
+            db_session.commit()
+            await worker.dispatch_batch(session, batch)
+            return batch
+
+    lost, kept = asyncio.run(scenario())
+
+    scores = db_session.query(ApplicantScore).filter_by(applicant_id=applicant.id).all()
+    assert [score.criteria_id for score in scores] == [kept[1].id]
+    task = db_session.query(EvaluationTask).one()
+    assert (task.criteria_id, task.lease_owner) == (lost[1].id, "other")
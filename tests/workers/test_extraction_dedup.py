@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from recruitair.database.models import Criterion, JobOffer, JobOfferStatus
+from recruitair.workers.extractor import ExtractorWorker, settings
+from recruitair.workers.extractor.criteria_extraction import _in_flight_extractions, request_criteria_once
+
+# ------------- EXTRACTION DEDUPLICATION TESTS ------------- #
+
+CRITERIA = {"criteria": [{"description": "Python", "importance": 0.8}, {"description": "SQL", "importance": 0.4}]}
+
+
+def test_identical_offers_in_flight_share_one_request(fake_upstream):
+    offers = [JobOffer(id=i, text="Backend Engineer") for i in (1, 2, 3)]
+
+    async def scenario():
+        answered = asyncio.Event()
+
+        async def answer(path, payload):
+            await answered.wait()
+            return CRITERIA
+
+        upstream = fake_upstream(settings, answer)
+        extractions = [asyncio.create_task(request_criteria_once(offer, upstream)) for offer in offers]
+        await asyncio.sleep(0)
+        answered.set()
+        return upstream, await asyncio.gather(*extractions)
+
+    upstream, results = asyncio.run(scenario())
+    assert len(upstream.requests) == 1
+    assert all([criterion.description for criterion in criteria] == ["Python", "SQL"] for criteria in results)
+    assert not _in_flight_extractions
+
+
+def test_offers_waiting_on_a_failed_request_fail_with_it(fake_upstream):
+    offers = [JobOffer(id=i, text="Backend Engineer") for i in (1, 2)]
+
+    async def scenario():
+        answered = asyncio.Event()
+
+        async def answer(path, payload):
+            await answered.wait()
+            raise ConnectionResetError("Upstream went away")
+
+        upstream = fake_upstream(settings, answer)
+        extractions = [asyncio.create_task(request_criteria_once(offer, upstream)) for offer in offers]
+        await asyncio.sleep(0)
+        answered.set()
+        return upstream, await asyncio.gather(*extractions, return_exceptions=True)
+
+    upstream, results = asyncio.run(scenario())
+    assert len(upstream.requests) == 1
+    assert all(isinstance(result, ConnectionResetError) for result in results)
+    # The failure is not cached: the next offer with the same text is requested again
+    assert not _in_flight_extractions
+
+
+def run_worker(worker: ExtractorWorker, async_session_factory) -> None:
+    async def scenario():
+        async with async_session_factory() as session:
+            batch = await worker.get_batch(session, settings.batch_size)
+            await worker.dispatch_batch(session, batch)
+
+    asyncio.run(scenario())
+
+
+def test_offers_with_the_text_of_an_extracted_offer_copy_its_criteria(db_session, async_session_factory, fake_upstream):
+    extracted = JobOffer(text="Backend Engineer", status=JobOfferStatus.DONE)
+    db_session.add(extracted)
+    db_session.flush()
+    db_session.add_all(
+        [
+            Criterion(offer_id=extracted.id, description="Python", importance=0.8),
+            Criterion(offer_id=extracted.id, description="SQL", importance=0.4),
+        ]
+    )
+    reposted, other = JobOffer(text="Backend Engineer"), JobOffer(text="Data Engineer")
+    db_session.add_all([reposted, other])
+    db_session.commit()
+
+    async def answer(path, payload):
+        return {"criteria": [{"description": "Spark", "importance": 0.6}]}
+
+    upstream = fake_upstream(settings, answer)
+    run_worker(ExtractorWorker(settings, upstream, session_factory=async_session_factory), async_session_factory)
+
+    assert upstream.requests == [("eval", {"offer_text": "Data Engineer"})]
+    db_session.expire_all()
+    assert reposted.status == JobOfferStatus.DONE and other.status == JobOfferStatus.DONE
+    criteria = db_session.query(Criterion).filter_by(offer_id=reposted.id).order_by(Criterion.id)
+    assert [(criterion.description, criterion.importance) for criterion in criteria] == [("Python", 0.8), ("SQL", 0.4)]
+    assert [criterion.description for criterion in db_session.query(Criterion).filter_by(offer_id=other.id)] == [
+        "Spark"
+    ]
+
+
+@pytest.mark.parametrize("fails", [False, True])
+def test_identical_offers_of_a_batch_are_extracted_once(db_session, async_session_factory, fake_upstream, fails):
+    offers = [JobOffer(text="Backend Engineer") for _ in range(3)]
+    db_session.add_all(offers)
+    db_session.commit()
+
+    async def answer(path, payload):
+        # Let the duplicates of the batch start waiting on this request before it answers
+        await asyncio.sleep(0.01)
+        if fails:
+            raise ConnectionResetError("Upstream went away")
+        return CRITERIA
+
+    upstream = fake_upstream(settings, answer)
+    run_worker(ExtractorWorker(settings, upstream, session_factory=async_session_factory), async_session_factory)
+
+    assert len(upstream.requests) == 1
+    db_session.expire_all()
+    if fails:
+        # Every offer waiting on the failed request is retried later
+        assert all(offer.status == JobOfferStatus.PENDING and offer.next_attempt_at for offer in offers)
+        assert all("Upstream went away" in offer.last_error for offer in offers)
+        assert db_session.query(Criterion).count() == 0
+    else:
+        assert all(offer.status == JobOfferStatus.DONE for offer in offers)
+        assert db_session.query(Criterion).count() == 2 * len(offers)
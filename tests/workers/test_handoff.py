@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from recruitair.database.models import Applicant, Criterion, EvaluationTask, JobOffer, enqueue_evaluations
+from recruitair.workers.evaluator import EvaluatorWorker
+from recruitair.workers.evaluator import settings as evaluator_settings
+from recruitair.workers.extractor import ExtractorWorker
+from recruitair.workers.extractor import settings as extractor_settings
+from recruitair.workers.handoff import EvaluationHandoff
+from recruitair.workers.leases import WORKER_ID
+
+# ------------- EVALUATION HANDOFF TESTS ------------- #
+
+
+def create_applicant(db, criteria: int = 2) -> Applicant:
+    """Create an applicant to an offer with `criteria` criteria, whose evaluations are not queued."""
+    offer = JobOffer(text="Backend Engineer")
+    db.add(offer)
+    db.flush()
+    applicant = Applicant(offer_id=offer.id, cv="Skills: Python, FastAPI")
+    db.add(applicant)
+    db.add_all(Criterion(offer_id=offer.id, description=f"Criterion {i}", importance=0.5) for i in range(criteria))
+    db.commit()
+    return applicant
+
+
+def hand_over(db, handoff: EvaluationHandoff, applicant: Applicant, lease_expires_at: datetime) -> list:
+    """Queue the evaluations of `applicant` leased to this process, as the extractor does, and hand them over."""
+    rows = db.execute(
+        enqueue_evaluations(Applicant.id == applicant.id, lease_owner=WORKER_ID, lease_expires_at=lease_expires_at)
+    ).all()
+    db.commit()
+    handoff.put(rows, lease_expires_at)
+    return sorted((applicant_id, criteria_id) for applicant_id, criteria_id, _, _, _ in rows)
+
+
+def get_batch(worker: EvaluatorWorker, async_session_factory, batch_size: int) -> list:
+    async def scenario():
+        async with async_session_factory() as session:
+            return await worker.get_batch(session, batch_size)
+
+    return sorted((applicant.id, criterion.id) for applicant, criterion in asyncio.run(scenario()))
+
+
+def lease_owners(db, applicant: Applicant) -> list:
+    db.expire_all()
+    return [task.lease_owner for task in db.query(EvaluationTask).filter_by(applicant_id=applicant.id)]
+
+
+def test_extracted_criteria_are_handed_over_leased_to_the_process(db_session, async_session_factory, fake_upstream):
+    offer = JobOffer(text="Backend Engineer")
+    db_session.add(offer)
+    db_session.flush()
+    applicants = [Applicant(offer_id=offer.id, cv=f"CV {i}") for i in range(2)]
+    db_session.add_all(applicants)
+    db_session.commit()
+
+    async def answer(path, payload):
+        return {"criteria": [{"description": "Python", "importance": 0.8}, {"description": "SQL", "importance": 0.4}]}
+
+    handoff = EvaluationHandoff()
+    handoff.enabled = True
+    worker = ExtractorWorker(
+        extractor_settings, fake_upstream(extractor_settings, answer), handoff, session_factory=async_session_factory
+    )
+
+    async def scenario():
+        async with async_session_factory() as session:
+            await worker.dispatch_batch(session, await worker.get_batch(session, extractor_settings.batch_size))
+
+    asyncio.run(scenario())
+
+    tasks = db_session.query(EvaluationTask).all()
+    assert len(tasks) == 4
+    assert all(task.lease_owner == WORKER_ID and task.lease_expires_at and task.attempts == 1 for task in tasks)
+    handed_over = handoff.take(10, datetime.now(timezone.utc))
+    assert sorted(row[:2] for row in handed_over) == sorted((task.applicant_id, task.criteria_id) for task in tasks)
+
+
+def test_evaluator_takes_the_handed_over_evaluations_before_claiming(db_session, async_session_factory, fake_upstream):
+    queued = create_applicant(db_session)
+    db_session.execute(enqueue_evaluations(Applicant.id == queued.id))
+    db_session.commit()
+    handoff = EvaluationHandoff()
+    handed_over = hand_over(
+        db_session, handoff, create_applicant(db_session), datetime.now(timezone.utc) + timedelta(minutes=5)
+    )
+    worker = EvaluatorWorker(
+        evaluator_settings,
+        fake_upstream(evaluator_settings, None),
+        handoff=handoff,
+        session_factory=async_session_factory,
+    )
+
+    # The older queued evaluations are left to a later claim, the handed over ones being taken first
+    assert get_batch(worker, async_session_factory, len(handed_over)) == handed_over
+    assert lease_owners(db_session, queued) == [None, None]
+    assert len(get_batch(worker, async_session_factory, 10)) == 2
+    assert lease_owners(db_session, queued) == [WORKER_ID, WORKER_ID]
+
+
+def test_evaluations_left_in_the_handoff_are_claimed_again_once_their_lease_expires(
+    db_session, async_session_factory, fake_upstream
+):
+    # The process stopped with evaluations still in its handoff, which are leased to it until their lease expires
+    applicant = create_applicant(db_session)
+    handoff = EvaluationHandoff()
+    lease_expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+    handed_over = hand_over(db_session, handoff, applicant, lease_expires_at)
+    worker = EvaluatorWorker(
+        evaluator_settings,
+        fake_upstream(evaluator_settings, None),
+        handoff=EvaluationHandoff(),
+        session_factory=async_session_factory,
+    )
+    assert get_batch(worker, async_session_factory, 10) == []
+
+    db_session.query(EvaluationTask).update({"lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)})
+    db_session.commit()
+    assert get_batch(worker, async_session_factory, 10) == handed_over
+    # Rows whose lease expired in the handoff are not taken from it, as they may have been claimed by another worker
+    assert handoff.take(10, lease_expires_at) == []
@@ -0,0 +1,94 @@
+import asyncio
+
+from prometheus_client import CollectorRegistry, Counter, Gauge
+
+from recruitair.workers.hedging import RequestHedger
+
+# ------------- REQUEST HEDGING TESTS ------------- #
+
+HEDGE_DELAY = 0.01
+
+
+def create_hedger(budget: float) -> RequestHedger:
+    registry = CollectorRegistry()
+    hedger = RequestHedger(
+        95,
+        budget,
+        Counter("hedged_requests", "Hedged requests", registry=registry),
+        Counter("hedge_wins", "Hedges answering first", registry=registry),
+        Gauge("hedge_delay", "Hedge delay", registry=registry),
+    )
+    hedger.delay = HEDGE_DELAY
+    return hedger
+
+
+def counter_value(counter: Counter) -> float:
+    return counter._value.get()
+
+
+def test_hedges_are_limited_by_the_budget():
+    hedger = create_hedger(budget=0.5)
+
+    async def scenario():
+        results = []
+        for _ in range(4):
+            sent = []
+
+            async def request(on_sent):
+                # The original request answers after several hedge delays, and the hedge at once
+                sent.append("hedge" if sent else "original")
+                name = sent[-1]
+                on_sent()
+                if name == "original":
+                    await asyncio.sleep(HEDGE_DELAY * 5)
+                return name
+
+            results.append(await hedger.run(request))
+        return results
+
+    # Every request earns half a token, so every second one is hedged
+    assert asyncio.run(scenario()) == ["original", "hedge", "original", "hedge"]
+    assert counter_value(hedger._hedged_requests) == 2
+    assert counter_value(hedger._hedge_wins) == 2
+
+
+def test_first_answer_wins_and_the_other_request_is_cancelled():
+    hedger = create_hedger(budget=1)
+    cancelled = []
+
+    async def slow_request(on_sent):
+        on_sent()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append("original")
+            raise
+
+    requests = [slow_request]
+
+    async def request(on_sent):
+        if requests:
+            return await requests.pop()(on_sent)
+        on_sent()
+        return "hedge"
+
+    assert asyncio.run(hedger.run(request)) == "hedge"
+    assert cancelled == ["original"]
+    assert counter_value(hedger._hedge_wins) == 1
+
+
+def test_waiting_for_the_worker_limits_does_not_trigger_a_hedge():
+    hedger = create_hedger(budget=1)
+    calls = 0
+
+    async def request(on_sent):
+        nonlocal calls
+        calls += 1
+        # Waiting for a concurrency slot or rate limit quota for longer than the hedge delay
+        await asyncio.sleep(HEDGE_DELAY * 5)
+        on_sent()
+        return "original"
+
+    assert asyncio.run(hedger.run(request)) == "original"
+    assert calls == 1
+    assert counter_value(hedger._hedged_requests) == 0
@@ -0,0 +1,64 @@
+import random
+from collections import Counter
+from typing import List
+
+from prometheus_client import CollectorRegistry, Gauge, Histogram
+
+from recruitair.workers.circuit_breaker import CircuitBreaker, CircuitState
+from recruitair.workers.load_balancing import Endpoint, LoadBalancer
+
+# ------------- LOAD BALANCING TESTS ------------- #
+
+
+def create_endpoints(clock, outstanding: List[int]) -> List[Endpoint]:
+    registry = CollectorRegistry()
+    breaker_gauge = Gauge("circuit_breaker_state", "Circuit state", ["upstream"], registry=registry)
+    latency_histogram = Histogram("request_duration", "Request duration", ["upstream"], registry=registry)
+    outstanding_gauge = Gauge("outstanding_requests", "Outstanding requests", ["upstream"], registry=registry)
+    endpoints = []
+    for index, requests in enumerate(outstanding):
+        base_url = f"http://replica-{index}/"
+        breaker = CircuitBreaker(base_url, 3, 30, 1, breaker_gauge, clock=clock)
+        endpoint = Endpoint(base_url, breaker, latency_histogram, outstanding_gauge)
+        endpoint.outstanding = requests
+        endpoints.append(endpoint)
+    return endpoints
+
+
+def test_least_outstanding_picks_the_least_loaded_replica(clock):
+    endpoints = create_endpoints(clock, [3, 1, 2])
+    balancer = LoadBalancer(endpoints, "least_outstanding", random.Random(0))
+    assert balancer.pick() is endpoints[1]
+    # Replicas already tried, e.g. by the original of a hedged request, are avoided
+    assert balancer.pick([endpoints[1]]) is endpoints[2]
+
+
+def test_least_outstanding_ejects_replicas_whose_circuit_is_open(clock):
+    endpoints = create_endpoints(clock, [3, 1, 2])
+    endpoints[1].breaker._set_state(CircuitState.OPEN)
+    balancer = LoadBalancer(endpoints, "least_outstanding", random.Random(0))
+    assert balancer.pick() is endpoints[2]
+
+    # Without any replica available, the least loaded one is picked anyway
+    for endpoint in endpoints:
+        endpoint.breaker._set_state(CircuitState.OPEN)
+    assert balancer.pick() is endpoints[1]
+
+
+def test_power_of_two_choices_never_picks_the_most_loaded_replica(clock):
+    endpoints = create_endpoints(clock, [0, 5, 10])
+    balancer = LoadBalancer(endpoints, "power_of_two_choices", random.Random(0))
+    picks = Counter(balancer.pick().base_url for _ in range(300))
+    # The most loaded replica always loses its comparison, and the middle one wins when paired with it
+    assert set(picks) == {"http://replica-0/", "http://replica-1/"}
+    assert picks["http://replica-0/"] > picks["http://replica-1/"]
+
+
+def test_claimable_only_allows_trials_while_every_circuit_is_half_open(clock):
+    endpoints = create_endpoints(clock, [0, 0])
+    balancer = LoadBalancer(endpoints, "least_outstanding", random.Random(0))
+    assert balancer.claimable(10) == 10
+    for endpoint in endpoints:
+        endpoint.breaker._set_state(CircuitState.HALF_OPEN)
+    # One trial per replica
+    assert balancer.claimable(10) == 2
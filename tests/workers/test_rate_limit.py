@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import CollectorRegistry, Counter, Histogram
+
+from recruitair.workers import rate_limit
+from recruitair.workers.rate_limit import RateLimiter, TokenBucket, UpstreamThrottled, parse_retry_after
+
+# ------------- RATE LIMIT TESTS ------------- #
+
+
+def create_rate_limiter(clock, requests_per_second=None, bytes_per_second=None, retry_after_max_seconds=60):
+    registry = CollectorRegistry()
+    return RateLimiter(
+        requests_per_second,
+        bytes_per_second,
+        1,
+        retry_after_max_seconds,
+        Histogram("throttle_wait", "Throttle wait", registry=registry),
+        Counter("throttled_responses", "Throttled responses", registry=registry),
+        clock=clock,
+    )
+
+
+def acquire_all(monkeypatch, clock, limiter: RateLimiter, payloads) -> list:
+    """Acquire quota for every payload size in turn, and return the sleeps, which advance `clock`."""
+    sleeps = []
+
+    async def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        clock.advance(seconds)
+
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", sleep)
+
+    async def scenario():
+        for payload_bytes in payloads:
+            await limiter.acquire(payload_bytes)
+
+    asyncio.run(scenario())
+    return sleeps
+
+
+def throttled_response(status: int, retry_after: str):
+    return SimpleNamespace(status=status, headers={"Retry-After": retry_after}, request_info=None, history=())
+
+
+def test_token_bucket_refills_over_time(clock):
+    bucket = TokenBucket(rate=2, capacity=4, clock=clock)
+    assert bucket.delay(4) == 0
+    bucket.take(4)
+    assert bucket.delay(1) == 0.5
+    clock.advance(0.25)
+    assert bucket.delay(1) == 0.25
+    clock.advance(10)
+    # Tokens do not pile up beyond the capacity
+    assert bucket.delay(1) == 0
+    assert bucket.tokens == 4
+
+
+def test_token_bucket_goes_into_debt_for_amounts_over_its_capacity(clock):
+    bucket = TokenBucket(rate=1, capacity=2, clock=clock)
+    # A full bucket is enough for any amount, which later takers pay for
+    assert bucket.delay(5) == 0
+    bucket.take(5)
+    assert bucket.delay(1) == 4
+
+
+def test_requests_over_quota_are_delayed(monkeypatch, clock):
+    limiter = create_rate_limiter(clock, requests_per_second=2)
+    # A burst of 2 requests, then one every half second
+    assert acquire_all(monkeypatch, clock, limiter, [0, 0, 0, 0]) == [0.5, 0.5]
+
+
+def test_payload_bytes_over_quota_are_delayed(monkeypatch, clock):
+    limiter = create_rate_limiter(clock, bytes_per_second=100)
+    assert acquire_all(monkeypatch, clock, limiter, [100, 50]) == [0.5]
+
+
+def test_pause_holds_every_request_back(monkeypatch, clock):
+    limiter = create_rate_limiter(clock)
+    limiter.pause(3)
+    # A shorter pause does not shorten the current one
+    limiter.pause(1)
+    assert acquire_all(monkeypatch, clock, limiter, [0, 0]) == [3]
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [("3", 3), ("0.5", 0.5), ("-1", 0), (None, None), ("", None), ("soon", None), ("Wed, 21 Oct 2015 07:28:00 GMT", 0)],
+)
+def test_parse_retry_after(value, seconds):
+    assert parse_retry_after(value) == seconds
+
+
+def test_parse_retry_after_http_date():
+    retry_after = parse_retry_after(format_datetime(datetime.now(timezone.utc) + timedelta(minutes=1), usegmt=True))
+    assert 55 < retry_after <= 60
+
+
+def test_throttled_responses_are_retried_within_the_maximum_wait(clock):
+    limiter = create_rate_limiter(clock, retry_after_max_seconds=10)
+    with pytest.raises(UpstreamThrottled) as error:
+        limiter.check_throttled(throttled_response(429, "4"), throttled_seconds=0)
+    assert error.value.retry_after == 4
+    with pytest.raises(UpstreamThrottled):
+        limiter.check_throttled(throttled_response(503, "4"), throttled_seconds=6)
+
+    # Waiting longer than the maximum, other statuses and responses without Retry-After fail like other errors
+    limiter.check_throttled(throttled_response(429, "4"), throttled_seconds=7)
+    limiter.check_throttled(throttled_response(500, "4"), throttled_seconds=0)
+    limiter.check_throttled(throttled_response(429, ""), throttled_seconds=0)
@@ -0,0 +1,153 @@
+import asyncio
+from typing import Awaitable, Callable, Iterable, List
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+from recruitair.workers.common_settings import BaseWorkerSettings
+from recruitair.workers.dispatch import DispatchMetrics, QueueWorker
+
+# ------------- STREAMING DISPATCH TESTS ------------- #
+
+settings = BaseWorkerSettings(
+    db_username="test",
+    db_password="test",
+    db_host="localhost",
+    db_database="test",
+    dispatch_mode="streaming",
+    batch_size=4,
+    notification_poll_seconds=3600,
+)
+
+
+def create_dispatch_metrics() -> DispatchMetrics:
+    registry = CollectorRegistry()
+    return DispatchMetrics(
+        Histogram("batch_size", "Batch size", registry=registry),
+        Histogram("batch_dispatch_duration", "Batch dispatch duration", registry=registry),
+        Gauge("in_flight_dispatches", "In-flight dispatches", registry=registry),
+        Counter("total_dispatches", "Total dispatches", registry=registry),
+        Counter("failed_dispatches", "Failed dispatches", registry=registry),
+        Counter("timeouts", "Timeouts", registry=registry),
+        Counter("retries_scheduled", "Retries scheduled", registry=registry),
+        Counter("dead_lettered", "Dead-lettered", registry=registry),
+    )
+
+
+class NullSession:
+    """Session of the tasks of `ListWorker`, which are not stored in the database."""
+
+    async def __aenter__(self) -> "NullSession":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class ListWorker(QueueWorker[int, int]):
+    """Worker of a queue of numbers in memory, each dispatched with `dispatch(task)`."""
+
+    def __init__(self, upstream, tasks: Iterable[int], dispatch: Callable[[int], Awaitable[None]]):
+        super().__init__(settings, upstream, create_dispatch_metrics(), session_factory=NullSession)
+        self.queue = list(tasks)
+        self.dispatch = dispatch
+        self.claim_sizes: List[int] = []
+        self.results: List[int] = []
+
+    @property
+    def in_flight(self) -> int:
+        return self.metrics.in_flight_dispatches._value.get()
+
+    async def get_batch(self, session, batch_size: int) -> List[int]:
+        self.claim_sizes.append(batch_size)
+        batch, self.queue = self.queue[:batch_size], self.queue[batch_size:]
+        return batch
+
+    def describe(self, batch) -> str:
+        return f"tasks {batch}"
+
+    def dispatches(self, session, tasks):
+        async def dispatch(task: int) -> List[int]:
+            await self.dispatch(task)
+            return [task]
+
+        return [(dispatch(task), 1) for task in tasks]
+
+    async def commit_results(self, session, results) -> None:
+        self.results.extend(results)
+
+
+async def run_until(worker: ListWorker, done: Callable[[], bool], timeout: float = 5) -> None:
+    """Run `worker` in streaming mode until `done()`, failing if it takes more than `timeout` seconds."""
+    run = asyncio.create_task(worker.run())
+    try:
+        async with asyncio.timeout(timeout):
+            while not done():
+                await asyncio.sleep(0.001)
+    finally:
+        run.cancel()
+        await asyncio.gather(run, return_exceptions=True)
+
+
+def test_window_never_holds_more_than_batch_size_tasks(fake_upstream):
+    in_flight: List[int] = []
+
+    async def dispatch(task: int) -> None:
+        in_flight.append(worker.in_flight)
+        await asyncio.sleep(0.001 * (task % 3))
+
+    worker = ListWorker(fake_upstream(settings, None), range(30), dispatch)
+    asyncio.run(run_until(worker, lambda: len(worker.results) == 30))
+
+    assert sorted(worker.results) == list(range(30))
+    assert max(in_flight) == settings.batch_size
+    # Every claim fills the free slots of the window, and no more
+    assert all(0 < claim_size <= settings.batch_size for claim_size in worker.claim_sizes)
+    assert worker.in_flight == 0
+
+
+class FailingWorker(ListWorker):
+    """Worker failing to dispatch its first batch before any of its tasks is sent upstream."""
+
+    async def settle_locally(self, session, batch):
+        if any(task < settings.batch_size for task in batch):
+            raise RuntimeError("Database connection lost")
+        return await super().settle_locally(session, batch)
+
+
+def test_slots_of_a_failed_dispatch_are_released(fake_upstream):
+    async def dispatch(task: int) -> None:
+        await asyncio.sleep(0)
+
+    worker = FailingWorker(fake_upstream(settings, None), range(2 * settings.batch_size), dispatch)
+    asyncio.run(run_until(worker, lambda: len(worker.results) == settings.batch_size))
+
+    # The slots held by the failed claim were released, and the next claim was dispatched in them
+    assert sorted(worker.results) == list(range(settings.batch_size, 2 * settings.batch_size))
+    assert worker.claim_sizes[:2] == [settings.batch_size, settings.batch_size]
+    assert worker.in_flight == 0
+
+
+def test_idle_worker_sleeps_until_woken_up(fake_upstream):
+    async def dispatch(task: int) -> None:
+        pass
+
+    worker = ListWorker(fake_upstream(settings, None), [], dispatch)
+
+    async def scenario() -> None:
+        run = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.05)
+        # The queue was found empty, and is not polled again before the fallback poll interval
+        assert len(worker.claim_sizes) == 1
+        worker.queue = [1, 2]
+        worker.wakeup.set()
+        async with asyncio.timeout(5):
+            while len(worker.results) < 2:
+                await asyncio.sleep(0.001)
+        run.cancel()
+        await asyncio.gather(run, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert sorted(worker.results) == [1, 2]
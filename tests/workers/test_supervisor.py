@@ -0,0 +1,126 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+
+import prometheus_client
+import pytest
+from prometheus_client import multiprocess
+
+from recruitair.workers.common_settings import BaseWorkerSettings
+from recruitair.workers.supervisor import HEALTHY_UPTIME_SECONDS, MAX_RESTART_DELAY_SECONDS, Supervisor
+
+# ------------- SUPERVISOR TESTS ------------- #
+
+# Directory where the worker processes of the tests record that they started or stopped, inherited from the tests
+MARKERS_DIRECTORY = "RECRUITAIR_TEST_MARKERS_DIRECTORY"
+
+settings = BaseWorkerSettings(db_username="test", db_password="test", db_host="localhost", db_database="test")
+
+
+def mark(event: str) -> None:
+    Path(os.environ[MARKERS_DIRECTORY], f"{event}-{os.getpid()}").touch()
+
+
+async def crashing_worker() -> None:
+    mark("started")
+    raise RuntimeError("Worker crashed")
+
+
+async def idle_worker() -> None:
+    mark("started")
+    try:
+        await asyncio.Event().wait()
+    except asyncio.CancelledError:
+        mark("stopped")
+        raise
+
+
+def markers(directory: Path, event: str) -> list:
+    return sorted(directory.glob(f"{event}-*"))
+
+
+def run_until(supervisor: Supervisor, done, timeout: float = 60) -> None:
+    """Run `supervisor` in the foreground, sending it SIGTERM once `done()` or after `timeout` seconds."""
+
+    def stop_when_done() -> None:
+        deadline = time.monotonic() + timeout
+        while not done() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    handlers = signal.getsignal(signal.SIGTERM), signal.getsignal(signal.SIGINT)
+    stopper = threading.Thread(target=stop_when_done)
+    stopper.start()
+    try:
+        supervisor.run()
+    finally:
+        stopper.join()
+        signal.signal(signal.SIGTERM, handlers[0])
+        signal.signal(signal.SIGINT, handlers[1])
+
+
+@pytest.fixture
+def markers_directory(tmp_path, monkeypatch) -> Path:
+    monkeypatch.setenv(MARKERS_DIRECTORY, str(tmp_path))
+    # The worker processes inherit the environment of the tests, whose database is SQLite
+    for key in ("RECRUITAIR_DB_USERNAME", "RECRUITAIR_DB_PASSWORD", "RECRUITAIR_DB_HOST"):
+        monkeypatch.delenv(key, raising=False)
+    return tmp_path
+
+
+def test_children_are_stopped_gracefully_on_sigterm(markers_directory):
+    supervisor = Supervisor(idle_worker, settings.model_copy(update={"processes": 2}), "test")
+    run_until(supervisor, lambda: len(markers(markers_directory, "started")) == 2)
+
+    assert len(markers(markers_directory, "stopped")) == 2
+    assert all(process.exitcode == 0 for process in supervisor.children.values())
+
+
+def test_crashed_child_is_restarted(markers_directory):
+    supervisor = Supervisor(crashing_worker, settings.model_copy(update={"processes": 1}), "test")
+    # The first crash is restarted right away, the next ones after a growing delay
+    run_until(supervisor, lambda: len(markers(markers_directory, "started")) == 2)
+
+    assert len(markers(markers_directory, "started")) == 2
+    assert supervisor._restart_delays[0] >= 1
+
+
+class ExitedProcess:
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.name = f"test-{pid}"
+        self.exitcode = 1
+
+
+def test_restart_delay_doubles_until_the_child_stays_up(monkeypatch):
+    dead_pids = []
+    monkeypatch.setattr(multiprocess, "mark_process_dead", dead_pids.append)
+    supervisor = Supervisor(crashing_worker, settings.model_copy(update={"expose_metrics": True}), "test")
+
+    def crash(pid: int, uptime: float) -> float:
+        supervisor.children[0] = ExitedProcess(pid)
+        supervisor._started_at[0] = time.monotonic() - uptime
+        supervisor._schedule_restart(0)
+        return round(supervisor._restart_at[0] - time.monotonic())
+
+    delays = [crash(pid, 0) for pid in range(1, 10)]
+    assert delays == [0, 1, 2, 4, 8, 16, 32, MAX_RESTART_DELAY_SECONDS, MAX_RESTART_DELAY_SECONDS]
+    # A child that stayed up long enough is restarted right away, and its backoff starts over
+    assert crash(10, HEALTHY_UPTIME_SECONDS) == 0
+    assert crash(11, 0) == 1
+    # The metric files of the dead children are merged into the aggregate and no longer read live
+    assert dead_pids == list(range(1, 12))
+
+
+def test_metrics_left_by_a_previous_run_are_removed(tmp_path, monkeypatch):
+    (tmp_path / "counter_123.db").touch()
+    (tmp_path / "notes.txt").touch()
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(prometheus_client, "start_http_server", lambda *args, **kwargs: None)
+    supervisor = Supervisor(idle_worker, settings.model_copy(update={"expose_metrics": True}), "test")
+
+    assert supervisor._serve_metrics() is None
+    assert [path.name for path in tmp_path.iterdir()] == ["notes.txt"]